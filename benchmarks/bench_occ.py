@@ -0,0 +1,58 @@
+# Micro-benchmark: parser OCC vectorizado frente al slicing de pandas del script original
+#
+#   python benchmarks/bench_occ.py [--rows 20000] [--repeat 20]
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gex.occ import parse_occ
+
+
+# Símbolos tipo chain SPX: raíces SPX/SPXW, decenas de vencimientos y strikes con decimales
+def spx_symbols(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    expiries = [date.today() + timedelta(days=int(d)) for d in np.unique(rng.integers(0, 400, 40))]
+    strikes = rng.choice(np.arange(2000, 8000, 2.5), rows)
+    symbols = []
+    for i, strike in enumerate(strikes):
+        exp = expiries[i % len(expiries)]
+        root = "SPXW" if i % 3 else "SPX"
+        symbols.append(f"{root}{exp.strftime('%y%m%d')}{'CP'[i % 2]}{int(round(strike * 1000)):08d}")
+    return pd.Series(symbols)
+
+
+# Versión original: tres slices de strings, lstrip, to_datetime y astype(float)
+def slicing(options):
+    data_df = pd.DataFrame({'option': options})
+    data_df['CallPut'] = data_df['option'].str.slice(start=-9, stop=-8)
+    data_df['ExpirationDate'] = data_df['option'].str.slice(start=-15, stop=-9)
+    data_df['ExpirationDate'] = pd.to_datetime(data_df['ExpirationDate'], format='%y%m%d')
+    data_df['Strike'] = data_df['option'].str.slice(start=-8, stop=-3).str.lstrip('0')
+    data_df['Strike'] = data_df['Strike'].astype(float)
+    return data_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del parser OCC")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    options = spx_symbols(args.rows)
+    old = min(timeit.repeat(lambda: slicing(options), number=1, repeat=args.repeat))
+    new = min(timeit.repeat(lambda: parse_occ(options), number=1, repeat=args.repeat))
+
+    print(f"filas:      {args.rows}")
+    print(f"slicing:    {old * 1000:8.2f} ms")
+    print(f"parse_occ:  {new * 1000:8.2f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
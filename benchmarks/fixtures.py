@@ -0,0 +1,77 @@
+# Fixtures de chains para el benchmark.
+#
+# Se usan los JSON grabados de CBOE que haya en benchmarks/fixtures/_{TICKER}.json;
+# si falta alguno se genera uno sintético determinista con el mismo formato y un
+# tamaño similar al real (SPX ~20k contratos, NDX ~8k, RUT ~6k, VIX ~1.5k).
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+# Fecha de cotización fija: el tiempo a vencimiento (y los golden) no dependen del día
+QUOTE_DATE = date(2025, 1, 2)
+
+# ticker: (spot, paso entre strikes, número de strikes, número de vencimientos)
+SPECS = {
+    "SPX": (5900.0, 5.0, 400, 25),
+    "NDX": (21000.0, 25.0, 200, 20),
+    "RUT": (2250.0, 5.0, 150, 20),
+    "VIX": (17.5, 0.5, 50, 15),
+}
+
+
+# Vencimientos: diarios la primera semana y luego viernes (incluye terceros viernes)
+def _expiries(n):
+    expiries = []
+    d = QUOTE_DATE
+    while len(expiries) < n:
+        if d.weekday() < 5 and (len(expiries) < 5 or d.weekday() == 4):
+            expiries.append(d)
+        d += timedelta(days=1)
+    return expiries
+
+
+def synthetic_payload(ticker, seed=0):
+    spot, step, nStrikes, nExp = SPECS[ticker]
+    rng = np.random.default_rng([seed, sum(map(ord, ticker))])
+    strikes = np.round((spot + (np.arange(nStrikes) - nStrikes // 2) * step) / step) * step
+    strikes = strikes[strikes > 0]
+    root = "SPXW" if ticker == "SPX" else ticker
+
+    options = []
+    for exp in _expiries(nExp):
+        for cp in "CP":
+            # OI concentrado cerca del spot; más puts por debajo y más calls por encima
+            dist = (strikes - spot) / spot
+            skew = np.where(dist < 0, 1.6, 0.6) if cp == "P" else np.where(dist > 0, 1.2, 0.5)
+            oi = np.floor(rng.gamma(2.0, 800, len(strikes)) * np.exp(-np.abs(dist) * 12) * skew)
+            iv = 0.12 + 0.6 * np.abs(dist) + rng.normal(0, 0.01, len(strikes))
+            gamma = np.exp(-(dist / 0.03) ** 2) * 0.004 + rng.uniform(0, 1e-4, len(strikes))
+            for k, o, v, g in zip(strikes, oi, iv, gamma):
+                options.append({
+                    "option": f"{root}{exp.strftime('%y%m%d')}{cp}{int(round(k * 1000)):08d}",
+                    "bid": 1.0, "bid_size": 10, "ask": 1.1, "ask_size": 10,
+                    "iv": round(float(max(v, 0.01)), 4), "open_interest": float(o), "volume": 0,
+                    "delta": 0.5 if cp == "C" else -0.5, "gamma": round(float(g), 6),
+                    "vega": 0.1, "theta": -0.1, "rho": 0.01, "theo": 1.05,
+                    "change": 0.0, "open": 1.0, "high": 1.1, "low": 0.9, "tick": "no_change",
+                    "last_trade_price": 1.05, "last_trade_time": f"{QUOTE_DATE.isoformat()}T10:00:00",
+                    "percent_change": 0.0, "prev_day_close": 1.05,
+                })
+
+    return {
+        "timestamp": f"{QUOTE_DATE.isoformat()} 10:00:00",
+        "data": {"symbol": f"_{ticker}", "close": spot, "current_price": spot, "options": options},
+    }
+
+
+# Bytes del JSON del ticker (grabado o sintético, que se guarda para reutilizarlo)
+def fixture_bytes(ticker):
+    path = FIXTURE_DIR / f"_{ticker}.json"
+    if not path.exists():
+        FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(synthetic_payload(ticker)))
+    return path.read_bytes()
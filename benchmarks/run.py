@@ -0,0 +1,303 @@
+# Benchmark del pipeline GEX por etapas, con historial y controles de regresión.
+#
+#   python benchmarks/run.py                      # SPX NDX RUT VIX, compara con el historial
+#   python benchmarks/run.py SPX --repeat 10
+#   python benchmarks/run.py --update-golden      # regenera las salidas de referencia
+#
+# Cada ejecución añade una línea por ticker a benchmarks/results/history.jsonl con el
+# commit, las versiones, el tiempo/memoria pico de cada etapa y el tamaño serializado de
+# cada figura. Sale con código 1 si alguna etapa es más lenta que la última ejecución
+# registrada por encima de --tolerance, o si totalGamma, zeroGamma o dfAgg['TotalGamma']
+# difieren de los golden.
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent))
+
+from fixtures import QUOTE_DATE, SPECS, fixture_bytes  # noqa: E402
+
+from gex.api import analyze  # noqa: E402
+from gex.cache import parse_payload  # noqa: E402
+from gex.chain import add_time_to_expiry, expiry_buckets, merge_calls_puts, prepare_chain  # noqa: E402
+from gex.compact import CompactChain  # noqa: E402
+from gex.exposure import compute_gex  # noqa: E402
+from gex.ingest import CHUNK_SIZE, parse_stream  # noqa: E402
+from gex.levels import key_levels  # noqa: E402
+from gex.memo import MemoCache  # noqa: E402
+from gex.occ import parse_occ  # noqa: E402
+from gex.profile import gamma_flip, gamma_profile, price_levels  # noqa: E402
+from gex.scenario import DEFAULT_VOL_SHIFTS, scenario_grid  # noqa: E402
+
+GOLDEN_DIR = ROOT / "golden"
+HISTORY = ROOT / "results" / "history.jsonl"
+
+
+# Etapas del pipeline en orden; cada una recibe y amplía el estado compartido
+def _stages(raw, ticker):
+    state = {}
+
+    def parse_json():
+        state['snapshot'] = parse_payload(ticker, json.loads(raw))
+        return len(state['snapshot'].options_df)
+
+    def stream_json():
+        chunks = (raw[i:i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE))
+        state['streamed'] = parse_stream(ticker, chunks)
+        return len(state['streamed'].options_df)
+
+    def decode_symbols():
+        data_df = state['snapshot'].options_df.copy(deep=False)
+        data_df['CallPut'], data_df['ExpirationDate'], data_df['Strike'], data_df['Root'] = parse_occ(
+            data_df['option'], roots=True)
+        state['data_df'] = data_df
+        return len(data_df)
+
+    def merge():
+        return len(merge_calls_puts(state['data_df']))
+
+    def prepare():
+        state['df'] = prepare_chain(state['snapshot'].options_df)
+        return len(state['df'])
+
+    def compact():
+        state['compact'] = CompactChain.from_options(state['snapshot'].options_df)
+        return len(state['compact'])
+
+    def groupby_strike():
+        state['dfAgg'] = compute_gex(state['df'], state['snapshot'].spotPrice)
+        return len(state['dfAgg'])
+
+    def profile():
+        spot = state['snapshot'].spotPrice
+        df = state['df']
+        levels = price_levels(0.8 * spot, 1.2 * spot)
+        add_time_to_expiry(df, QUOTE_DATE)
+        nextExpiry, nextMonthlyExp = expiry_buckets(df)
+        state['levels'] = levels
+        state['profile'] = gamma_profile(df, levels, nextExpiry, nextMonthlyExp)
+        state['zeroGamma'] = gamma_flip(levels, state['profile'][0])
+        return len(levels)
+
+    def zones():
+        state['keyLevels'] = key_levels(state['df'], state['snapshot'].spotPrice, 150)
+        return len(state['keyLevels'].df_filtered)
+
+    def analyze_cold():
+        state['memo'] = MemoCache()
+        analyze(state['snapshot'], state['df'], todayDate=QUOTE_DATE, memo=state['memo'])
+        return len(state['df'])
+
+    # Mismo snapshot otra vez: sólo el hash del chain
+    def analyze_memo():
+        analyze(state['snapshot'], state['df'], todayDate=QUOTE_DATE, memo=state['memo'])
+        return len(state['df'])
+
+    def scenarios():
+        state['scenarios'] = scenario_grid(state['df'], state['levels'], DEFAULT_VOL_SHIFTS)
+        return state['scenarios'].gex.size
+
+    def figures():
+        from gex.api import GexAnalysis
+        from gex import figures as F
+
+        a = GexAnalysis(ticker, state['snapshot'].spotPrice, state['snapshot'].timestamp, QUOTE_DATE, 150,
+                        state['df'], state['dfAgg'], state['levels'], *state['profile'], state['zeroGamma'],
+                        state['keyLevels'])
+        builds = [F.fig_total_gamma, F.fig_open_interest, F.fig_profile, F.fig_gex_by_strike,
+                  F.fig_open_interest_total, F.fig_zones, F.fig_cumulative]
+        state['figures'] = {build.__name__: build(a) for build in builds}
+        return len(state['figures'])
+
+    stages = [parse_json, stream_json, decode_symbols, merge, prepare, compact, groupby_strike, profile, zones,
+              analyze_cold, analyze_memo, scenarios]
+    try:
+        import plotly  # noqa: F401
+        stages.append(figures)
+    except ImportError:
+        pass
+    return state, stages
+
+
+# Mejor tiempo (pared y CPU) de cada etapa sobre `repeat` pasadas completas del pipeline
+def time_stages(raw, ticker, repeat):
+    best = {}
+    for _ in range(repeat):
+        state, stages = _stages(raw, ticker)
+        for stage in stages:
+            wall, cpu = time.perf_counter(), time.process_time()
+            rows = stage()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            prev = best.get(stage.__name__)
+            if prev is None or wall < prev['wall_ms']:
+                best[stage.__name__] = {'wall_ms': wall * 1000, 'cpu_ms': cpu * 1000, 'rows': rows}
+    return state, best
+
+
+# Memoria pica (tracemalloc) de cada etapa, en una pasada aparte para no sesgar los tiempos
+def measure_memory(raw, ticker, results):
+    _, stages = _stages(raw, ticker)
+    tracemalloc.start()
+    for stage in stages:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        stage()
+        results[stage.__name__]['peak_mb'] = (tracemalloc.get_traced_memory()[1] - base) / 1024**2
+    tracemalloc.stop()
+
+
+# Huella en memoria del chain: opciones crudas, chain ancho de pandas y chain compacto
+def footprint(state):
+    return {
+        'options_df': state['snapshot'].options_df.memory_usage(deep=True).sum() / 1024**2,
+        'chain_df': state['df'].memory_usage(deep=True).sum() / 1024**2,
+        'compact': state['compact'].nbytes / 1024**2,
+    }
+
+
+# Lo que cada figura envía al navegador: puntos, KB del JSON y tiempo de serialización
+def figure_sizes(state):
+    from gex.figures import figure_stats
+
+    sizes = {}
+    for name, fig in state.get('figures', {}).items():
+        start = time.perf_counter()
+        stats = figure_stats(fig)
+        sizes[name] = {'points': stats['points'], 'kb': stats['bytes'] / 1024,
+                       'json_ms': (time.perf_counter() - start) * 1000}
+    return sizes
+
+
+# Salidas numéricas que se comparan con los golden
+def outputs(state):
+    zeroGamma = state['zeroGamma']
+    return {
+        'totalGamma': np.asarray(state['profile'][0]).tolist(),
+        'totalGammaExNext': np.asarray(state['profile'][1]).tolist(),
+        'totalGammaExFri': np.asarray(state['profile'][2]).tolist(),
+        'zeroGamma': None if zeroGamma is None else float(zeroGamma),
+        'strikes': state['dfAgg'].index.to_numpy().tolist(),
+        'dfAggTotalGamma': state['dfAgg']['TotalGamma'].to_numpy().tolist(),
+    }
+
+
+def check_golden(ticker, fixtureHash, out, rtol):
+    path = GOLDEN_DIR / f"{ticker}.json"
+    if not path.exists():
+        return f"sin golden ({path.name}); use --update-golden"
+    golden = json.loads(path.read_text())
+    if golden['fixture_sha1'] != fixtureHash:
+        return "golden generado con otro fixture; use --update-golden"
+
+    errors = []
+    for key in ('totalGamma', 'totalGammaExNext', 'totalGammaExFri', 'strikes', 'dfAggTotalGamma'):
+        a, b = np.asarray(out[key], dtype=float), np.asarray(golden[key], dtype=float)
+        if a.shape != b.shape or not np.allclose(a, b, rtol=rtol, atol=1e-12, equal_nan=True):
+            errors.append(key)
+    if (out['zeroGamma'] is None) != (golden['zeroGamma'] is None) or (
+            out['zeroGamma'] is not None and not np.isclose(out['zeroGamma'], golden['zeroGamma'], rtol=rtol)):
+        errors.append('zeroGamma')
+    return f"DIFERENCIAS en {', '.join(errors)}" if errors else None
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Última ejecución registrada del ticker en esta máquina
+def last_record(ticker):
+    if not HISTORY.exists():
+        return None
+    last = None
+    for line in HISTORY.read_text().splitlines():
+        record = json.loads(line)
+        if record['ticker'] == ticker and record['machine'] == platform.node():
+            last = record
+    return last
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del pipeline GEX")
+    parser.add_argument("tickers", nargs="*", default=list(SPECS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Regresión máxima admitida por etapa (fracción)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignorar etapas más rápidas que esto al comparar")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="Tolerancia relativa frente a los golden")
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--no-history", action="store_true", help="No registrar la ejecución en el historial")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for ticker in args.tickers:
+        raw = fixture_bytes(ticker)
+        fixtureHash = hashlib.sha1(raw).hexdigest()
+        state, results = time_stages(raw, ticker, args.repeat)
+        measure_memory(raw, ticker, results)
+        out = outputs(state)
+
+        print(f"\n{ticker}  ({results['parse_json']['rows']} contratos)")
+        print(f"  {'etapa':<16}{'wall ms':>10}{'cpu ms':>10}{'pico MB':>10}{'filas':>8}")
+        for name, r in results.items():
+            print(f"  {name:<16}{r['wall_ms']:>10.2f}{r['cpu_ms']:>10.2f}{r['peak_mb']:>10.1f}{r['rows']:>8}")
+        memory = footprint(state)
+        print("  memoria MB: " + "  ".join(f"{k} {v:.2f}" for k, v in memory.items()))
+        sizes = figure_sizes(state)
+        if sizes:
+            print(f"  {'figura':<26}{'puntos':>8}{'KB':>10}{'json ms':>10}")
+            for name, f in sizes.items():
+                print(f"  {name:<26}{f['points']:>8}{f['kb']:>10.1f}{f['json_ms']:>10.2f}")
+            print(f"  {'total':<26}{sum(f['points'] for f in sizes.values()):>8}"
+                  f"{sum(f['kb'] for f in sizes.values()):>10.1f}{sum(f['json_ms'] for f in sizes.values()):>10.2f}")
+
+        if args.update_golden:
+            GOLDEN_DIR.mkdir(exist_ok=True)
+            (GOLDEN_DIR / f"{ticker}.json").write_text(json.dumps({'fixture_sha1': fixtureHash, **out}))
+            print("  golden actualizado")
+        else:
+            # Sin golden, o con uno de otro fixture, la equivalencia no se comprueba: también falla
+            problem = check_golden(ticker, fixtureHash, out, args.rtol)
+            if problem:
+                print(f"  golden: {problem}")
+                failed = True
+            else:
+                print("  golden: OK")
+
+        previous = last_record(ticker)
+        if previous:
+            for name, r in results.items():
+                before = previous['stages'].get(name, {}).get('wall_ms')
+                if before and max(before, r['wall_ms']) >= args.min_ms and r['wall_ms'] > before * (1 + args.tolerance):
+                    print(f"  REGRESIÓN {name}: {before:.2f} ms -> {r['wall_ms']:.2f} ms (commit {previous['commit']})")
+                    failed = True
+
+        if not args.no_history:
+            HISTORY.parent.mkdir(exist_ok=True)
+            record = {
+                'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'commit': _commit(), 'ticker': ticker,
+                'fixture_sha1': fixtureHash, 'machine': platform.node(), 'python': platform.python_version(),
+                'numpy': np.__version__, 'pandas': pd.__version__, 'cpus': os.cpu_count(), 'stages': results,
+                'memory_mb': memory, 'figures': sizes,
+            }
+            with open(HISTORY, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
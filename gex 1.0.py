@@ -1,16 +1,36 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import datetime
-import pytz
-import matplotlib.pyplot as plt
 import time
-import requests
-from datetime import datetime, timedelta, date
-from scipy.stats import norm
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from gex.api import analyze, prepared_chain
+from gex.cache import DEFAULT_TTL, ChainFetchError, SnapshotCache
+from gex.diagnostics import PROFILERS, Recorder, profiled, recording, span
+from gex.expiry import market_now
+from gex.figures import (
+    fig_cumulative,
+    fig_gex_by_strike,
+    fig_history_levels,
+    fig_open_interest,
+    fig_open_interest_total,
+    fig_profile,
+    fig_scenario_expiries,
+    fig_scenarios,
+    fig_strike_changes,
+    fig_total_gamma,
+    fig_vanna_charm,
+    fig_zones,
+    figure_stats,
+    live_figures,
+    update_live_figures,
+    update_live_levels,
+)
+from gex.history import HistoryStore
+from gex.memo import DEFAULT_MEMO_BYTES, MemoCache
+from gex.parallel import BACKENDS, default_workers
+from gex.profile import DEFAULT_MAX_BYTES, price_levels
+from gex.stream import GexStream
 
 # Configuración de la página
 st.set_page_config(
@@ -27,48 +47,265 @@ st.markdown("---")
 # Sidebar para parámetros
 st.sidebar.header("🎯 Parámetros de Análisis")
 ticker = st.sidebar.text_input("Ticker Symbol", value="SPX", help="Ejemplo: SPX, VIX, etc.")
-width = st.sidebar.number_input("Width (puntos)", min_value=50, max_value=500, value=150, step=10, 
-                                help="Rango de strikes alrededor del spot price")
+width = st.sidebar.slider("Width (puntos)", min_value=50, max_value=500, value=150, step=10,
+                         help="Rango de strikes alrededor del spot price; se aplica al instante sobre el último análisis")
+cacheTTL = st.sidebar.number_input("Caché TTL (segundos)", min_value=0, max_value=3600, value=DEFAULT_TTL, step=30,
+                                   help="Tiempo durante el cual se reutiliza el snapshot descargado")
+profileStep = st.sidebar.number_input("Resolución del perfil (puntos)", min_value=0.0, max_value=100.0, value=0.0, step=1.0,
+                                      help="Paso entre niveles del perfil gamma. 0 = 30 niveles")
+maxMemoryMB = st.sidebar.number_input("Memoria máx. del perfil (MB)", min_value=16, max_value=8192,
+                                      value=DEFAULT_MAX_BYTES // 1024**2, step=16,
+                                      help="Presupuesto de memoria para el cálculo por bloques")
+memoMB = st.sidebar.number_input("Caché de análisis (MB)", min_value=0, max_value=16384,
+                                 value=DEFAULT_MEMO_BYTES // 1024**2, step=64,
+                                 help="Memoria para reutilizar chains, perfiles y análisis ya calculados (LRU). 0 = sin caché")
+refineFlip = st.sidebar.checkbox("Refinar gamma flip", value=False,
+                                 help="Busca la raíz exacta del perfil alrededor del cambio de signo")
+backend = st.sidebar.selectbox("Backend de cálculo", BACKENDS, index=0,
+                               help="serial, threads o procesos con memoria compartida")
+workers = st.sidebar.number_input("Workers", min_value=1, max_value=256, value=default_workers(), step=1,
+                                  help="Número de workers para los backends paralelos")
+liveMode = st.sidebar.toggle("🔴 Modo en vivo", value=False,
+                             help="Consulta CBOE periódicamente y recalcula sólo los contratos que cambiaron")
+liveInterval = st.sidebar.number_input("Intervalo en vivo (segundos)", min_value=5, max_value=600, value=30, step=5)
+showScenarios = st.sidebar.checkbox("🌋 Escenarios de volatilidad", value=True,
+                                    help="Superficie de GEX sobre niveles de spot y desplazamientos paralelos de la IV")
+saveHistory = st.sidebar.checkbox("💾 Guardar en historial", value=True,
+                                  help="Registra cada análisis (niveles clave y GEX por strike) para compararlo en el tiempo")
+showDiagnostics = st.sidebar.checkbox("🩺 Diagnóstico", value=False,
+                                      help="Mide el tiempo, CPU, filas y memoria de cada etapa del análisis")
+traceMemory = st.sidebar.checkbox("Medir memoria (tracemalloc)", value=False, disabled=not showDiagnostics,
+                                  help="Añade la memoria por etapa; ralentiza el análisis")
+profiler = st.sidebar.selectbox("Perfilar ejecución", (None,) + PROFILERS, index=0,
+                                format_func=lambda p: p or "no", disabled=not showDiagnostics,
+                                help="Perfil completo de una ejecución con cProfile o pyinstrument")
+
+# Caché de snapshots compartida entre ejecuciones
+@st.cache_resource
+def getSnapshotCache():
+    return SnapshotCache()
+
+# Caché de etapas del análisis por contenido del snapshot, compartida entre ejecuciones
+@st.cache_resource
+def getMemoCache():
+    return MemoCache()
+
+# Historial de análisis compartido entre ejecuciones
+@st.cache_resource
+def getHistoryStore():
+    return HistoryStore()
+
+# Rangos del panel de historial: días hacia atrás (None = todo)
+HISTORY_RANGES = {"Hoy": 0, "5 días": 5, "20 días": 20, "Todo": None}
+
+# Panel de historial: cambios de los niveles clave y del GEX neto por strike en el tiempo
+def historyPanel(analysis):
+    st.subheader("🕒 Historial")
+    rangeName = st.radio("Rango", list(HISTORY_RANGES), index=1, horizontal=True, key="historyRange")
+    days = HISTORY_RANGES[rangeName]
+    # Días contados desde el día del snapshot analizado
+    snapshotDay = pd.Timestamp(analysis.timestamp or analysis.todayDate).normalize()
+    start = None if days is None else snapshotDay - pd.Timedelta(days=days)
+
+    store = getHistoryStore()
+    with span("history_query"):
+        levels = store.levels(analysis.ticker, start=start)
+        changes = store.strike_changes(analysis.ticker, start=start)
+    if len(levels) < 2:
+        st.info(f"Aún no hay snapshots anteriores de {analysis.ticker} en este rango para comparar.")
+        return
+
+    last, prev = levels.iloc[-1], levels.iloc[-2]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("💰 Spot", f"{last['spot']:,.2f}", f"{last['spot_change']:+,.2f}")
+    with col2:
+        flip = "-" if pd.isna(last['zero_gamma']) else f"{last['zero_gamma']:,.0f}"
+        st.metric("🎯 Gamma Flip", flip, None if pd.isna(last['zero_gamma_change']) else f"{last['zero_gamma_change']:+,.0f}")
+    with col3:
+        st.metric("📊 GEX total", f"${last['total_gamma']:.2f} Bn", f"{last['total_gamma_change']:+.2f}")
+    with col4:
+        st.metric("📏 Zona (mín-máx)", f"{last['min_gex_strike']:,.0f}-{last['max_gex_strike']:,.0f}",
+                  f"antes {prev['min_gex_strike']:,.0f}-{prev['max_gex_strike']:,.0f}", delta_color="off")
+
+    with span("fig_history_levels"):
+        st.plotly_chart(fig_history_levels(levels, analysis.ticker), use_container_width=True)
+    with span("fig_strike_changes"):
+        figD = fig_strike_changes(changes, analysis.ticker, analysis.spotPrice)
+        figD.update_layout(xaxis_range=[analysis.spotPrice - analysis.width, analysis.spotPrice + analysis.width])
+        st.plotly_chart(figD, use_container_width=True)
+
+# Perfiles que se muestran: gamma y el panel de vanna/charm (delta no se dibuja)
+DASHBOARD_GREEKS = ("gamma", "vanna", "charm")
+
+# Niveles de spot de la malla de escenarios (entre 0.8 y 1.2 veces el spot)
+SCENARIO_LEVELS = 81
+
+# Panel de escenarios: GEX sobre spot x desplazamiento de vol y desglose por vencimiento.
+# La malla queda en caché en el análisis: cambiar el width o el vencimiento no la recalcula
+def scenarioPanel(analysis):
+    st.subheader("🌋 Escenarios de volatilidad")
+    col1, col2 = st.columns(2)
+    with col1:
+        maxShift = st.slider("Desplazamiento máx. de IV (± puntos de vol)", min_value=1, max_value=30, value=10,
+                             key="scenarioMaxShift")
+    with col2:
+        shiftStep = st.select_slider("Paso (puntos de vol)", options=[0.5, 1.0, 2.0, 5.0], value=1.0,
+                                     key="scenarioStep")
+    # Simétricos alrededor de 0 (la IV cotizada siempre está en la malla)
+    upShifts = np.arange(0, maxShift + shiftStep / 2, shiftStep)
+    volShifts = np.concatenate([-upShifts[:0:-1], upShifts])
+    levels = price_levels(analysis.fromStrike, analysis.toStrike, num=SCENARIO_LEVELS)
+    grid = analysis.scenarios(volShifts, levels, max_bytes=maxMemoryMB * 1024**2, workers=workers,
+                              backend=backend)
+
+    flips = dict(zip(grid.volShifts, grid.flips()))
+    col1, col2, col3 = st.columns(3)
+    for col, shift in zip((col1, col2, col3), (grid.volShifts[0], 0.0, grid.volShifts[-1])):
+        with col:
+            flip = flips.get(shift)
+            st.metric(f"🎯 Gamma Flip (IV {shift:+g})", "-" if flip is None else f"{flip:,.0f}")
+    chart(fig_scenarios, grid, analysis.ticker, analysis.spotPrice)
+
+    expiryShift = st.select_slider("Desglose por vencimiento con IV desplazada (puntos de vol)",
+                                   options=grid.volShifts.tolist(), value=0.0, key="scenarioExpiryShift")
+    chart(fig_scenario_expiries, grid, analysis.ticker, expiryShift, analysis.spotPrice)
+
+# Tamaño y tiempos de cada figura de la ejecución actual (con diagnóstico activo)
+figureStats = {}
+
+# Construye y muestra una figura midiendo su tiempo como etapa propia; con diagnóstico
+# guarda además construcción, envío (serializar + st.plotly_chart) y tamaño del JSON
+def chart(build, *args):
+    with span(build.__name__) as s:
+        start = time.perf_counter()
+        fig = build(*args)
+        built = time.perf_counter()
+        st.plotly_chart(fig, use_container_width=True)
+        if showDiagnostics:
+            stats = figure_stats(fig)
+            s.rows = stats['points']
+            figureStats[build.__name__] = {'Puntos': stats['points'], 'KB': stats['bytes'] / 1024,
+                                           'Construcción (ms)': (built - start) * 1000,
+                                           'Envío (ms)': (time.perf_counter() - built) * 1000}
+
+# Panel de diagnóstico: tiempos por etapa, exportación y perfil
+def diagnosticsPanel(recorder, report):
+    with st.expander("🩺 Diagnóstico", expanded=True):
+        spans = pd.DataFrame(recorder.records())
+        total = spans.loc[spans['depth'] == 0, 'wall_ms'].sum()
+        st.metric("⏱️ Tiempo total medido", f"{total:,.0f} ms")
+        columns = ['name', 'wall_ms', 'cpu_ms', 'rows'] + (['mem_delta', 'mem_peak'] if recorder.memory else [])
+        table = spans[columns].copy()
+        if recorder.memory:
+            table[['mem_delta', 'mem_peak']] = table[['mem_delta', 'mem_peak']] / 1024**2
+        table.columns = ['Etapa', 'Wall (ms)', 'CPU (ms)', 'Filas'] + (['Δ Memoria (MB)', 'Pico (MB)'] if recorder.memory else [])
+        st.bar_chart(table.set_index('Etapa')['Wall (ms)'])
+        st.dataframe(table.round(2), use_container_width=True)
+        memoStats = getMemoCache().stats
+        st.caption(f"Caché de análisis: {memoStats['hits']} aciertos, {memoStats['misses']} fallos, "
+                   f"{memoStats['evictions']} desalojos, {memoStats['entries']} entradas, "
+                   f"{memoStats['bytes'] / 1024**2:,.1f} MB")
+        if figureStats:
+            sizes = pd.DataFrame.from_dict(figureStats, orient='index').rename_axis('Figura')
+            st.caption(f"Figuras: {sizes['KB'].sum():,.0f} KB enviados al navegador")
+            st.dataframe(sizes.round(1), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇️ JSON", recorder.to_json(indent=2), file_name=f"gex_timings_{ticker}.json")
+        with col2:
+            st.download_button("⬇️ Prometheus", recorder.to_prometheus(), file_name=f"gex_timings_{ticker}.prom")
+        if report is not None:
+            st.text(report.text)
+
+# Panel en vivo: se re-ejecuta cada liveInterval segundos sin recargar la página
+@st.fragment(run_every=liveInterval)
+def livePanel():
+    streamKey = (ticker, profileStep)
+    if st.session_state.get('liveStreamKey') != streamKey:
+        st.session_state['liveStreamKey'] = streamKey
+        st.session_state['liveStream'] = GexStream(ticker, SnapshotCache(ttl=0), profileStep=profileStep,
+                                                   width=width, nearSpot=0.05, max_bytes=maxMemoryMB * 1024**2)
+        st.session_state['liveFigs'] = live_figures()
+    stream = st.session_state['liveStream']
+    figs = st.session_state['liveFigs']
+
+    try:
+        if stream.poll():
+            update_live_figures(figs, stream)
+    except ChainFetchError as e:
+        st.error(str(e))
+    # Mover el width sólo recorta las zonas clave del índice del stream
+    if stream.width != width and stream.keyLevels is not None:
+        stream.set_width(width)
+        update_live_levels(figs, stream)
+    if stream.chain is None:
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("💰 Spot Price", f"${stream.spotPrice:,.2f}")
+    with col2:
+        st.metric("🎯 Gamma Flip", f"{stream.zeroGamma:,.0f}" if stream.zeroGamma is not None else "-")
+    with col3:
+        st.metric("🔄 Contratos recalculados", f"{stream.lastChanged:,}")
+    with col4:
+        st.metric("🕒 Snapshot", f"{stream.timestamp}")
+
+    for fig in figs:
+        st.plotly_chart(fig, use_container_width=True)
 
 # Botón para ejecutar análisis
-if st.sidebar.button("🚀 Ejecutar Análisis", type="primary"):
-    
-    # Función para calcular Gamma Exposure basado en Black-Scholes
-    @st.cache_data
-    def calcGammaEx(S, K, vol, T, r, q, optType, OI):
-        if T == 0 or vol == 0:
-            return 0
-
-        dp = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / (vol*np.sqrt(T))
-        dm = dp - vol*np.sqrt(T) 
-
-        if optType == 'call':
-            gamma = np.exp(-q*T) * norm.pdf(dp) / (S * vol * np.sqrt(T))
-            return OI * 100 * S * S * 0.01 * gamma 
-        else:  # Gamma is same for calls and puts
-            gamma = K * np.exp(-r*T) * norm.pdf(dm) / (S * S * vol * np.sqrt(T))
-            return OI * 100 * S * S * 0.01 * gamma 
-
-    # Función para detectar el tercer viernes del mes
-    def isThirdFriday(d):
-        return d.weekday() == 4 and 15 <= d.day <= 21
+if liveMode:
+    st.subheader(f"🔴 {ticker} en vivo (cada {liveInterval} s)")
+    livePanel()
 
+elif (runClicked := st.sidebar.button("🚀 Ejecutar Análisis", type="primary")) or \
+        st.session_state.get('analysisKey') == (ticker, profileStep, refineFlip):
+    
     try:
         # Mostrar spinner durante la carga
-        with st.spinner(f'Descargando datos para {ticker}...'):
-            
-            # Descargar datos desde CBOE
-            url = f"https://cdn.cboe.com/api/global/delayed_quotes/options/_{ticker}.json"
-            response = requests.get(url)
-            
-            if response.status_code != 200:
-                st.error(f"Error al descargar datos para {ticker}. Código de estado: {response.status_code}")
-                st.stop()
+        recorder = Recorder(memory=traceMemory, labels={'ticker': ticker}) if showDiagnostics else None
+        with st.spinner(f'Descargando datos para {ticker}...'), recording(recorder), \
+                profiled(profiler if showDiagnostics else None) as report:
+            
+            if runClicked:
+                # Descargar datos desde CBOE (o reutilizar el snapshot en caché)
+                snapshotCache = getSnapshotCache()
+                snapshotCache.ttl = cacheTTL
+                try:
+                    snapshot = snapshotCache.load(ticker)
+                except ChainFetchError as e:
+                    st.error(str(e))
+                    st.stop()
                 
-            options = response.json()
-            
+                # Cargar chain y ejecutar el pipeline completo (GEX, perfil, gamma flip y zonas);
+                # con la caché, un snapshot ya analizado no se recalcula
+                memo = getMemoCache()
+                memo.max_bytes = memoMB * 1024**2
+                if not memoMB:
+                    memo.clear()
+                    memo = None
+                chain = prepared_chain(snapshot, memo)
+                # Se valora en el momento de la cotización (con o sin caché): el mismo snapshot da
+                # siempre el mismo resultado
+                st.session_state['analysis'] = analyze(snapshot, chain, width=width, profileStep=profileStep,
+                                                       refineFlip=refineFlip, max_bytes=maxMemoryMB * 1024**2,
+                                                       workers=workers, backend=backend, greeks=DASHBOARD_GREEKS,
+                                                       todayDate=snapshot.quote_time() or market_now(), memo=memo)
+                st.session_state['analysisKey'] = (ticker, profileStep, refineFlip)
+                if saveHistory:
+                    with span("history_record"):
+                        getHistoryStore().record(st.session_state['analysis'])
+
+            # Mover el width sólo recorta el índice por strike del último análisis: nada se recalcula
+            with span("width_window"):
+                analysis = st.session_state['analysis'].with_width(width)
+            kl = analysis.keyLevels
+
             # Spot Price
-            spotPrice = options["data"]["close"]
+            spotPrice = analysis.spotPrice
             spot = spotPrice
             
             # Mostrar información del spot
@@ -81,289 +318,30 @@ if st.sidebar.button("🚀 Ejecutar Análisis", type="primary"):
                 st.metric("📏 Width", f"±{width} pts")
             
             st.markdown("---")
-            
-            fromStrike = 0.8 * spotPrice
-            toStrike = 1.2 * spotPrice
-
-            # Cargar datos en DataFrame
-            data_df = pd.DataFrame(options["data"]["options"])
-
-            data_df['CallPut'] = data_df['option'].str.slice(start=-9,stop=-8)
-            data_df['ExpirationDate'] = data_df['option'].str.slice(start=-15,stop=-9)
-            data_df['ExpirationDate'] = pd.to_datetime(data_df['ExpirationDate'], format='%y%m%d')
-            data_df['Strike'] = data_df['option'].str.slice(start=-8,stop=-3).str.lstrip('0')
-
-            # Separar calls y puts
-            data_df_calls = data_df.loc[data_df['CallPut'] == "C"].reset_index(drop=True)
-            data_df_puts = data_df.loc[data_df['CallPut'] == "P"].reset_index(drop=True)
-
-            # Construir DataFrame combinado calls y puts
-            df_calls = data_df_calls[['ExpirationDate','option','last_trade_price','change','bid','ask','volume','iv','delta','gamma','open_interest','Strike']]
-            df_puts = data_df_puts[['ExpirationDate','option','last_trade_price','change','bid','ask','volume','iv','delta','gamma','open_interest','Strike']]
-            df_puts.columns = ['put_exp','put_option','put_last_trade_price','put_change','put_bid','put_ask','put_volume','put_iv','put_delta','put_gamma','put_open_interest','put_strike']
-
-            df = pd.concat([df_calls, df_puts], axis=1)
-
-            # Verificar que las expiraciones y strikes coinciden
-            df['check'] = np.where((df['ExpirationDate'] == df['put_exp']) & (df['Strike'] == df['put_strike']), 0, 1)
-            if df['check'].sum() != 0:
-                st.error("PUT CALL MERGE FAILED - OPTIONS ARE MISMATCHED.")
-                st.stop()
-
-            df.drop(['put_exp', 'put_strike', 'check'], axis=1, inplace=True)
-
-            # Renombrar columnas para mejor claridad
-            df.columns = ['ExpirationDate','Calls','CallLastSale','CallNet','CallBid','CallAsk','CallVol',
-                          'CallIV','CallDelta','CallGamma','CallOpenInt','StrikePrice','Puts','PutLastSale',
-                          'PutNet','PutBid','PutAsk','PutVol','PutIV','PutDelta','PutGamma','PutOpenInt']
-
-            # Tipos y formatos
-            df['ExpirationDate'] = pd.to_datetime(df['ExpirationDate'])
-            df['ExpirationDate'] = df['ExpirationDate'] + timedelta(hours=16)
-            df['StrikePrice'] = df['StrikePrice'].astype(float)
-            df['CallIV'] = df['CallIV'].astype(float)
-            df['PutIV'] = df['PutIV'].astype(float)
-            df['CallGamma'] = df['CallGamma'].astype(float)
-            df['PutGamma'] = df['PutGamma'].astype(float)
-            df['CallOpenInt'] = df['CallOpenInt'].astype(float)
-            df['PutOpenInt'] = df['PutOpenInt'].astype(float)
-
-            # Calcular Gamma Exposure
-            df['CallGEX'] = df['CallGamma'] * df['CallOpenInt'] * 100 * spotPrice * spotPrice * 0.01
-            df['PutGEX'] = df['PutGamma'] * df['PutOpenInt'] * 100 * spotPrice * spotPrice * 0.01 * -1
-            df['TotalGamma'] = (df.CallGEX + df.PutGEX) / 10**9
-
-            dfAgg = df.groupby(['StrikePrice']).sum(numeric_only=True)
-            strikes = dfAgg.index.values
 
             # === GRÁFICO 1: Total Gamma Exposure ===
             st.subheader("📊 Total Gamma Exposure")
-            
-            fig1 = go.Figure()
-            fig1.add_trace(go.Bar(
-                x=strikes,
-                y=dfAgg['TotalGamma'].to_numpy(),
-                name="Gamma Exposure",
-                marker_color='lightblue',
-                marker_line_color='black',
-                marker_line_width=0.5
-            ))
-            
-            fig1.add_vline(x=spotPrice, line_dash="dash", line_color="red", 
-                          annotation_text=f"{ticker} Spot: {spotPrice:,.0f}")
-            
-            fig1.update_layout(
-                title=f"Total Gamma: ${df['TotalGamma'].sum():.2f} Bn per 1% {ticker} Move",
-                xaxis_title="Strike",
-                yaxis_title="Spot Gamma Exposure ($ billions/1% move)",
-                showlegend=True,
-                height=500,
-                xaxis_range=[fromStrike, toStrike]
-            )
-            
-            st.plotly_chart(fig1, use_container_width=True)
+            chart(fig_total_gamma, analysis)
 
             # === GRÁFICO 2: Open Interest ===
             st.subheader("📈 Open Interest - Calls vs Puts")
-            
-            fig2 = go.Figure()
-            fig2.add_trace(go.Bar(
-                x=strikes,
-                y=dfAgg['CallOpenInt'].to_numpy(),
-                name="Call OI",
-                marker_color='green',
-                marker_line_color='black',
-                marker_line_width=0.5
-            ))
-            fig2.add_trace(go.Bar(
-                x=strikes,
-                y=-1 * dfAgg['PutOpenInt'].to_numpy(),
-                name="Put OI",
-                marker_color='red',
-                marker_line_color='black',
-                marker_line_width=0.5
-            ))
-            
-            fig2.add_vline(x=spotPrice, line_dash="dash", line_color="red",
-                          annotation_text=f"{ticker} Spot: {spotPrice:,.0f}")
-            
-            fig2.update_layout(
-                title=f"Total Open Interest for {ticker}",
-                xaxis_title="Strike",
-                yaxis_title="Open Interest (number of contracts)",
-                showlegend=True,
-                height=500,
-                xaxis_range=[fromStrike, toStrike]
-            )
-            
-            st.plotly_chart(fig2, use_container_width=True)
+            chart(fig_open_interest, analysis)
 
             # === PERFIL GAMMA EXPOSURE ===
             st.subheader("🎯 Perfil de Gamma Exposure")
-            
-            levels = np.linspace(fromStrike, toStrike, 30)
-            todayDate = date.today()
-            df['daysTillExp'] = [1/262 if (np.busday_count(todayDate, x.date())) == 0 else np.busday_count(todayDate, x.date())/262 for x in df.ExpirationDate]
-
-            nextExpiry = df['ExpirationDate'].min()
-            df['IsThirdFriday'] = [isThirdFriday(x) for x in df.ExpirationDate]
-            thirdFridays = df.loc[df['IsThirdFriday'] == True]
-            nextMonthlyExp = thirdFridays['ExpirationDate'].min()
-
-            totalGamma = []
-            totalGammaExNext = []
-            totalGammaExFri = []
-
-            for level in levels:
-                df['callGammaEx'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], row['CallIV'], 
-                                                                    row['daysTillExp'], 0, 0, "call", row['CallOpenInt']), axis=1)
-                df['putGammaEx'] = df.apply(lambda row: calcGammaEx(level, row['StrikePrice'], row['PutIV'], 
-                                                                   row['daysTillExp'], 0, 0, "put", row['PutOpenInt']), axis=1)    
-
-                totalGamma.append(df['callGammaEx'].sum() - df['putGammaEx'].sum())
-
-                exNxt = df.loc[df['ExpirationDate'] != nextExpiry]
-                totalGammaExNext.append(exNxt['callGammaEx'].sum() - exNxt['putGammaEx'].sum())
-
-                exFri = df.loc[df['ExpirationDate'] != nextMonthlyExp]
-                totalGammaExFri.append(exFri['callGammaEx'].sum() - exFri['putGammaEx'].sum())
-
-            totalGamma = np.array(totalGamma) / 10**9
-            totalGammaExNext = np.array(totalGammaExNext) / 10**9
-            totalGammaExFri = np.array(totalGammaExFri) / 10**9
-
-            # Encontrar punto de flip gamma
-            zeroCrossIdx = np.where(np.diff(np.sign(totalGamma)))[0]
-            if len(zeroCrossIdx) > 0:
-                negGamma = totalGamma[zeroCrossIdx]
-                posGamma = totalGamma[zeroCrossIdx+1]
-                negStrike = levels[zeroCrossIdx]
-                posStrike = levels[zeroCrossIdx+1]
-                zeroGamma = posStrike - ((posStrike - negStrike) * posGamma/(posGamma - negGamma))
-                zeroGamma = zeroGamma[0]
-            else:
-                zeroGamma = None
+            chart(fig_profile, analysis)
 
-            fig3 = go.Figure()
-            fig3.add_trace(go.Scatter(x=levels, y=totalGamma, mode='lines', name='All Expiries', line=dict(color='blue')))
-            fig3.add_trace(go.Scatter(x=levels, y=totalGammaExNext, mode='lines', name='Ex-Next Expiry', line=dict(color='orange')))
-            fig3.add_trace(go.Scatter(x=levels, y=totalGammaExFri, mode='lines', name='Ex-Next Monthly Expiry', line=dict(color='green')))
-            
-            fig3.add_vline(x=spotPrice, line_dash="dash", line_color="red",
-                          annotation_text=f"{ticker} Spot: {spotPrice:,.0f}")
-            
-            if zeroGamma is not None:
-                fig3.add_vline(x=zeroGamma, line_dash="dash", line_color="green",
-                              annotation_text=f"Gamma Flip: {zeroGamma:,.0f}")
-            
-            fig3.add_hline(y=0, line_dash="solid", line_color="grey")
-            
-            fig3.update_layout(
-                title=f"Gamma Exposure Profile, {ticker}, {todayDate.strftime('%d %b %Y')}",
-                xaxis_title="Index Price",
-                yaxis_title="Gamma Exposure ($ billions/1% move)",
-                showlegend=True,
-                height=500,
-                xaxis_range=[fromStrike, toStrike]
-            )
-            
-            st.plotly_chart(fig3, use_container_width=True)
-
-            # === PROCESAMIENTO GEX FILTRADO ===
-            required_cols = ['CallGamma', 'CallOpenInt', 'PutGamma', 'PutOpenInt', 'StrikePrice']
-            for col in required_cols:
-                if col not in df.columns:
-                    df[col] = np.nan
-
-            # Calcular GEX
-            mult = 100 * 100
-            df['call_gex'] = df['CallGamma'] * df['CallOpenInt'] * mult
-            df['put_gex'] = df['PutGamma'] * df['PutOpenInt'] * mult
-            df['net_gex'] = df['call_gex'] - df['put_gex']
-
-            # Filtro ±width puntos desde el spot
-            lower_bound = spot - width
-            upper_bound = spot + width
-
-            df_filtered = df[
-                (df['net_gex'].notna()) &
-                (df['StrikePrice'].notna()) &
-                (df['StrikePrice'] >= lower_bound) &
-                (df['StrikePrice'] <= upper_bound)
-            ].sort_values(by='StrikePrice').reset_index(drop=True)
-
-            # Identificar máximo y mínimo GEX
-            max_gex = df_filtered.loc[df_filtered['net_gex'].idxmax()]
-            min_gex = df_filtered.loc[df_filtered['net_gex'].idxmin()]
-            pos = df_filtered[df_filtered['net_gex'] > 0]
-            neg = df_filtered[df_filtered['net_gex'] < 0]
-
-            # Calcular OI total y zonas de alto interés abierto
-            df_filtered['total_oi'] = df_filtered['CallOpenInt'] + df_filtered['PutOpenInt']
-            oi_threshold = np.percentile(df_filtered['total_oi'], 75)
-            high_oi = df_filtered[df_filtered['total_oi'] >= oi_threshold]
+            # === PERFIL DE VANNA Y CHARM ===
+            st.subheader("🌀 Vanna y Charm Exposure")
+            chart(fig_vanna_charm, analysis)
 
             # === GRÁFICO 4: GEX por Strike ===
             st.subheader("⚡ GEX por Strike")
-            
-            fig4 = go.Figure()
-            if len(pos) > 0:
-                fig4.add_trace(go.Bar(
-                    x=pos['StrikePrice'],
-                    y=pos['net_gex'],
-                    name='GEX Positivo',
-                    marker_color='limegreen',
-                    marker_line_color='black',
-                    marker_line_width=0.8
-                ))
-            
-            if len(neg) > 0:
-                fig4.add_trace(go.Bar(
-                    x=neg['StrikePrice'],
-                    y=neg['net_gex'],
-                    name='GEX Negativo',
-                    marker_color='red',
-                    marker_line_color='black',
-                    marker_line_width=0.8
-                ))
-            
-            fig4.add_hline(y=0, line_dash="dash", line_color="black")
-            fig4.add_vline(x=spot, line_dash="dash", line_color="black")
-            
-            fig4.update_layout(
-                title=f'{ticker} GEX x STK (±{width} pts del Spot {int(spot)})',
-                xaxis_title="Strike",
-                yaxis_title="Net GEX",
-                showlegend=True,
-                height=500
-            )
-            
-            st.plotly_chart(fig4, use_container_width=True)
+            chart(fig_gex_by_strike, analysis)
 
             # === GRÁFICO 5: Open Interest Total ===
             st.subheader("📊 Open Interest Total por Strike")
-            
-            fig5 = go.Figure()
-            fig5.add_trace(go.Bar(
-                x=df_filtered['StrikePrice'],
-                y=df_filtered['total_oi'],
-                name='Open Interest Total',
-                marker_color='orange',
-                marker_line_color='black',
-                marker_line_width=0.8
-            ))
-            
-            fig5.add_vline(x=spot, line_dash="dash", line_color="black")
-            
-            fig5.update_layout(
-                title=f'OIT x Strike (±{width} pts del Spot {int(spot)})',
-                xaxis_title="Strike",
-                yaxis_title="Open Interest Total",
-                showlegend=True,
-                height=500
-            )
-            
-            st.plotly_chart(fig5, use_container_width=True)
+            chart(fig_open_interest_total, analysis)
 
             # === GRÁFICO 6: Zonas Gamma ===
             st.subheader("🎯 Zonas Clave Gamma y Open Interest")
@@ -371,100 +349,32 @@ if st.sidebar.button("🚀 Ejecutar Análisis", type="primary"):
             # Información clave
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("🔴 Mín GEX", f"{int(min_gex['StrikePrice'])}")
+                st.metric("🔴 Mín GEX", f"{int(kl.min_gex['StrikePrice'])}")
             with col2:
-                st.metric("🟢 Máx GEX", f"{int(max_gex['StrikePrice'])}")
+                st.metric("🟢 Máx GEX", f"{int(kl.max_gex['StrikePrice'])}")
             with col3:
                 st.metric("📍 Spot", f"{int(spot)}")
             with col4:
-                zona_gamma = abs(max_gex['StrikePrice'] - min_gex['StrikePrice'])
-                st.metric("📏 Zona Gamma", f"{zona_gamma:.0f} pts")
-
-            # Filtro más estricto para picos de OI
-            threshold_oi = high_oi['total_oi'].quantile(0.90)
-            high_oi_filtered = high_oi[high_oi['total_oi'] >= threshold_oi]
+                st.metric("📏 Zona Gamma", f"{kl.zona_gamma:.0f} pts")
 
-            # Crear gráfico de zonas
-            fig6 = go.Figure()
-            
-            # Zona gamma (área sombreada)
-            fig6.add_vrect(
-                x0=min_gex['StrikePrice'], x1=max_gex['StrikePrice'],
-                fillcolor="lightgreen", opacity=0.3,
-                layer="below", line_width=0
-            )
-            
-            # Líneas verticales para picos de OI
-            for _, row in high_oi_filtered.iterrows():
-                strike = row['StrikePrice']
-                fig6.add_vline(x=strike, line_dash="dash", line_color="orange", opacity=0.6)
-            
-            # Línea vertical para spot
-            fig6.add_vline(x=spot, line_dash="dash", line_color="black", line_width=2)
-            
-            fig6.update_layout(
-                title='Zonas clave Gamma y Open Interest',
-                xaxis_title="Strike",
-                yaxis_title="Nivel",
-                showlegend=True,
-                height=500,
-                xaxis_range=[min_gex['StrikePrice'] - 200, max_gex['StrikePrice'] + 200]
-            )
-            
-            st.plotly_chart(fig6, use_container_width=True)
+            chart(fig_zones, analysis)
 
             # === GRÁFICO 7: Gamma Acumulado ===
             st.subheader("📈 Gamma Exposure Acumulado")
-            
-            df_sorted = df_filtered.sort_values(by='StrikePrice').reset_index(drop=True)
-            df_sorted['cumulative_gex'] = df_sorted['net_gex'].cumsum()
+            chart(fig_cumulative, analysis)
 
-            fig7 = go.Figure()
-            
-            # Zona gamma
-            fig7.add_vrect(
-                x0=min_gex['StrikePrice'], x1=max_gex['StrikePrice'],
-                fillcolor="lightgreen", opacity=0.3,
-                layer="below", line_width=0
-            )
-            
-            # Barras de GEX neto
-            fig7.add_trace(go.Bar(
-                x=df_sorted['StrikePrice'],
-                y=df_sorted['net_gex'],
-                name='GEX Neto',
-                marker_color='lightblue',
-                opacity=0.5
-            ))
-            
-            # Línea de GEX acumulado
-            fig7.add_trace(go.Scatter(
-                x=df_sorted['StrikePrice'],
-                y=df_sorted['cumulative_gex'],
-                mode='lines',
-                name='GEX Acumulado',
-                line=dict(color='blue', width=2)
-            ))
-            
-            # Línea vertical spot
-            fig7.add_vline(x=spot, line_dash="dash", line_color="black", line_width=2)
-            
-            fig7.update_layout(
-                title=f'{ticker} Gamma Exposure Acumulado (Cumulative GEX)',
-                xaxis_title="Strike",
-                yaxis_title="GEX Acumulado",
-                showlegend=True,
-                height=500,
-                xaxis_range=[min_gex['StrikePrice'] - 200, max_gex['StrikePrice'] + 200]
-            )
-            
-            st.plotly_chart(fig7, use_container_width=True)
+            # === ESCENARIOS DE VOLATILIDAD ===
+            if showScenarios:
+                scenarioPanel(analysis)
+
+            # === HISTORIAL ===
+            historyPanel(analysis)
 
             # === RECOMENDACIONES ===
             st.subheader("💡 Recomendaciones para 0DTE")
             
             # Determinar si está dentro o fuera de la zona gamma
-            if min_gex['StrikePrice'] <= spot <= max_gex['StrikePrice']:
+            if kl.in_zone:
                 zona_status = "🟢 DENTRO de la zona gamma"
                 zona_desc = "Probable consolidación y menor volatilidad"
             else:
@@ -501,12 +411,15 @@ if st.sidebar.button("🚀 Ejecutar Análisis", type="primary"):
             st.subheader("📊 Datos Filtrados")
             
             # Mostrar tabla con datos clave
-            display_df = df_filtered[['StrikePrice', 'net_gex', 'total_oi', 'CallOpenInt', 'PutOpenInt']].copy()
+            display_df = kl.df_filtered[['StrikePrice', 'net_gex', 'total_oi', 'CallOpenInt', 'PutOpenInt']].copy()
             display_df = display_df.round(2)
             display_df.columns = ['Strike', 'Net GEX', 'Total OI', 'Call OI', 'Put OI']
             
             st.dataframe(display_df, use_container_width=True)
 
+        if recorder is not None:
+            diagnosticsPanel(recorder, report)
+
     except Exception as e:
         st.error(f"Error durante el análisis: {str(e)}")
         st.info("Verifique que el ticker sea válido y que los datos estén disponibles en CBOE.")
@@ -0,0 +1,82 @@
+# Motor de cálculo de Gamma Exposure (GEX), sin dependencias de interfaz.
+# Las figuras Plotly están en gex.figures y se importan bajo demanda.
+from .api import GexAnalysis, analyze, load_chain, prepared_chain, strike_table
+from .cache import ChainFetchError, Snapshot, SnapshotCache
+from .chain import add_time_to_expiry, expiry_buckets, merge_calls_puts, prepare_chain
+from .compact import CompactChain
+from .diagnostics import Recorder, profiled, recording, span
+from .expiry import market_holidays, market_now, time_to_expiry
+from .exposure import aggregate_by_strike, compute_gex
+from .fetch import FetchResult, fetch_all
+from .greeks import GREEKS, exposure_matrices, norm_pdf
+from .history import HistoryStore
+from .ingest import ChainDecoder, read_chain
+from .levels import KeyLevels, StrikeIndex, key_levels, net_gex
+from .memo import DEFAULT_MEMO_BYTES, MemoCache, chain_hash, content_hash, snapshot_hash
+from .occ import CALL, PUT, parse_occ
+from .parallel import BACKENDS, default_workers
+from .profile import (
+    DEFAULT_MAX_BYTES,
+    calcGammaEx,
+    exposure_profiles,
+    gamma_flip,
+    gamma_profile,
+    price_levels,
+)
+from .scenario import DEFAULT_VOL_SHIFTS, ScenarioGrid, scenario_grid
+
+__all__ = [
+    "BACKENDS",
+    "CALL",
+    "DEFAULT_MAX_BYTES",
+    "DEFAULT_MEMO_BYTES",
+    "DEFAULT_VOL_SHIFTS",
+    "GREEKS",
+    "PUT",
+    "ChainDecoder",
+    "ChainFetchError",
+    "CompactChain",
+    "FetchResult",
+    "GexAnalysis",
+    "HistoryStore",
+    "KeyLevels",
+    "MemoCache",
+    "Recorder",
+    "ScenarioGrid",
+    "Snapshot",
+    "SnapshotCache",
+    "StrikeIndex",
+    "add_time_to_expiry",
+    "aggregate_by_strike",
+    "analyze",
+    "calcGammaEx",
+    "chain_hash",
+    "compute_gex",
+    "content_hash",
+    "default_workers",
+    "expiry_buckets",
+    "exposure_matrices",
+    "exposure_profiles",
+    "fetch_all",
+    "gamma_flip",
+    "gamma_profile",
+    "key_levels",
+    "load_chain",
+    "market_holidays",
+    "market_now",
+    "merge_calls_puts",
+    "net_gex",
+    "norm_pdf",
+    "parse_occ",
+    "prepare_chain",
+    "prepared_chain",
+    "price_levels",
+    "profiled",
+    "read_chain",
+    "recording",
+    "scenario_grid",
+    "snapshot_hash",
+    "span",
+    "strike_table",
+    "time_to_expiry",
+]
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from .cache import Snapshot, SnapshotCache
+from .chain import add_time_to_expiry, expiry_buckets
+from .compact import CompactChain
+from .diagnostics import span
+from .expiry import market_now
+from .exposure import compute_gex
+from .levels import KeyLevels, StrikeIndex
+from .memo import MemoCache, chain_hash, snapshot_hash
+from .profile import DEFAULT_MAX_BYTES, exposure_profiles, gamma_flip, price_levels
+from .scenario import DEFAULT_VOL_SHIFTS, ScenarioGrid, scenario_grid
+
+# Mallas de escenarios guardadas por análisis (las más antiguas se descartan)
+_MAX_SCENARIOS = 8
+
+
+# Resultado completo de un análisis GEX para un snapshot
+@dataclass
+class GexAnalysis:
+    ticker: str
+    spotPrice: float
+    timestamp: str | None
+    todayDate: date
+    width: float
+    df: pd.DataFrame
+    dfAgg: pd.DataFrame
+    levels: np.ndarray
+    totalGamma: np.ndarray
+    totalGammaExNext: np.ndarray
+    totalGammaExFri: np.ndarray
+    zeroGamma: float | None
+    keyLevels: KeyLevels
+    # Perfiles de vanna (VEX), charm (CEX) y delta (DEX) de todos los vencimientos, si se calcularon
+    totalVanna: np.ndarray | None = None
+    totalCharm: np.ndarray | None = None
+    totalDelta: np.ndarray | None = None
+    # Índice por strike del snapshot: permite cambiar el width sin recalcular nada
+    strikeIndex: StrikeIndex | None = None
+    # Mallas de escenarios ya calculadas (scenarios), compartidas por las copias de with_width
+    scenarioCache: dict = field(default_factory=dict, repr=False, compare=False)
+
+    # Mismo análisis con otro width: sólo se recalculan las zonas clave, desde el índice
+    def with_width(self, width: float) -> GexAnalysis:
+        if width == self.width:
+            return self
+        index = self.strikeIndex or StrikeIndex(self.df)
+        return replace(self, width=width, keyLevels=index.key_levels(self.spotPrice, width), strikeIndex=index)
+
+    # Malla de escenarios spot x vol del snapshot (por defecto sobre los niveles del perfil),
+    # en caché por parámetros: repetir la vista o cambiar el width no recalcula nada
+    def scenarios(self, volShifts=DEFAULT_VOL_SHIFTS, levels=None, r: float = 0, q: float = 0,
+                  max_bytes: int = DEFAULT_MAX_BYTES, workers: int | None = None,
+                  backend: str = "serial") -> ScenarioGrid:
+        levels = self.levels if levels is None else np.asarray(levels, dtype=float)
+        volShifts = np.asarray(volShifts, dtype=float)
+        key = (levels.tobytes(), volShifts.tobytes(), r, q)
+        grid = self.scenarioCache.get(key)
+        if grid is None:
+            with span("scenario_grid", rows=len(self.df) * len(levels) * len(volShifts)):
+                grid = scenario_grid(self.df, levels, volShifts, r, q, max_bytes, workers, backend)
+            while len(self.scenarioCache) >= _MAX_SCENARIOS:
+                self.scenarioCache.pop(next(iter(self.scenarioCache)))
+            self.scenarioCache[key] = grid
+        return grid
+
+    @property
+    def fromStrike(self) -> float:
+        return 0.8 * self.spotPrice
+
+    @property
+    def toStrike(self) -> float:
+        return 1.2 * self.spotPrice
+
+    # Resumen serializable a JSON (niveles clave, perfil y agregados por strike)
+    def to_dict(self) -> dict:
+        kl = self.keyLevels
+        return {
+            "ticker": self.ticker,
+            "timestamp": self.timestamp,
+            "date": self.todayDate.isoformat(),
+            "spot": self.spotPrice,
+            "width": self.width,
+            "total_gamma": float(self.df['TotalGamma'].sum()),
+            "zero_gamma": None if self.zeroGamma is None else float(self.zeroGamma),
+            "max_gex_strike": float(kl.max_gex['StrikePrice']),
+            "min_gex_strike": float(kl.min_gex['StrikePrice']),
+            "zona_gamma": float(kl.zona_gamma),
+            "in_zone": kl.in_zone,
+            "high_oi_strikes": kl.high_oi_filtered['StrikePrice'].tolist(),
+            "profile": {
+                "levels": self.levels.tolist(),
+                "totalGamma": self.totalGamma.tolist(),
+                "totalGammaExNext": self.totalGammaExNext.tolist(),
+                "totalGammaExFri": self.totalGammaExFri.tolist(),
+                **{name: values.tolist() for name, values in (("totalVanna", self.totalVanna),
+                                                              ("totalCharm", self.totalCharm),
+                                                              ("totalDelta", self.totalDelta))
+                   if values is not None},
+            },
+            "strikes": strike_table(self).to_dict(orient="records"),
+        }
+
+
+# Tabla por strike: GEX total, open interest y GEX neto
+def strike_table(analysis: GexAnalysis) -> pd.DataFrame:
+    table = analysis.dfAgg[['TotalGamma', 'CallOpenInt', 'PutOpenInt']].copy()
+    table['net_gex'] = analysis.df.groupby('StrikePrice')['net_gex'].sum()
+    return table.reset_index()
+
+
+# Snapshot y chain compacto de un ticker (CBOE a través de la caché, o un JSON guardado).
+# `snapshot` reutiliza uno ya descargado, p.ej. por SnapshotCache.load_many
+def load_chain(ticker: str, cache: SnapshotCache | None = None, path: str | None = None,
+               snapshot: Snapshot | None = None, memo: MemoCache | None = None) -> tuple[Snapshot, CompactChain]:
+    if snapshot is None:
+        cache = cache or SnapshotCache()
+        snapshot = cache.load_file(ticker, path) if path else cache.load(ticker)
+    return snapshot, prepared_chain(snapshot, memo)
+
+
+# Chain compacto de un snapshot; con `memo`, en caché por el hash del snapshot (no modificarlo).
+# El memo guarda el CompactChain y no el chain ancho: el análisis lo expande sólo mientras dura
+def prepared_chain(snapshot: Snapshot, memo: MemoCache | None = None) -> CompactChain:
+    def prepare():
+        with span("prepare_chain") as s:
+            chain = CompactChain.from_options(snapshot.options_df)
+            s.rows = len(chain)
+        return chain
+
+    if memo is None:
+        return prepare()
+    with span("snapshot_hash", rows=len(snapshot.options_df)):
+        key = ("prepare_chain", snapshot_hash(snapshot))
+    return memo.memoize(key, prepare)
+
+
+# Etapa del pipeline con memo opcional: sin memo siempre se calcula
+def _stage(memo, key, compute):
+    return compute() if memo is None else memo.memoize(key, compute)
+
+
+# Pipeline completo: GEX por strike, perfiles de exposición, gamma flip y zonas clave.
+# `greeks` añade perfiles de vanna, charm o delta a gamma en la misma pasada (cuestan ~1 pasada más cada uno).
+# Con `memo` cada etapa se guarda con clave por contenido (hash del chain + parámetros):
+# repetir un snapshot no recalcula nada y cambiar un parámetro sólo rehace lo que depende
+# de él. En ese modo el chain de entrada no se modifica y todayDate es obligatorio (p.ej.
+# snapshot.quote_time()): "ahora" cambia en cada llamada y no sirve como clave
+def analyze(snapshot: Snapshot, df: pd.DataFrame | CompactChain, width: float = 150, profileStep: float | None = None,
+            refineFlip: bool = False, r: float = 0, q: float = 0, max_bytes: int = DEFAULT_MAX_BYTES,
+            workers: int | None = None, backend: str = "serial",
+            todayDate: date | datetime | None = None, greeks=("gamma",), memo: MemoCache | None = None) -> GexAnalysis:
+    spotPrice = snapshot.spotPrice
+    # El chain compacto se expande a float64 sólo dentro de las etapas que lo necesitan:
+    # con memo, un análisis ya calculado no lo expande
+    compact = df if isinstance(df, CompactChain) else None
+    if memo is not None and todayDate is None:
+        raise ValueError("analyze con memo necesita todayDate (p.ej. snapshot.quote_time())")
+    # Momento de valoración: con hora, los 0DTE decaen durante la sesión; sin ella, antes de la apertura
+    asOf = todayDate or market_now()
+    todayDate = asOf.date() if isinstance(asOf, datetime) else asOf
+    levels = price_levels(0.8 * spotPrice, 1.2 * spotPrice, profileStep)
+    greeks = ("gamma",) + tuple(g for g in greeks if g != "gamma")
+
+    chainKey = None
+    if memo is not None:
+        with span("chain_hash", rows=len(df)):
+            chainKey = (snapshot.ticker, float(spotPrice), chain_hash(df) if compact is None else compact.content_hash())
+        analysisKey = ("analyze", chainKey, snapshot.timestamp, asOf, levels.tobytes(), refineFlip, r, q, greeks)
+        cached = memo.get(analysisKey)
+        if cached is not None:
+            return cached.with_width(width)
+
+    def gexByStrike():
+        if compact is not None:
+            frame = compact.to_frame()
+        else:
+            frame = df if memo is None else df.copy()
+        with span("gex_by_strike", rows=len(frame)):
+            return frame, compute_gex(frame, spotPrice, workers=workers, backend=backend)
+
+    def timeToExpiry():
+        frame = chain if memo is None else chain.copy()
+        with span("time_to_expiry", rows=len(frame)):
+            # Del chain compacto, T y cubos salen de los vencimientos únicos
+            if compact is not None:
+                frame['daysTillExp'] = compact.days_till_exp(asOf, spotPrice).copy()
+                nextExpiry, nextMonthlyExp = compact.expiry_buckets()
+            else:
+                add_time_to_expiry(frame, asOf)
+                nextExpiry, nextMonthlyExp = expiry_buckets(frame)
+        with span("strike_index", rows=len(frame)):
+            strikeIndex = StrikeIndex(frame)
+        return frame, nextExpiry, nextMonthlyExp, strikeIndex
+
+    def profilesStage():
+        with span("exposure_profiles", rows=len(chain) * len(levels)):
+            return exposure_profiles(chain, levels, nextExpiry, nextMonthlyExp, r, q, greeks, max_bytes=max_bytes,
+                                     workers=workers, backend=backend)
+
+    def flipStage():
+        with span("gamma_flip", rows=len(levels)):
+            return gamma_flip(levels, profiles["gamma"][0], chain, nextExpiry, nextMonthlyExp, r, q,
+                              refine=refineFlip)
+
+    chain, dfAgg = _stage(memo, ("gex_by_strike", chainKey), gexByStrike)
+    chain, nextExpiry, nextMonthlyExp, strikeIndex = _stage(memo, ("time_to_expiry", chainKey, asOf), timeToExpiry)
+    profileKey = (chainKey, asOf, levels.tobytes(), r, q)
+    profiles = _stage(memo, ("exposure_profiles", *profileKey, greeks), profilesStage)
+    totalGamma, totalGammaExNext, totalGammaExFri = profiles["gamma"]
+    zeroGamma = _stage(memo, ("gamma_flip", *profileKey, refineFlip), flipStage)
+    with span("key_levels") as s:
+        keyLevels = strikeIndex.key_levels(spotPrice, width)
+        s.rows = len(keyLevels.df_filtered)
+
+    analysis = GexAnalysis(snapshot.ticker, spotPrice, snapshot.timestamp, todayDate, width, chain, dfAgg, levels,
+                           totalGamma, totalGammaExNext, totalGammaExFri, zeroGamma, keyLevels,
+                           *(profiles[g][0] if g in profiles else None for g in ("vanna", "charm", "delta")),
+                           strikeIndex)
+    if memo is not None:
+        memo.put(analysisKey, analysis)
+    return analysis
@@ -0,0 +1,147 @@
+# Backtest por lotes: recorre un directorio de snapshots _{ticker}.json guardados,
+# ejecuta el pipeline completo en cada uno y escribe una serie temporal compacta.
+# Es reanudable: los archivos ya presentes en la salida no se vuelven a procesar, y al
+# terminar la serie queda ordenada por timestamp.
+#
+#   python -m gex.backtest snapshots/ --output series.csv --workers 8
+import argparse
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from .api import analyze
+from .chain import prepare_chain
+from .ingest import read_chain
+from .profile import DEFAULT_MAX_BYTES
+
+# Columnas de la serie temporal
+COLUMNS = ["timestamp", "ticker", "spot", "total_gex", "zero_gamma",
+           "max_gex_strike", "min_gex_strike", "high_oi_strikes", "file"]
+
+_SNAPSHOT = re.compile(r"^_(?P<ticker>[^_]+)(?:_.*)?\.json$")
+
+
+# Snapshots del directorio (recursivo) con su ticker, en orden de ruta
+def find_snapshots(directory, tickers=None):
+    found = []
+    for path in sorted(Path(directory).rglob("_*.json")):
+        match = _SNAPSHOT.match(path.name)
+        if match and (not tickers or match["ticker"] in tickers):
+            found.append((path, match["ticker"]))
+    return found
+
+
+# Procesa un snapshot y devuelve su fila; todo lo intermedio se libera al salir
+def process_snapshot(path, ticker, width=150, profileStep=None, max_bytes=DEFAULT_MAX_BYTES):
+    snapshot = read_chain(ticker, path)
+    df = prepare_chain(snapshot.options_df)
+    analysis = analyze(snapshot, df, width=width, profileStep=profileStep, max_bytes=max_bytes, greeks=("gamma",),
+                       todayDate=snapshot.quote_time() or datetime.fromtimestamp(os.path.getmtime(path)))
+    kl = analysis.keyLevels
+    return {
+        "timestamp": snapshot.timestamp,
+        "ticker": ticker,
+        "spot": analysis.spotPrice,
+        "total_gex": float(df['TotalGamma'].sum()),
+        "zero_gamma": "" if analysis.zeroGamma is None else float(analysis.zeroGamma),
+        "max_gex_strike": float(kl.max_gex['StrikePrice']),
+        "min_gex_strike": float(kl.min_gex['StrikePrice']),
+        "high_oi_strikes": ";".join(f"{k:g}" for k in sorted(set(kl.high_oi_filtered['StrikePrice']))),
+        "file": str(path),
+    }
+
+
+# Quita una última línea sin salto de línea (fila a medio escribir por una caída)
+def _drop_partial_line(output):
+    path = Path(output)
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+# Archivos ya procesados en una salida previa (para reanudar)
+def completed_files(output):
+    if not Path(output).exists():
+        return set()
+    with open(output, newline="") as f:
+        return {row["file"] for row in csv.DictReader(f)}
+
+
+# Reescribe la salida ordenada por (timestamp, ticker, archivo), de forma atómica
+def sort_output(output):
+    with open(output, newline="") as f:
+        rows = sorted(csv.DictReader(f), key=lambda row: (row["timestamp"], row["ticker"], row["file"]))
+    tmp = Path(output).with_suffix(".tmp")
+    with open(tmp, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    tmp.replace(output)
+
+
+# Ejecuta el backtest. Las filas se escriben en el orden de entrada en cuanto están listas
+# todas las anteriores, así una caída sólo pierde las que quedaban en vuelo
+def run_backtest(directory, output, tickers=None, width=150, profileStep=None, workers=None,
+                 max_bytes=DEFAULT_MAX_BYTES, log=sys.stderr):
+    _drop_partial_line(output)
+    done = completed_files(output)
+    pending = [(path, ticker) for path, ticker in find_snapshots(directory, tickers) if str(path) not in done]
+
+    newFile = not Path(output).exists() or Path(output).stat().st_size == 0
+    processed = failed = 0
+    with open(output, "a", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        if newFile:
+            writer.writeheader()
+
+        # Un snapshot por tarea: cada worker libera su chain al terminar, la memoria no crece
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(process_snapshot, path, ticker, width, profileStep, max_bytes): i
+                       for i, (path, ticker) in enumerate(pending)}
+            ready, nextRow = {}, 0
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    ready[i] = future.result()
+                    processed += 1
+                except Exception as e:
+                    ready[i] = None
+                    failed += 1
+                    print(f"Error en {pending[i][0]}: {e}", file=log)
+                while nextRow in ready:
+                    row = ready.pop(nextRow)
+                    if row is not None:
+                        writer.writerow(row)
+                    nextRow += 1
+                out.flush()
+
+    sort_output(output)
+    return processed, failed, len(done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gex-backtest", description="Backtest GEX sobre snapshots de CBOE guardados")
+    parser.add_argument("directory", help="Directorio con snapshots _{ticker}.json (se recorre recursivamente)")
+    parser.add_argument("--output", required=True, help="CSV de la serie temporal (se reanuda si ya existe)")
+    parser.add_argument("--tickers", nargs="*", help="Limitar a estos tickers")
+    parser.add_argument("--width", type=float, default=150)
+    parser.add_argument("--step", type=float, default=None, help="Paso del perfil gamma (puntos)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-memory-mb", type=int, default=DEFAULT_MAX_BYTES // 1024**2)
+    args = parser.parse_args(argv)
+
+    processed, failed, skipped = run_backtest(args.directory, args.output, args.tickers, args.width, args.step,
+                                              args.workers, args.max_memory_mb * 1024**2)
+    print(f"{processed} procesados, {skipped} ya presentes, {failed} con error", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .chain import with_occ_fields
+from .diagnostics import span
+from .ingest import CHUNK_SIZE, ChainDecoder, read_chain
+from .fetch import (
+    CONNECT_TIMEOUT,
+    DEFAULT_BACKOFF,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    READ_TIMEOUT,
+    RETRY_STATUS,
+    fetch_all,
+    retry_delay,
+)
+
+# Endpoint de cotizaciones diferidas de CBOE (GEX_CBOE_URL lo redirige, p.ej. al stub local)
+CBOE_URL = "https://cdn.cboe.com/api/global/delayed_quotes/options/_{ticker}.json"
+
+# Tiempo de vida por defecto de un snapshot (CBOE actualiza cada pocos minutos)
+DEFAULT_TTL = 120
+
+# Tamaño máximo por defecto de la caché en disco
+DEFAULT_CACHE_BYTES = 512 * 1024**2
+
+
+# Descarga fallida: código HTTP, o None y el motivo si no hubo respuesta (timeout, conexión)
+class ChainFetchError(RuntimeError):
+    def __init__(self, ticker, status_code, reason=None):
+        if status_code is None:
+            super().__init__(f"Error al descargar datos para {ticker}: {reason}")
+        else:
+            super().__init__(f"Error al descargar datos para {ticker}. Código de estado: {status_code}")
+        self.ticker = ticker
+        self.status_code = status_code
+        self.reason = reason
+
+
+# Directorio de caché: GEX_CACHE_DIR o ~/.cache/gex
+def default_cache_dir():
+    return Path(os.environ.get("GEX_CACHE_DIR", Path.home() / ".cache" / "gex"))
+
+
+# Snapshot parseado del chain: spot, timestamp de la cotización y DataFrame de opciones
+class Snapshot:
+    def __init__(self, ticker, spotPrice, timestamp, options_df):
+        self.ticker = ticker
+        self.spotPrice = spotPrice
+        self.timestamp = timestamp
+        self.options_df = options_df
+
+    # Momento de la cotización según el timestamp de CBOE, en hora de Nueva York
+    # (None si no viene o no se entiende)
+    def quote_time(self):
+        try:
+            return datetime.fromisoformat(str(self.timestamp)) if self.timestamp else None
+        except ValueError:
+            return None
+
+
+# Convierte el JSON de CBOE en un Snapshot tipado
+def parse_payload(ticker, payload):
+    data = payload["data"]
+    return Snapshot(ticker, data["close"], payload.get("timestamp"), pd.DataFrame(data["options"]))
+
+
+# Caché de snapshots en disco (.npz columnar) con TTL, revalidación condicional y desalojo LRU.
+# Las descargas se decodifican en streaming (gex.ingest) con los campos del análisis, más las
+# cotizaciones si quotes=True
+class SnapshotCache:
+    def __init__(self, directory=None, ttl=DEFAULT_TTL, max_bytes=DEFAULT_CACHE_BYTES, session=None, url=None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, quotes=False):
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.quotes = quotes
+        self._session = session
+        self.url = url or os.environ.get("GEX_CBOE_URL", CBOE_URL)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.directory / "index.json"
+
+    # Sesión HTTP reutilizable; requests se importa sólo si hay que descargar
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    # --- índice: ticker -> último snapshot y metadatos de revalidación ---
+
+    def _read_index(self):
+        try:
+            return json.loads(self._index_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_index(self, index):
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, indent=1))
+        tmp.replace(self._index_path)
+
+    # Nombre de archivo por (ticker, timestamp de la cotización)
+    def _file_for(self, ticker, timestamp):
+        digest = hashlib.sha1(f"{ticker}|{timestamp}".encode()).hexdigest()[:16]
+        return f"{ticker}_{digest}.npz"
+
+    # --- almacenamiento columnar ---
+
+    # .npz comprimido con columnas tipadas: numéricas y fechas tal cual (incluidos los campos
+    # OCC ya decodificados, OCC_COLUMNS) y símbolos OCC en bytes ASCII; el resto como texto
+    def _save(self, path, snapshot):
+        columns, ascii = {}, []
+        for col in snapshot.options_df.columns:
+            values = snapshot.options_df[col]
+            if (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)
+                    or pd.api.types.is_datetime64_dtype(values)):
+                columns[col] = values.to_numpy()
+            elif col == "option":
+                columns[col] = values.astype(str).to_numpy(dtype="S")
+                ascii.append(col)
+            else:
+                columns[col] = values.astype(str).to_numpy(dtype=str)
+        meta = dict(ticker=snapshot.ticker, spotPrice=snapshot.spotPrice,
+                    timestamp=snapshot.timestamp, columns=list(columns), ascii=ascii)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, __meta__=np.array(json.dumps(meta)), **columns)
+        tmp.replace(path)
+
+    def _load(self, path):
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            ascii = set(meta.get("ascii", ()))
+            options_df = pd.DataFrame({col: npz[col].astype(str) if col in ascii else npz[col]
+                                       for col in meta["columns"]})
+        return Snapshot(meta["ticker"], meta["spotPrice"], meta["timestamp"], options_df)
+
+    # Guarda un snapshot y lo registra como el último del ticker
+    def _store(self, index, snapshot, etag=None, last_modified=None):
+        name = self._file_for(snapshot.ticker, snapshot.timestamp)
+        path = self.directory / name
+        # Los símbolos se decodifican aquí una vez: el snapshot en memoria y el de disco llevan
+        # los mismos campos OCC, y prepare_chain ya no los vuelve a parsear
+        snapshot.options_df = with_occ_fields(snapshot.options_df)
+        if not path.exists():
+            self._save(path, snapshot)
+        now = time.time()
+        index[snapshot.ticker] = dict(file=name, timestamp=snapshot.timestamp, etag=etag,
+                                      last_modified=last_modified, fetched_at=now, last_access=now)
+        self._evict(index)
+        self._write_index(index)
+
+    # Desalojo LRU de snapshots cuando se supera max_bytes
+    def _evict(self, index):
+        lastAccess = {entry["file"]: entry["last_access"] for entry in index.values()}
+        files = sorted(self.directory.glob("*.npz"), key=lambda p: lastAccess.get(p.name, p.stat().st_mtime))
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink()
+            for ticker in [t for t, e in index.items() if e["file"] == path.name]:
+                del index[ticker]
+
+    # Snapshot en disco aún vigente (None si no hay o expiró el TTL)
+    def _fresh(self, index, ticker):
+        entry = index.get(ticker)
+        if not entry or not (self.directory / entry["file"]).exists() or time.time() - entry["fetched_at"] >= self.ttl:
+            return None
+        entry["last_access"] = time.time()
+        with span("cache_load") as s:
+            snapshot = self._load(self.directory / entry["file"])
+            s.rows = len(snapshot.options_df)
+        return snapshot
+
+    # Cabeceras de revalidación condicional del último snapshot guardado
+    def _conditional_headers(self, index, ticker):
+        entry = index.get(ticker)
+        headers = {}
+        if entry and (self.directory / entry["file"]).exists():
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # Consumidor del cuerpo de una descarga: decodificación en streaming a Snapshot
+    def _decoder(self, ticker):
+        return ChainDecoder(ticker, self.quotes)
+
+    # Snapshot a partir de la respuesta: 304 reutiliza el guardado, 200 guarda el ya decodificado
+    def _resolve(self, index, ticker, status, snapshot=None, etag=None, last_modified=None):
+        entry = index.get(ticker)
+        if status == 304 and entry and (self.directory / entry["file"]).exists():
+            entry["fetched_at"] = entry["last_access"] = time.time()
+            with span("cache_load") as s:
+                snapshot = self._load(self.directory / entry["file"])
+                s.rows = len(snapshot.options_df)
+            return snapshot
+
+        if status != 200:
+            raise ChainFetchError(ticker, status)
+
+        with span("cache_store"):
+            self._store(index, snapshot, etag, last_modified)
+        return snapshot
+
+    # GET síncrono con timeout de conexión/lectura y los mismos reintentos que fetch_all.
+    # El cuerpo de un 200 se decodifica en streaming; devuelve (respuesta, snapshot o None)
+    def _get(self, ticker, headers):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(self.url.format(ticker=ticker), headers=headers,
+                                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as response:
+                    if response.status_code == 200:
+                        decoder = self._decoder(ticker)
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            decoder.feed(chunk)
+                        return response, decoder.result()
+            except (OSError, ValueError) as e:  # requests.RequestException deriva de OSError
+                error = ChainFetchError(ticker, None, f"{type(e).__name__}: {e}")
+                retryAfter = None
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    return response, None
+                error = ChainFetchError(ticker, response.status_code)
+                retryAfter = response.headers.get("Retry-After")
+            if attempt < self.retries:
+                time.sleep(retry_delay(attempt, self.backoff, retryAfter))
+        raise error
+
+    # --- API pública ---
+
+    # Snapshot del ticker: caché si está vigente, revalidación condicional si expiró
+    def load(self, ticker):
+        index = self._read_index()
+        snapshot = self._fresh(index, ticker)
+        if snapshot is not None:
+            self._write_index(index)
+            return snapshot
+
+        headers = {"Accept-Encoding": "gzip", **self._conditional_headers(index, ticker)}
+        with span("download") as s:
+            response, snapshot = self._get(ticker, headers)
+            s.rows = len(snapshot.options_df) if snapshot is not None else None
+
+        snapshot = self._resolve(index, ticker, response.status_code, snapshot, response.headers.get("ETag"),
+                                 response.headers.get("Last-Modified"))
+        self._write_index(index)
+        return snapshot
+
+    # Varios tickers a la vez: los vigentes salen de disco y el resto se descarga en paralelo
+    # (fetch_all). Devuelve {ticker: Snapshot o ChainFetchError} en el orden pedido
+    def load_many(self, tickers, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+        index = self._read_index()
+        results = {ticker: self._fresh(index, ticker) for ticker in tickers}
+        targets = {ticker: (self.url.format(ticker=ticker), self._conditional_headers(index, ticker))
+                   for ticker, snapshot in results.items() if snapshot is None}
+
+        if targets:
+            with span("download", rows=len(targets)):
+                fetched = fetch_all(targets, concurrency, timeout, self.retries, self.backoff, self._decoder)
+            for ticker, result in fetched.items():
+                try:
+                    if isinstance(result, ChainFetchError):
+                        raise result
+                    results[ticker] = self._resolve(index, ticker, result.status, result.payload, result.etag,
+                                                    result.last_modified)
+                except ChainFetchError as e:
+                    results[ticker] = e
+        self._write_index(index)
+        return results
+
+    # Carga un JSON guardado (fixtures, archivos offline) pasando por la caché
+    def load_file(self, ticker, path):
+        with span("parse_json") as s:
+            snapshot = read_chain(ticker, path, self.quotes)
+            s.rows = len(snapshot.options_df)
+        with span("cache_store"):
+            self._store(self._read_index(), snapshot)
+        return snapshot
+
+    # Borra todos los snapshots e índice
+    def clear(self):
+        for path in self.directory.glob("*.npz"):
+            path.unlink()
+        self._index_path.unlink(missing_ok=True)
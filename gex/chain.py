@@ -0,0 +1,197 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from .expiry import third_fridays, time_to_expiry
+from .occ import CALL, PUT, parse_occ
+
+# Columnas del JSON de CBOE -> nombres de calls y puts en el chain combinado
+_SIDE_COLUMNS = [
+    ('option', 'Calls', 'Puts'),
+    ('last_trade_price', 'CallLastSale', 'PutLastSale'),
+    ('change', 'CallNet', 'PutNet'),
+    ('bid', 'CallBid', 'PutBid'),
+    ('ask', 'CallAsk', 'PutAsk'),
+    ('volume', 'CallVol', 'PutVol'),
+    ('iv', 'CallIV', 'PutIV'),
+    ('delta', 'CallDelta', 'PutDelta'),
+    ('gamma', 'CallGamma', 'PutGamma'),
+    ('open_interest', 'CallOpenInt', 'PutOpenInt'),
+]
+
+# Máximo de raíces distintas en un chain (p.ej. SPX y SPXW) y de series repetidas con la
+# misma (raíz, vencimiento, strike) en un lado
+_MAX_ROOTS = 64
+_MAX_DUPLICATES = 64
+
+
+# Código de raíz por contrato (0..nRaíces-1, en orden alfabético) a partir de las raíces
+# empaquetadas de parse_occ; sin raíces, todos los contratos comparten el código 0
+def _root_codes(roots, n):
+    if roots is None:
+        return np.zeros(n, dtype=np.int64)
+    unique, codes = np.unique(roots, return_inverse=True)
+    if len(unique) > _MAX_ROOTS:
+        raise ValueError("Demasiadas raíces OCC en el chain")
+    return codes.ravel().astype(np.int64)
+
+
+# Clave entera por contrato: (día de vencimiento, strike en milésimas, raíz, ocurrencia).
+# La raíz separa las series SPX y SPXW del mismo día y strike, así calls y puts se emparejan
+# por raíz y no por su posición en el listado; la ocurrencia sólo distingue duplicados reales
+def _contract_keys(expiry, strike, rootCode=None):
+    days = expiry.astype('datetime64[D]').astype(np.int64)
+    base = days * 10**8 + np.round(strike * 1000).astype(np.int64)
+    base = base * _MAX_ROOTS + (0 if rootCode is None else rootCode)
+
+    order = np.argsort(base, kind='stable')
+    sortedBase = base[order]
+    groupStart = np.r_[0, np.flatnonzero(np.diff(sortedBase)) + 1]
+    groupSizes = np.diff(np.r_[groupStart, len(base)])
+    rank = np.empty(len(base), dtype=np.int64)
+    rank[order] = np.arange(len(base)) - np.repeat(groupStart, groupSizes)
+    if len(rank) and rank.max() >= _MAX_DUPLICATES:
+        raise ValueError("Demasiadas series con la misma raíz, vencimiento y strike")
+
+    return base * _MAX_DUPLICATES + rank
+
+
+# Valores de una columna de un lado reubicados en las filas del chain combinado;
+# los strikes que sólo existen en el otro lado quedan a cero
+def _scatter(values, rows, n):
+    if values.dtype.kind in 'biuf':
+        out = np.zeros(n, dtype=values.dtype)
+    else:
+        out = np.full(n, None, dtype=object)
+    out[rows] = values
+    return out
+
+
+# Índice ordenado de claves (unión de calls y puts) y fila de cada contrato en el chain combinado.
+# `roots` (parse_occ(..., roots=True)) empareja cada call con el put de su misma raíz
+def join_index(callPut, expiry, strike, roots=None):
+    isCall = callPut == CALL
+    isPut = callPut == PUT
+    rootCode = _root_codes(roots, len(callPut))
+    callKeys = _contract_keys(expiry[isCall], strike[isCall], rootCode[isCall])
+    putKeys = _contract_keys(expiry[isPut], strike[isPut], rootCode[isPut])
+
+    keys = np.union1d(callKeys, putKeys)
+    return keys, isCall, isPut, np.searchsorted(keys, callKeys), np.searchsorted(keys, putKeys)
+
+
+# Vencimiento (día) y strike de cada clave del índice
+def key_parts(keys):
+    base = keys // (_MAX_DUPLICATES * _MAX_ROOTS)
+    return (base // 10**8).astype('datetime64[D]'), (base % 10**8) / 1000.0
+
+
+# Une calls y puts por (raíz, vencimiento, strike) con un índice de claves ordenadas.
+# Requiere las columnas CallPut, ExpirationDate y Strike de parse_occ; Root es opcional
+def merge_calls_puts(data_df):
+    callPut = data_df['CallPut'].to_numpy()
+    expiry = data_df['ExpirationDate'].to_numpy(dtype='datetime64[ns]')
+    strike = data_df['Strike'].to_numpy(dtype=float)
+    roots = data_df['Root'].to_numpy() if 'Root' in data_df.columns else None
+    keys, isCall, isPut, callRows, putRows = join_index(callPut, expiry, strike, roots)
+    n = len(keys)
+
+    # Vencimiento y strike a partir de la propia clave
+    expiryDays, strikes = key_parts(keys)
+    columns = {'ExpirationDate': expiryDays.astype('datetime64[ns]')}
+    # Las columnas que no vienen en el snapshot (cotizaciones sin quotes=True) se omiten
+    sides = [c for c in _SIDE_COLUMNS if c[0] in data_df.columns]
+    for source, callName, _ in sides:
+        columns[callName] = _scatter(data_df[source].to_numpy()[isCall], callRows, n)
+    columns['StrikePrice'] = strikes
+    for source, _, putName in sides:
+        columns[putName] = _scatter(data_df[source].to_numpy()[isPut], putRows, n)
+
+    return pd.DataFrame(columns)
+
+
+# Campos de chain_keys: vencimiento y strike, raíz empaquetada y ocurrencia
+_CHAIN_KEY = np.dtype([('base', np.int64), ('root', np.int64), ('rank', np.int64)])
+
+
+# Claves de las filas de un chain combinado (una por fila, únicas y comparables entre
+# snapshots). La raíz sale del símbolo de la call, o del put si el strike sólo existe en ese
+# lado, y va empaquetada tal cual: los códigos densos de _root_codes dependen de qué raíces
+# trae cada snapshot
+def chain_keys(df):
+    expiry = df['ExpirationDate'].to_numpy(dtype='datetime64[ns]')
+    roots = np.zeros(len(df), dtype=np.int64)
+    if 'Calls' in df.columns and 'Puts' in df.columns and len(df):
+        symbols = df['Calls'].where(df['Calls'].notna(), df['Puts']).astype(str)
+        roots = parse_occ(symbols, roots=True)[3]
+    keys = _contract_keys(expiry, df['StrikePrice'].to_numpy(dtype=float), _root_codes(roots, len(df)))
+    out = np.empty(len(df), dtype=_CHAIN_KEY)
+    out['base'] = keys // (_MAX_DUPLICATES * _MAX_ROOTS)
+    out['root'] = roots
+    out['rank'] = keys % _MAX_DUPLICATES
+    return out
+
+
+# Campos de los símbolos OCC ya decodificados (la caché de snapshots los guarda tipados)
+OCC_COLUMNS = ('CallPut', 'ExpirationDate', 'Strike', 'Root')
+
+
+# Tipo, vencimiento, strike y raíz de cada opción: de las columnas OCC_COLUMNS si el
+# snapshot ya las trae, si no decodificando los símbolos en una sola pasada
+def occ_fields(options_df):
+    if all(col in options_df.columns for col in OCC_COLUMNS):
+        return (options_df['CallPut'].to_numpy(dtype=np.int8),
+                options_df['ExpirationDate'].to_numpy(dtype='datetime64[ns]'),
+                options_df['Strike'].to_numpy(dtype=float), options_df['Root'].to_numpy(dtype=np.int64))
+    return parse_occ(options_df['option'], roots=True)
+
+
+# DataFrame de opciones con los campos OCC_COLUMNS añadidos (copia superficial; sin cambios
+# si ya los tiene)
+def with_occ_fields(options_df):
+    if all(col in options_df.columns for col in OCC_COLUMNS) or 'option' not in options_df.columns:
+        return options_df
+    options_df = options_df.copy(deep=False)
+    for col, values in zip(OCC_COLUMNS, parse_occ(options_df['option'], roots=True)):
+        options_df[col] = values
+    return options_df
+
+
+# Chain combinado y tipado a partir del DataFrame de opciones de CBOE
+def prepare_chain(options_df):
+    data_df = options_df.copy(deep=False)
+
+    # Símbolos OCC: tipo, vencimiento, strike y raíz (decodificados una sola vez por snapshot)
+    data_df['CallPut'], data_df['ExpirationDate'], data_df['Strike'], data_df['Root'] = occ_fields(options_df)
+
+    # Unir calls y puts por (vencimiento, strike); los strikes de un solo lado quedan a cero
+    df = merge_calls_puts(data_df)
+
+    # Tipos y formatos
+    df['ExpirationDate'] = pd.to_datetime(df['ExpirationDate'])
+    df['ExpirationDate'] = df['ExpirationDate'] + timedelta(hours=16)
+    df['StrikePrice'] = df['StrikePrice'].astype(float)
+    df['CallIV'] = df['CallIV'].astype(float)
+    df['PutIV'] = df['PutIV'].astype(float)
+    df['CallGamma'] = df['CallGamma'].astype(float)
+    df['PutGamma'] = df['PutGamma'].astype(float)
+    df['CallOpenInt'] = df['CallOpenInt'].astype(float)
+    df['PutOpenInt'] = df['PutOpenInt'].astype(float)
+    return df
+
+
+# Tiempo hasta vencimiento en años hábiles, con la fracción de sesión que queda hoy
+# (todayDate: datetime, date o None = ahora en Nueva York; ver gex.expiry)
+def add_time_to_expiry(df, todayDate=None):
+    df['daysTillExp'] = time_to_expiry(df['ExpirationDate'], todayDate)
+    return df
+
+
+# Próximo vencimiento y próximo vencimiento mensual (tercer viernes)
+def expiry_buckets(df):
+    nextExpiry = df['ExpirationDate'].min()
+    df['IsThirdFriday'] = third_fridays(df['ExpirationDate'])
+    thirdFridays = df.loc[df['IsThirdFriday'] == True]
+    nextMonthlyExp = thirdFridays['ExpirationDate'].min()
+    return nextExpiry, nextMonthlyExp
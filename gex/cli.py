@@ -0,0 +1,144 @@
+# Línea de comandos headless: analiza uno o varios tickers y escribe JSON/CSV
+#
+#   gex SPX --width 150 --output spx.json
+#   gex SPX NDX --format csv --output-dir resultados/
+#   gex SPX --file snapshots/_SPX.json                  # valorado en el momento de la cotización
+#   gex SPX --as-of "2025-01-02 12:30"
+import argparse
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+from .api import analyze, load_chain, strike_table
+from .cache import DEFAULT_TTL, ChainFetchError, SnapshotCache
+from .diagnostics import PROFILERS, Recorder, format_table, profiled, recording, span
+from .fetch import DEFAULT_CONCURRENCY, DEFAULT_RETRIES, DEFAULT_TIMEOUT
+from .greeks import GREEKS
+from .history import HistoryStore
+from .parallel import BACKENDS
+from .profile import DEFAULT_MAX_BYTES
+
+
+# Momento de valoración de --as-of: fecha (antes de la apertura) o fecha y hora de Nueva York
+def _as_of(value):
+    try:
+        return date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida: {value!r} (use YYYY-MM-DD o 'YYYY-MM-DD HH:MM')")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="gex", description="Análisis de Gamma Exposure (GEX) sin interfaz gráfica")
+    parser.add_argument("tickers", nargs="+", help="Tickers a analizar, p.ej. SPX NDX")
+    parser.add_argument("--width", type=float, default=150, help="Rango de strikes alrededor del spot (puntos)")
+    parser.add_argument("--step", type=float, default=None, help="Paso del perfil gamma (puntos); por defecto 30 niveles")
+    parser.add_argument("--refine-flip", action="store_true", help="Refinar el gamma flip con brentq")
+    parser.add_argument("--file", help="JSON de CBOE guardado en lugar de descargar (un solo ticker); "
+                                       "se valora en el momento de su cotización salvo con --as-of")
+    parser.add_argument("--as-of", type=_as_of, help="Momento de valoración (YYYY-MM-DD o 'YYYY-MM-DD HH:MM', "
+                                                     "hora de Nueva York); por defecto ahora")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="TTL de la caché de snapshots (segundos)")
+    parser.add_argument("--cache-dir", help="Directorio de la caché de snapshots")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Descargas simultáneas")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Timeout por descarga (segundos)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Reintentos por descarga")
+    parser.add_argument("--max-memory-mb", type=int, default=DEFAULT_MAX_BYTES // 1024**2)
+    parser.add_argument("--greeks", nargs="+", choices=GREEKS, default=["gamma"],
+                        help="Perfiles de exposición a calcular (gamma siempre se incluye; por defecto sólo gamma)")
+    parser.add_argument("--backend", choices=BACKENDS, default="serial")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=("json", "csv"), default="json",
+                        help="json: resumen completo; csv: tabla por strike")
+    parser.add_argument("--output", help="Archivo de salida (un ticker); por defecto stdout")
+    parser.add_argument("--output-dir", help="Directorio de salida: un archivo {ticker}.{format} por ticker")
+    parser.add_argument("--history", nargs="?", const="", metavar="PATH",
+                        help="Registrar cada análisis en el historial (por defecto ~/.cache/gex/history.sqlite)")
+    parser.add_argument("--timings", choices=("table", "json", "prom"),
+                        help="Medir cada etapa y exportar los tiempos (tabla, JSON o texto de Prometheus)")
+    parser.add_argument("--timings-output", help="Archivo para los tiempos; por defecto stderr")
+    parser.add_argument("--trace-memory", action="store_true", help="Incluir memoria por etapa (tracemalloc)")
+    parser.add_argument("--profile", choices=PROFILERS, help="Perfil completo de la ejecución")
+    parser.add_argument("--profile-output", help="Archivo del perfil (.prof para cProfile, .html para pyinstrument)")
+    return parser
+
+
+def _write(analysis, fmt, out):
+    if fmt == "json":
+        json.dump(analysis.to_dict(), out, indent=2, default=str)
+        out.write("\n")
+    else:
+        strike_table(analysis).to_csv(out, index=False)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.file and len(args.tickers) > 1:
+        sys.exit("--file sólo admite un ticker")
+    if args.output and len(args.tickers) > 1:
+        sys.exit("--output sólo admite un ticker; use --output-dir")
+
+    cache = SnapshotCache(args.cache_dir, ttl=args.ttl, retries=args.retries)
+    recorder = Recorder(memory=args.trace_memory) if args.timings else None
+    with recording(recorder), profiled(args.profile, args.profile_output) as report:
+        status = _run(args, cache, recorder)
+
+    if recorder:
+        out = open(args.timings_output, "w") if args.timings_output else sys.stderr
+        if args.timings == "table":
+            format_table(recorder, out)
+        elif args.timings == "json":
+            out.write(recorder.to_json(indent=2) + "\n")
+        else:
+            out.write(recorder.to_prometheus())
+        if out is not sys.stderr:
+            out.close()
+    if report and not args.profile_output:
+        sys.stderr.write(report.text)
+    return status
+
+
+def _run(args, cache, recorder):
+    status = 0
+    # Todos los tickers se descargan a la vez antes de analizarlos uno a uno
+    prefetched = {} if args.file else cache.load_many(args.tickers, args.concurrency, args.timeout)
+    history = HistoryStore(args.history or None) if args.history is not None else None
+    for ticker in args.tickers:
+        if recorder:
+            recorder.labels["ticker"] = ticker
+        try:
+            snapshot = prefetched.get(ticker)
+            if isinstance(snapshot, ChainFetchError):
+                raise snapshot
+            snapshot, df = load_chain(ticker, cache, path=args.file, snapshot=snapshot)
+        except ChainFetchError as e:
+            print(e, file=sys.stderr)
+            status = 1
+            continue
+
+        # Un snapshot guardado se valora cuando se cotizó: con "ahora" sus vencimientos ya pasaron
+        todayDate = args.as_of or (snapshot.quote_time() if args.file else None)
+        analysis = analyze(snapshot, df, width=args.width, profileStep=args.step, refineFlip=args.refine_flip,
+                           max_bytes=args.max_memory_mb * 1024**2, workers=args.workers, backend=args.backend,
+                           todayDate=todayDate, greeks=args.greeks)
+
+        if history is not None:
+            with span("history_record"):
+                history.record(analysis)
+
+        with span("write_output"):
+            if args.output_dir:
+                path = Path(args.output_dir) / f"{ticker}.{args.format}"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "w", newline="") as out:
+                    _write(analysis, args.format, out)
+            elif args.output:
+                with open(args.output, "w", newline="") as out:
+                    _write(analysis, args.format, out)
+            else:
+                _write(analysis, args.format, sys.stdout)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+# Chain compacto en memoria: estructura de arrays tipados sin objetos Python por fila.
+# Vencimiento, strike y raíz OCC van codificados como enteros sobre sus valores únicos;
+# IV y gamma en float64 (los resultados no cambian respecto al chain ancho), delta en
+# float32 y OI/volumen en int32. Sólo se guardan las columnas que usa el análisis (ni
+# símbolos OCC ni cotizaciones). Las columnas derivadas (T, GEX neto, OI total...) se
+# calculan bajo demanda y quedan en una caché explícita que se puede vaciar; las que
+# dependen del spot o del momento de valoración se descartan cuando cambia alguno.
+#
+#   chain = CompactChain.from_options(snapshot.options_df)   # ~4x menos que prepare_chain
+#   analysis = analyze(snapshot, chain)                      # se expande sólo durante el análisis
+#   chain.days_till_exp(asOf, spotPrice)                     # T calculado por vencimiento único
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from .chain import _CHAIN_KEY, _MAX_DUPLICATES, _MAX_ROOTS, chain_keys, join_index, key_parts, occ_fields
+from .expiry import third_fridays, time_to_expiry
+from .memo import content_hash
+
+# Columnas base: nombre en el chain combinado -> (columna del JSON de CBOE, lado, dtype)
+_COLUMNS = {
+    'CallIV': ('iv', 'call', np.float64),
+    'PutIV': ('iv', 'put', np.float64),
+    'CallGamma': ('gamma', 'call', np.float64),
+    'PutGamma': ('gamma', 'put', np.float64),
+    'CallDelta': ('delta', 'call', np.float32),
+    'PutDelta': ('delta', 'put', np.float32),
+    'CallOpenInt': ('open_interest', 'call', np.int32),
+    'PutOpenInt': ('open_interest', 'put', np.int32),
+    'CallVol': ('volume', 'call', np.int32),
+    'PutVol': ('volume', 'put', np.int32),
+}
+
+# Hora de vencimiento que añade prepare_chain a la fecha del símbolo
+_EXPIRY_TIME = timedelta(hours=16)
+
+
+def _typed(values, dtype):
+    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    if np.dtype(dtype).kind == 'i':
+        values = np.nan_to_num(values, nan=0.0)
+    return values.astype(dtype)
+
+
+def _codes(values, dtype=None):
+    unique, codes = np.unique(values, return_inverse=True)
+    dtype = dtype or (np.int16 if len(unique) <= np.iinfo(np.int16).max else np.int32)
+    return unique, codes.ravel().astype(dtype)
+
+
+class CompactChain:
+    def __init__(self, expiries, expiryCode, strikes, strikeCode, columns, roots=None, rootCode=None, rank=None):
+        n = len(expiryCode)
+        self.expiries = expiries          # datetime64[D] únicos, ordenados
+        self.expiryCode = expiryCode      # int16/int32 por fila
+        self.strikes = strikes            # float64 únicos, ordenados
+        self.strikeCode = strikeCode      # int16/int32 por fila
+        self.columns = columns            # nombre -> array float64/float32/int32
+        self.roots = np.zeros(1, dtype=np.int64) if roots is None else roots      # raíces empaquetadas únicas
+        self.rootCode = np.zeros(n, dtype=np.int8) if rootCode is None else rootCode
+        self.rank = np.zeros(n, dtype=np.int8) if rank is None else rank          # ocurrencia (duplicados)
+        self._derived = {}
+        self._valued = (None, {})         # (spot, momento de valoración) -> columnas que dependen de ellos
+
+    # Chain compacto directamente del DataFrame de opciones de CBOE, sin pasar por el chain ancho.
+    # Mismas filas y en el mismo orden que prepare_chain
+    @classmethod
+    def from_options(cls, options_df: pd.DataFrame) -> CompactChain:
+        callPut, expiry, strike, roots = occ_fields(options_df)
+        keys, isCall, isPut, callRows, putRows = join_index(callPut, expiry, strike, roots)
+        n = len(keys)
+
+        columns = {}
+        for name, (source, side, dtype) in _COLUMNS.items():
+            sideMask, rows = (isCall, callRows) if side == 'call' else (isPut, putRows)
+            values = np.zeros(n, dtype=dtype)
+            values[rows] = _typed(options_df[source].to_numpy()[sideMask], dtype)
+            columns[name] = values
+
+        # La clave lleva el código denso de la raíz (orden de np.unique) y la ocurrencia
+        expiryDays, strikes = key_parts(keys)
+        rootCode = (keys // _MAX_DUPLICATES % _MAX_ROOTS).astype(np.int8)
+        return cls(*_codes(expiryDays), *_codes(strikes), columns, np.unique(roots), rootCode,
+                   (keys % _MAX_DUPLICATES).astype(np.int8))
+
+    # Compacta un chain ya preparado (prepare_chain); las columnas ausentes quedan a cero
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> CompactChain:
+        expiryDays = df['ExpirationDate'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        columns = {name: _typed(df[name].to_numpy(), dtype) if name in df.columns
+                   else np.zeros(len(df), dtype=dtype)
+                   for name, (_, _, dtype) in _COLUMNS.items()}
+        keys = chain_keys(df)
+        return cls(*_codes(expiryDays), *_codes(df['StrikePrice'].to_numpy(dtype=float)), columns,
+                   *_codes(keys['root'], np.int8), keys['rank'].astype(np.int8))
+
+    def __len__(self):
+        return len(self.expiryCode)
+
+    # Bytes de las columnas base y de las derivadas en caché
+    @property
+    def nbytes(self) -> int:
+        base = sum(a.nbytes for a in self.columns.values())
+        base += self.expiries.nbytes + self.expiryCode.nbytes + self.strikes.nbytes + self.strikeCode.nbytes
+        base += self.roots.nbytes + self.rootCode.nbytes + self.rank.nbytes
+        return base + sum(a.nbytes for a in (*self._derived.values(), *self._valued[1].values())
+                          if isinstance(a, np.ndarray))
+
+    # Columna derivada en caché: se calcula con compute() la primera vez que se pide `key`
+    def derived(self, key, compute):
+        values = self._derived.get(key)
+        if values is None:
+            values = self._derived[key] = compute()
+        return values
+
+    def clear_derived(self):
+        self._derived.clear()
+        self._valued = (None, {})
+
+    # Columna que depende del spot o del momento de valoración: sólo se guardan las de la
+    # última valoración, y pedir otra descarta todas (las demás derivadas se conservan).
+    # El par se sustituye de una vez, así un chain compartido entre hilos nunca mezcla valoraciones
+    def valued(self, spotPrice, asOf, key, compute):
+        valuation, cache = self._valued
+        if valuation != (spotPrice, asOf):
+            valuation, cache = self._valued = ((spotPrice, asOf), {})
+        values = cache.get(key)
+        if values is None:
+            values = cache[key] = compute()
+        return values
+
+    # Vencimientos únicos con la hora de vencimiento (16:00)
+    @property
+    def expiry_times(self) -> np.ndarray:
+        return self.expiries.astype('datetime64[ns]') + np.timedelta64(_EXPIRY_TIME)
+
+    def expiration(self) -> np.ndarray:
+        return self.derived('ExpirationDate', lambda: self.expiry_times[self.expiryCode])
+
+    def strike(self) -> np.ndarray:
+        return self.derived('StrikePrice', lambda: self.strikes[self.strikeCode])
+
+    # T en años hábiles por vencimiento único en `asOf`
+    def expiry_days_till_exp(self, asOf, spotPrice=None) -> np.ndarray:
+        return self.valued(spotPrice, asOf, 'expiryDaysTillExp', lambda: time_to_expiry(self.expiry_times, asOf))
+
+    # T por fila: se reparte el T de cada vencimiento único
+    def days_till_exp(self, asOf, spotPrice=None) -> np.ndarray:
+        return self.valued(spotPrice, asOf, 'daysTillExp',
+                           lambda: self.expiry_days_till_exp(asOf, spotPrice)[self.expiryCode])
+
+    # GEX neto por contrato (gamma * OI * 100 * 100), como levels.net_gex
+    def net_gex(self) -> np.ndarray:
+        c = self.columns
+        return self.derived('net_gex', lambda: (c['CallGamma'] * c['CallOpenInt']
+                                                - c['PutGamma'] * c['PutOpenInt']) * 100 * 100)
+
+    def total_oi(self) -> np.ndarray:
+        c = self.columns
+        return self.derived('total_oi', lambda: c['CallOpenInt'].astype(np.int64) + c['PutOpenInt'])
+
+    # Próximo vencimiento y próximo mensual (tercer viernes), sobre los vencimientos únicos
+    def expiry_buckets(self):
+        def compute():
+            times = pd.Series(self.expiry_times[np.unique(self.expiryCode)])
+            monthly = times[third_fridays(times).to_numpy()]
+            return times.min(), monthly.min() if len(monthly) else pd.NaT
+        return self.derived('expiry_buckets', compute)
+
+    # Claves de fila comparables entre snapshots, como chain.chain_keys del chain ancho
+    def chain_keys(self) -> np.ndarray:
+        def compute():
+            out = np.empty(len(self), dtype=_CHAIN_KEY)
+            days = self.expiries.astype(np.int64)[self.expiryCode]
+            out['base'] = days * 10**8 + np.round(self.strikes * 1000).astype(np.int64)[self.strikeCode]
+            out['root'] = self.roots[self.rootCode]
+            out['rank'] = self.rank
+            return out
+        return self.derived('chain_keys', compute)
+
+    # Hash del contenido de las columnas base (clave del memo del análisis)
+    def content_hash(self) -> str:
+        return self.derived('content_hash', lambda: content_hash(
+            self.expiries, self.expiryCode, self.strikes, self.strikeCode, self.roots, self.rootCode, self.rank,
+            tuple(self.columns), tuple(self.columns.values())))
+
+    # Chain ancho en float64 con los nombres de prepare_chain, para el pipeline de pandas.
+    # `rows` limita la expansión a esas filas
+    def to_frame(self, rows=None) -> pd.DataFrame:
+        take = (lambda a: a) if rows is None else (lambda a: a[rows])
+        data = {'ExpirationDate': take(self.expiration()), 'StrikePrice': take(self.strike())}
+        for name, values in self.columns.items():
+            data[name] = take(values).astype(float)
+        return pd.DataFrame(data)
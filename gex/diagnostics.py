@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+# Instrumentación por etapas: spans con nombre que miden tiempo de pared, CPU, filas y
+# memoria. Sólo se registran dentro de `recording(...)`; fuera de él `span()` devuelve un
+# contexto nulo compartido y el coste se reduce a consultar un ContextVar.
+#
+#   rec = Recorder(memory=True)
+#   with recording(rec):
+#       analysis = analyze(snapshot, df)
+#   print(rec.to_prometheus())
+import contextlib
+import contextvars
+import io
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+# Perfiladores admitidos por `profiled`
+PROFILERS = ("cprofile", "pyinstrument")
+
+_current: contextvars.ContextVar[Recorder | None] = contextvars.ContextVar("gex_recorder", default=None)
+
+
+# Una etapa medida; memoria en bytes (sólo si el Recorder traza memoria)
+@dataclass
+class Span:
+    name: str
+    depth: int
+    labels: dict = field(default_factory=dict)
+    wall: float = 0.0
+    cpu: float = 0.0
+    rows: int | None = None
+    mem_delta: int | None = None
+    mem_peak: int | None = None
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "depth": self.depth, "labels": dict(self.labels),
+                "wall_ms": self.wall * 1000, "cpu_ms": self.cpu * 1000, "rows": self.rows,
+                "mem_delta": self.mem_delta, "mem_peak": self.mem_peak}
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    # Se acepta `s.rows = n` sin registrar nada
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("recorder", "span", "_wall", "_cpu", "_mem")
+
+    def __init__(self, recorder, span):
+        self.recorder = recorder
+        self.span = span
+
+    @property
+    def rows(self):
+        return self.span.rows
+
+    @rows.setter
+    def rows(self, value):
+        self.span.rows = None if value is None else int(value)
+
+    def __enter__(self):
+        rec = self.recorder
+        rec._depth += 1
+        if rec.memory:
+            # reset_peak borra también el pico que lleva el span padre: se guarda antes
+            if rec._peaks:
+                rec._peaks[-1] = max(rec._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._mem = tracemalloc.get_traced_memory()[0]
+            rec._peaks.append(0)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        span = self.span
+        span.wall = time.perf_counter() - self._wall
+        span.cpu = time.process_time() - self._cpu
+        rec = self.recorder
+        rec._depth -= 1
+        if rec.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Pico propio antes de cada hijo y picos de los hijos, propagados a mano
+            peak = max(peak, rec._peaks.pop())
+            if rec._peaks:
+                rec._peaks[-1] = max(rec._peaks[-1], peak)
+            span.mem_delta = current - self._mem
+            span.mem_peak = peak - self._mem
+        return False
+
+
+# Colección de spans de una o varias ejecuciones; `labels` se copia en cada span nuevo
+class Recorder:
+    def __init__(self, memory: bool = False, labels: dict | None = None):
+        self.memory = memory
+        self.labels = dict(labels or {})
+        self.spans: list[Span] = []
+        self._depth = 0
+        self._peaks: list[int] = []
+
+    def span(self, name: str, rows: int | None = None) -> _ActiveSpan:
+        s = Span(name, self._depth, dict(self.labels), rows=rows)
+        self.spans.append(s)
+        return _ActiveSpan(self, s)
+
+    def records(self) -> list[dict]:
+        return [s.to_dict() for s in self.spans]
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps({"spans": self.records()}, **kwargs)
+
+    # Texto de exposición de Prometheus; los spans repetidos (mismo nombre y labels) se suman
+    def to_prometheus(self, prefix: str = "gex_stage") -> str:
+        totals = {}
+        for s in self.spans:
+            key = (s.name, tuple(sorted(s.labels.items())))
+            t = totals.setdefault(key, {"wall": 0.0, "cpu": 0.0, "rows": None, "mem": None, "calls": 0})
+            t["wall"] += s.wall
+            t["cpu"] += s.cpu
+            t["calls"] += 1
+            if s.rows is not None:
+                t["rows"] = s.rows
+            if s.mem_peak is not None:
+                t["mem"] = max(t["mem"] or 0, s.mem_peak)
+
+        metrics = [
+            ("wall_seconds", "Tiempo de pared por etapa", "wall"),
+            ("cpu_seconds", "Tiempo de CPU por etapa", "cpu"),
+            ("rows", "Filas procesadas por etapa", "rows"),
+            ("memory_peak_bytes", "Memoria pico asignada durante la etapa", "mem"),
+            ("calls", "Veces que se ejecutó la etapa", "calls"),
+        ]
+        lines = []
+        for suffix, help_, attr in metrics:
+            samples = [(key, t[attr]) for key, t in totals.items() if t[attr] is not None]
+            if not samples:
+                continue
+            lines.append(f"# HELP {prefix}_{suffix} {help_}")
+            lines.append(f"# TYPE {prefix}_{suffix} gauge")
+            for (name, labels), value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in (("stage", name),) + labels)
+                lines.append(f"{prefix}_{suffix}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Span con nombre en el Recorder activo; sin Recorder es un no-op
+def span(name: str, rows: int | None = None):
+    rec = _current.get()
+    if rec is None:
+        return _NULL_SPAN
+    return rec.span(name, rows)
+
+
+# Activa un Recorder para el bloque (None = sin instrumentación)
+@contextlib.contextmanager
+def recording(recorder: Recorder | None):
+    if recorder is None:
+        yield None
+        return
+    token = _current.set(recorder)
+    started = recorder.memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        if started:
+            tracemalloc.stop()
+
+
+# Resultado de `profiled`: informe de texto disponible al salir del bloque
+class ProfileReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.text = ""
+
+
+# Perfil completo del bloque con cProfile o pyinstrument (None = desactivado).
+# `output` guarda el perfil (.prof para cProfile, .html o texto para pyinstrument)
+@contextlib.contextmanager
+def profiled(kind: str | None = None, output: str | None = None, limit: int = 30):
+    if kind is None:
+        yield None
+        return
+    report = ProfileReport(kind)
+    if kind == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield report
+        finally:
+            profiler.disable()
+            if output:
+                profiler.dump_stats(output)
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(limit)
+            report.text = buf.getvalue()
+    elif kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("El perfilado con pyinstrument requiere 'pip install pyinstrument'") from None
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield report
+        finally:
+            profiler.stop()
+            report.text = profiler.output_text()
+            if output:
+                with open(output, "w") as f:
+                    f.write(profiler.output_html() if output.endswith(".html") else report.text)
+    else:
+        raise ValueError(f"Perfilador desconocido: {kind!r} (use 'cprofile' o 'pyinstrument')")
+
+
+# Tabla de spans para la consola
+def format_table(recorder: Recorder, out=sys.stderr):
+    memory = recorder.memory
+    header = f"{'etapa':<28}{'wall ms':>10}{'cpu ms':>10}{'filas':>9}" + (f"{'Δ MB':>9}{'pico MB':>9}" if memory else "")
+    print(header, file=out)
+    for s in recorder.spans:
+        name = "  " * s.depth + s.name
+        line = f"{name:<28}{s.wall * 1000:>10.2f}{s.cpu * 1000:>10.2f}{'' if s.rows is None else s.rows:>9}"
+        if memory and s.mem_peak is not None:
+            line += f"{s.mem_delta / 1024**2:>9.1f}{s.mem_peak / 1024**2:>9.1f}"
+        print(line, file=out)
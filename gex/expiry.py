@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+# Tiempo hasta vencimiento en años hábiles con precisión intradía. T se calcula una vez por
+# vencimiento distinto (unas pocas decenas por chain) y se reparte a los contratos.
+#
+# Unidad: sesiones regulares de NYSE/Cboe. Un contrato que vence a las 16:00 del día D tiene
+# por delante lo que queda de la sesión de hoy más una sesión completa por cada día hábil
+# en (hoy, D]; así un 0DTE pasa de 1/262 en la apertura a 0 en el cierre.
+import functools
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Zona horaria y horario de la sesión regular
+MARKET_TZ = "America/New_York"
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Sesiones por año: la base de daysTillExp
+BUSINESS_DAYS = 262
+
+# T mínimo de un contrato no vencido: un minuto de sesión
+_MIN_SESSION_FRACTION = 1 / 390
+
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year, month, weekday):
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+# Domingo de Pascua (algoritmo gregoriano anónimo)
+def _easter(year):
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+# Festivo en sábado se observa el viernes y en domingo el lunes
+def _observed(d):
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+# Festivos y cierres anticipados (13:00) de NYSE de un año, según las reglas vigentes
+@functools.lru_cache(maxsize=None)
+def _year_calendar(year):
+    holidays = [
+        _nth_weekday(year, 1, 0, 3),                 # Martin Luther King Jr.
+        _nth_weekday(year, 2, 0, 3),                 # Presidents' Day
+        _easter(year) - timedelta(days=2),           # Viernes Santo
+        _last_weekday(year, 5, 0),                   # Memorial Day
+        _observed(date(year, 7, 4)),                 # Independence Day
+        _nth_weekday(year, 9, 0, 1),                 # Labor Day
+        _nth_weekday(year, 11, 3, 4),                # Thanksgiving
+        _observed(date(year, 12, 25)),               # Navidad
+    ]
+    # Año Nuevo en sábado no se observa el viernes anterior (cae en el año previo)
+    if date(year, 1, 1).weekday() != 5:
+        holidays.append(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.append(_observed(date(year, 6, 19)))  # Juneteenth
+
+    thanksgiving = _nth_weekday(year, 11, 3, 4)
+    early = [thanksgiving + timedelta(days=1), date(year, 12, 24), date(year, 7, 3)]
+    early = [d for d in early if d.weekday() < 5 and d not in holidays]
+    return tuple(sorted(holidays)), tuple(sorted(early))
+
+
+# Festivos de mercado entre dos años (inclusive) como datetime64[D], listos para np.busday_count
+@functools.lru_cache(maxsize=32)
+def market_holidays(startYear: int, endYear: int) -> np.ndarray:
+    days = [d for year in range(startYear, endYear + 1) for d in _year_calendar(year)[0]]
+    return np.array(days, dtype='datetime64[D]')
+
+
+def is_early_close(d: date) -> bool:
+    return d in _year_calendar(d.year)[1]
+
+
+# Ahora en Nueva York (con zona horaria)
+def market_now() -> datetime:
+    import pytz
+    return datetime.now(pytz.timezone(MARKET_TZ))
+
+
+# Momento de valoración en hora local de Nueva York (naive). Una fecha sin hora se toma
+# antes de la apertura; un datetime sin zona se supone ya en hora de Nueva York
+def _as_market_time(asOf):
+    if asOf is None:
+        asOf = market_now()
+    if not isinstance(asOf, datetime):
+        return datetime.combine(asOf, time(0))
+    if asOf.tzinfo is not None:
+        import pytz
+        asOf = asOf.astimezone(pytz.timezone(MARKET_TZ)).replace(tzinfo=None)
+    return asOf
+
+
+# Fracción de la sesión de hoy que queda por delante (0 si hoy no hay sesión)
+def session_remaining(asOf, holidays=None) -> float:
+    now = _as_market_time(asOf)
+    today = now.date()
+    if holidays is None:
+        holidays = market_holidays(today.year, today.year)
+    if not np.is_busday(np.datetime64(today, 'D'), holidays=holidays):
+        return 0.0
+
+    opens = datetime.combine(today, MARKET_OPEN)
+    closes = datetime.combine(today, EARLY_CLOSE if is_early_close(today) else MARKET_CLOSE)
+    if now <= opens:
+        return 1.0
+    if now >= closes:
+        return 0.0
+    return (closes - now) / (closes - opens)
+
+
+# T en años hábiles para cada vencimiento (array o Series de fechas), evaluado en `asOf`
+# (datetime, date o None = ahora). Los vencimientos ya pasados o NaT dan 0
+def time_to_expiry(expirations, asOf=None) -> np.ndarray:
+    now = _as_market_time(asOf)
+    today = np.datetime64(now.date(), 'D')
+
+    expDays = np.asarray(expirations, dtype='datetime64[ns]').astype('datetime64[D]')
+    unique, inverse = np.unique(expDays, return_inverse=True)
+    valid = ~np.isnat(unique)
+    lastYear = int(unique[valid].max().astype(object).year) if valid.any() else now.year
+    holidays = market_holidays(now.year, max(now.year, lastYear))
+
+    remaining = session_remaining(now, holidays)
+    ahead = valid & (unique > today)
+    days = np.zeros(len(unique))
+    days[ahead] = remaining + np.busday_count(today + 1, unique[ahead] + 1, holidays=holidays)
+    days[valid & (unique == today)] = remaining
+    days = np.where(days > 0, np.maximum(days, _MIN_SESSION_FRACTION), 0.0)
+    return (days / BUSINESS_DAYS)[inverse.ravel()]
+
+
+# Tercer viernes del mes (vencimiento mensual), vectorizado sobre una Series de fechas
+def third_fridays(expirations: pd.Series) -> pd.Series:
+    exp = pd.to_datetime(expirations).dt
+    return (exp.weekday == 4) & exp.day.between(15, 21)
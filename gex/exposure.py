@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .parallel import default_workers, run_tasks
+
+
+# Suma por strike de las columnas numéricas dentro de un rango [lo, hi] de strikes
+def _aggregate_range(arrays, columns, lo, hi):
+    strikes = arrays['StrikePrice']
+    sel = (strikes >= lo) & (strikes <= hi)
+    part = pd.DataFrame({col: arrays[col][sel] for col in columns})
+    return part.groupby(['StrikePrice']).sum(numeric_only=True)
+
+
+# Agregación por strike (equivalente a df.groupby(['StrikePrice']).sum(numeric_only=True)),
+# repartiendo rangos de strikes completos entre workers para que cada suma sea idéntica
+def aggregate_by_strike(df, workers=None, backend="serial"):
+    numeric = df.select_dtypes(include=['number', 'bool'])
+    columns = list(numeric.columns)
+    strikes = np.unique(numeric['StrikePrice'].dropna().to_numpy())
+    if backend == "serial" or workers == 1 or len(strikes) == 0:
+        return numeric.groupby(['StrikePrice']).sum(numeric_only=True)
+
+    arrays = {col: numeric[col].to_numpy() for col in columns}
+    workers = workers or default_workers()
+    ranges = [(columns, part[0], part[-1]) for part in np.array_split(strikes, workers) if len(part)]
+    parts = run_tasks(_aggregate_range, ranges, arrays, backend, workers)
+    return pd.concat(parts)
+
+
+# GEX por contrato en $ por 1% de movimiento (añade CallGEX, PutGEX y TotalGamma a df)
+# y su agregación por strike
+def compute_gex(df: pd.DataFrame, spotPrice: float, workers: int | None = None,
+                backend: str = "serial") -> pd.DataFrame:
+    df['CallGEX'] = df['CallGamma'] * df['CallOpenInt'] * 100 * spotPrice * spotPrice * 0.01
+    df['PutGEX'] = df['PutGamma'] * df['PutOpenInt'] * 100 * spotPrice * spotPrice * 0.01 * -1
+    df['TotalGamma'] = (df.CallGEX + df.PutGEX) / 10**9
+    return aggregate_by_strike(df, workers=workers, backend=backend)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+# Descarga concurrente de chains con asyncio y aiohttp: una sesión keep-alive con pool de
+# conexiones compartida por todos los tickers, timeout por petición (conexión, lectura y
+# total), reintentos acotados con backoff exponencial y jitter, y gzip negociado y
+# descomprimido a medida que llegan los bloques del cuerpo.
+#
+#   results = fetch_all({"SPX": (url, {}), "NDX": (url, {})}, concurrency=8)
+#   results["SPX"].payload      # o una ChainFetchError si se agotaron los reintentos
+#
+# `decoder(ticker)` crea el consumidor del cuerpo (feed/result); por defecto JsonBody
+# devuelve el JSON entero, y gex.ingest.ChainDecoder lo decodifica en streaming.
+import asyncio
+import json
+import random
+import zlib
+from dataclasses import dataclass, field
+
+# Timeouts por intento (segundos): conexión, lectura sin datos (CDN atascado) y total
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+DEFAULT_TIMEOUT = 30
+
+# Reintentos tras el primer intento y base del backoff exponencial (segundos)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 10
+
+# Descargas simultáneas (y conexiones del pool)
+DEFAULT_CONCURRENCY = 8
+
+# Códigos que se reintentan: límite de peticiones y errores transitorios del servidor/CDN
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+_CHUNK_SIZE = 64 * 1024
+
+
+# Respuesta de una descarga: código, cabeceras de revalidación y cuerpo decodificado (None en un 304).
+# El payload queda fuera del repr: asyncio formatea los resultados de las tareas
+@dataclass
+class FetchResult:
+    status: int
+    payload: object = field(default=None, repr=False)
+    etag: str | None = None
+    last_modified: str | None = None
+    retry_after: str | None = None
+    attempts: int = 1
+
+
+# Espera antes del reintento `attempt` (0 = primero): Retry-After si el servidor lo da,
+# si no backoff exponencial con jitter completo
+def retry_delay(attempt, backoff=DEFAULT_BACKOFF, retryAfter=None):
+    if retryAfter is not None:
+        try:
+            return min(float(retryAfter), MAX_BACKOFF)
+        except ValueError:
+            pass
+    return random.uniform(0, min(MAX_BACKOFF, backoff * 2**attempt))
+
+
+# Cuerpo JSON completo: acumula los bloques y lo parsea al final
+class JsonBody:
+    def __init__(self, ticker=None):
+        self._parts = []
+
+    def feed(self, chunk):
+        self._parts.append(chunk)
+
+    def result(self):
+        return json.loads(b"".join(self._parts))
+
+
+# Descomprime gzip bloque a bloque mientras se descarga y pasa el resultado al decodificador
+class _Gunzip:
+    def __init__(self, decoder):
+        self._decoder = decoder
+        self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, chunk):
+        self._decoder.feed(self._inflate.decompress(chunk))
+
+    def result(self):
+        self._decoder.feed(self._inflate.flush())
+        return self._decoder.result()
+
+
+# Un intento: cabeceras, cuerpo por bloques y decodificación
+async def _get(session, url, headers, decoder):
+    async with session.get(url, headers={"Accept-Encoding": "gzip", **headers}) as response:
+        result = FetchResult(response.status, etag=response.headers.get("ETag"),
+                             last_modified=response.headers.get("Last-Modified"))
+        if response.status != 200:
+            result.retry_after = response.headers.get("Retry-After")
+            return result
+        if response.headers.get("Content-Encoding") == "gzip":
+            decoder = _Gunzip(decoder)
+        async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+            decoder.feed(chunk)
+        result.payload = decoder.result()
+        return result
+
+
+# Descarga con reintentos de un ticker. Errores de red, timeouts, cuerpos truncados o
+# ilegibles y los códigos de RETRY_STATUS se reintentan; el resto se devuelven tal cual
+async def fetch_one(session, ticker, url, headers=None, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                    decoder=JsonBody):
+    import aiohttp
+
+    from .cache import ChainFetchError
+
+    for attempt in range(retries + 1):
+        try:
+            result = await _get(session, url, headers or {}, decoder(ticker))
+        except (aiohttp.ClientError, asyncio.TimeoutError, zlib.error, ValueError) as e:
+            error = ChainFetchError(ticker, None, f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+            retryAfter = None
+        else:
+            result.attempts = attempt + 1
+            if result.status not in RETRY_STATUS:
+                return result
+            retryAfter = result.retry_after
+            error = ChainFetchError(ticker, result.status)
+        if attempt < retries:
+            await asyncio.sleep(retry_delay(attempt, backoff, retryAfter))
+    raise error
+
+
+# Descarga concurrente de {ticker: (url, cabeceras)} con una sesión compartida.
+# Devuelve {ticker: FetchResult o ChainFetchError}, en el mismo orden
+async def fetch_all_async(targets, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                          retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, decoder=JsonBody):
+    import aiohttp
+
+    from .cache import ChainFetchError
+
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    clientTimeout = aiohttp.ClientTimeout(total=timeout, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(session, ticker, url, headers):
+        async with semaphore:
+            try:
+                return await fetch_one(session, ticker, url, headers, retries, backoff, decoder)
+            except ChainFetchError as e:
+                return e
+
+    # auto_decompress=False: el gzip lo descomprime _Gunzip a medida que llega
+    async with aiohttp.ClientSession(connector=connector, timeout=clientTimeout, auto_decompress=False) as session:
+        results = await asyncio.gather(*(bounded(session, ticker, url, headers)
+                                         for ticker, (url, headers) in targets.items()))
+    return dict(zip(targets, results))
+
+
+# Versión síncrona de fetch_all_async (CLI, dashboard): abre y cierra su propio event loop
+def fetch_all(targets, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+              backoff=DEFAULT_BACKOFF, decoder=JsonBody):
+    return asyncio.run(fetch_all_async(targets, concurrency, timeout, retries, backoff, decoder))
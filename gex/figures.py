@@ -0,0 +1,568 @@
+# Figuras Plotly del análisis GEX. plotly se importa al construir la primera
+# figura, así el uso headless (CLI, batch) no paga su coste de importación.
+#
+# Las figuras sólo llevan al navegador lo que se ve: las barras se recortan al rango
+# visible del eje x, las líneas largas se diezman (mín/máx por bloque) y los marcadores
+# verticales repetidos van en una única traza en vez de una forma por línea.
+import numpy as np
+
+# Puntos máximos por línea antes de diezmar; None envía la línea completa
+MAX_LINE_POINTS = 2000
+
+# Líneas con más puntos que esto se dibujan con WebGL (Scattergl)
+WEBGL_POINTS = 5000
+
+
+def _go():
+    import plotly.graph_objects as go
+    return go
+
+
+# Tramo de un eje x ordenado dentro de [lo, hi], con un punto de margen a cada lado
+# para que las barras del borde no queden cortadas
+def _visible(x, lo, hi):
+    x = np.asarray(x)
+    start = max(int(np.searchsorted(x, lo, side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, hi, side='right')) + 1, len(x))
+    return slice(start, stop)
+
+
+# Diezmado mín/máx: por cada bloque de puntos conserva el mínimo y el máximo (y los
+# extremos de la serie), así picos y cruces por cero siguen visibles con ~maxPoints puntos
+def _decimate(x, y, maxPoints=MAX_LINE_POINTS):
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n = len(y)
+    if maxPoints is None or n <= maxPoints:
+        return x, y
+    size = -(-n // (maxPoints // 2))
+    blocks = -(-n // size)
+    padded = np.full(blocks * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(blocks, size)
+    offsets = np.arange(blocks) * size
+    lows = offsets + np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    highs = offsets + np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    keep = np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+    keep = keep[keep < n]
+    return x[keep], y[keep]
+
+
+# Traza de línea diezmada; con muchos puntos (MAX_LINE_POINTS=None) pasa a Scattergl
+def _line(go, x, y, **kwargs):
+    x, y = _decimate(x, y)
+    trace = go.Scattergl if len(x) > WEBGL_POINTS else go.Scatter
+    return trace(x=x, y=y, mode='lines', **kwargs)
+
+
+# Líneas verticales de suelo a techo en una sola traza (segmentos separados por huecos),
+# en lugar de una forma add_vline por línea
+def _vlines(go, xs, **kwargs):
+    x, y = _vline_xy(xs)
+    return go.Scatter(x=x, y=y, mode='lines', **kwargs)
+
+
+def _vline_xy(xs):
+    xs = np.unique(np.asarray(xs, dtype=float))
+    return [v for k in xs for v in (k, k, None)], [0, 1, None] * len(xs)
+
+
+# Tamaño de una figura tal como se envía al navegador: puntos de datos y bytes del JSON
+def figure_stats(fig):
+    import plotly.io as pio
+
+    points = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+    return {'points': points, 'bytes': len(pio.to_json(fig, validate=False))}
+
+
+# === GRÁFICO 1: Total Gamma Exposure ===
+def fig_total_gamma(a):
+    go = _go()
+    dfAgg = a.dfAgg.iloc[_visible(a.dfAgg.index.values, a.fromStrike, a.toStrike)]
+    fig1 = go.Figure()
+    fig1.add_trace(go.Bar(
+        x=dfAgg.index.values,
+        y=dfAgg['TotalGamma'].to_numpy(),
+        name="Gamma Exposure",
+        marker_color='lightblue',
+        marker_line_color='black',
+        marker_line_width=0.5
+    ))
+
+    fig1.add_vline(x=a.spotPrice, line_dash="dash", line_color="red",
+                   annotation_text=f"{a.ticker} Spot: {a.spotPrice:,.0f}")
+
+    fig1.update_layout(
+        title=f"Total Gamma: ${a.df['TotalGamma'].sum():.2f} Bn per 1% {a.ticker} Move",
+        xaxis_title="Strike",
+        yaxis_title="Spot Gamma Exposure ($ billions/1% move)",
+        showlegend=True,
+        height=500,
+        xaxis_range=[a.fromStrike, a.toStrike]
+    )
+    return fig1
+
+
+# === GRÁFICO 2: Open Interest ===
+def fig_open_interest(a):
+    go = _go()
+    dfAgg = a.dfAgg.iloc[_visible(a.dfAgg.index.values, a.fromStrike, a.toStrike)]
+    strikes = dfAgg.index.values
+    fig2 = go.Figure()
+    fig2.add_trace(go.Bar(
+        x=strikes,
+        y=dfAgg['CallOpenInt'].to_numpy(),
+        name="Call OI",
+        marker_color='green',
+        marker_line_color='black',
+        marker_line_width=0.5
+    ))
+    fig2.add_trace(go.Bar(
+        x=strikes,
+        y=-1 * dfAgg['PutOpenInt'].to_numpy(),
+        name="Put OI",
+        marker_color='red',
+        marker_line_color='black',
+        marker_line_width=0.5
+    ))
+
+    fig2.add_vline(x=a.spotPrice, line_dash="dash", line_color="red",
+                   annotation_text=f"{a.ticker} Spot: {a.spotPrice:,.0f}")
+
+    fig2.update_layout(
+        title=f"Total Open Interest for {a.ticker}",
+        xaxis_title="Strike",
+        yaxis_title="Open Interest (number of contracts)",
+        showlegend=True,
+        height=500,
+        xaxis_range=[a.fromStrike, a.toStrike]
+    )
+    return fig2
+
+
+# === GRÁFICO 3: Perfil de Gamma Exposure ===
+def fig_profile(a):
+    go = _go()
+    fig3 = go.Figure()
+    fig3.add_trace(_line(go, a.levels, a.totalGamma, name='All Expiries', line=dict(color='blue')))
+    fig3.add_trace(_line(go, a.levels, a.totalGammaExNext, name='Ex-Next Expiry', line=dict(color='orange')))
+    fig3.add_trace(_line(go, a.levels, a.totalGammaExFri, name='Ex-Next Monthly Expiry', line=dict(color='green')))
+
+    fig3.add_vline(x=a.spotPrice, line_dash="dash", line_color="red",
+                   annotation_text=f"{a.ticker} Spot: {a.spotPrice:,.0f}")
+
+    if a.zeroGamma is not None:
+        fig3.add_vline(x=a.zeroGamma, line_dash="dash", line_color="green",
+                       annotation_text=f"Gamma Flip: {a.zeroGamma:,.0f}")
+
+    fig3.add_hline(y=0, line_dash="solid", line_color="grey")
+
+    fig3.update_layout(
+        title=f"Gamma Exposure Profile, {a.ticker}, {a.todayDate.strftime('%d %b %Y')}",
+        xaxis_title="Index Price",
+        yaxis_title="Gamma Exposure ($ billions/1% move)",
+        showlegend=True,
+        height=500,
+        xaxis_range=[a.fromStrike, a.toStrike]
+    )
+    return fig3
+
+
+# === PERFIL DE VANNA Y CHARM (VEX / CEX) ===
+def fig_vanna_charm(a):
+    go = _go()
+    figV = go.Figure()
+    figV.add_trace(_line(go, a.levels, a.totalVanna, name='VEX ($ Bn / 1 vol pt)', line=dict(color='purple')))
+    figV.add_trace(_line(go, a.levels, a.totalCharm, name='CEX ($ Bn / día)',
+                         line=dict(color='darkorange', dash='dot'), yaxis='y2'))
+
+    figV.add_vline(x=a.spotPrice, line_dash="dash", line_color="red",
+                   annotation_text=f"{a.ticker} Spot: {a.spotPrice:,.0f}")
+    figV.add_hline(y=0, line_dash="solid", line_color="grey")
+
+    figV.update_layout(
+        title=f"Vanna y Charm Exposure, {a.ticker}, {a.todayDate.strftime('%d %b %Y')}",
+        xaxis_title="Index Price",
+        yaxis=dict(title="Vanna Exposure ($ billions/1 vol pt)"),
+        yaxis2=dict(title="Charm Exposure ($ billions/día)", overlaying='y', side='right'),
+        showlegend=True,
+        height=500,
+        xaxis_range=[a.fromStrike, a.toStrike]
+    )
+    return figV
+
+
+# === GRÁFICO 4: GEX por Strike ===
+def fig_gex_by_strike(a):
+    go = _go()
+    kl = a.keyLevels
+    spot = a.spotPrice
+    fig4 = go.Figure()
+    if len(kl.pos) > 0:
+        fig4.add_trace(go.Bar(
+            x=kl.pos['StrikePrice'],
+            y=kl.pos['net_gex'],
+            name='GEX Positivo',
+            marker_color='limegreen',
+            marker_line_color='black',
+            marker_line_width=0.8
+        ))
+
+    if len(kl.neg) > 0:
+        fig4.add_trace(go.Bar(
+            x=kl.neg['StrikePrice'],
+            y=kl.neg['net_gex'],
+            name='GEX Negativo',
+            marker_color='red',
+            marker_line_color='black',
+            marker_line_width=0.8
+        ))
+
+    fig4.add_hline(y=0, line_dash="dash", line_color="black")
+    fig4.add_vline(x=spot, line_dash="dash", line_color="black")
+
+    fig4.update_layout(
+        title=f'{a.ticker} GEX x STK (±{a.width} pts del Spot {int(spot)})',
+        xaxis_title="Strike",
+        yaxis_title="Net GEX",
+        showlegend=True,
+        height=500
+    )
+    return fig4
+
+
+# === GRÁFICO 5: Open Interest Total ===
+def fig_open_interest_total(a):
+    go = _go()
+    df_filtered = a.keyLevels.df_filtered
+    spot = a.spotPrice
+    fig5 = go.Figure()
+    fig5.add_trace(go.Bar(
+        x=df_filtered['StrikePrice'],
+        y=df_filtered['total_oi'],
+        name='Open Interest Total',
+        marker_color='orange',
+        marker_line_color='black',
+        marker_line_width=0.8
+    ))
+
+    fig5.add_vline(x=spot, line_dash="dash", line_color="black")
+
+    fig5.update_layout(
+        title=f'OIT x Strike (±{a.width} pts del Spot {int(spot)})',
+        xaxis_title="Strike",
+        yaxis_title="Open Interest Total",
+        showlegend=True,
+        height=500
+    )
+    return fig5
+
+
+# === GRÁFICO 6: Zonas Gamma ===
+def fig_zones(a):
+    go = _go()
+    kl = a.keyLevels
+    max_gex, min_gex = kl.max_gex, kl.min_gex
+    fig6 = go.Figure()
+
+    # Zona gamma (área sombreada)
+    fig6.add_vrect(
+        x0=min_gex['StrikePrice'], x1=max_gex['StrikePrice'],
+        fillcolor="lightgreen", opacity=0.3,
+        layer="below", line_width=0
+    )
+
+    # Líneas verticales para picos de OI, todas en una traza
+    fig6.add_trace(_vlines(go, kl.high_oi_filtered['StrikePrice'], name='Picos de OI',
+                           line=dict(color='orange', dash='dash'), opacity=0.6, hoverinfo='x'))
+
+    # Línea vertical para spot
+    fig6.add_vline(x=a.spotPrice, line_dash="dash", line_color="black", line_width=2)
+
+    fig6.update_layout(
+        title='Zonas clave Gamma y Open Interest',
+        xaxis_title="Strike",
+        yaxis_title="Nivel",
+        showlegend=True,
+        height=500,
+        xaxis_range=[min_gex['StrikePrice'] - 200, max_gex['StrikePrice'] + 200],
+        yaxis_range=[0, 1]
+    )
+    return fig6
+
+
+# === GRÁFICO 7: Gamma Acumulado ===
+def fig_cumulative(a):
+    go = _go()
+    kl = a.keyLevels
+    max_gex, min_gex = kl.max_gex, kl.min_gex
+    xRange = [min_gex['StrikePrice'] - 200, max_gex['StrikePrice'] + 200]
+    df_sorted = kl.df_sorted
+    df_sorted = df_sorted.iloc[_visible(df_sorted['StrikePrice'].to_numpy(), *xRange)]
+
+    fig7 = go.Figure()
+
+    # Zona gamma
+    fig7.add_vrect(
+        x0=min_gex['StrikePrice'], x1=max_gex['StrikePrice'],
+        fillcolor="lightgreen", opacity=0.3,
+        layer="below", line_width=0
+    )
+
+    # Barras de GEX neto
+    fig7.add_trace(go.Bar(
+        x=df_sorted['StrikePrice'],
+        y=df_sorted['net_gex'],
+        name='GEX Neto',
+        marker_color='lightblue',
+        opacity=0.5
+    ))
+
+    # Línea de GEX acumulado
+    fig7.add_trace(go.Scatter(
+        x=df_sorted['StrikePrice'],
+        y=df_sorted['cumulative_gex'],
+        mode='lines',
+        name='GEX Acumulado',
+        line=dict(color='blue', width=2)
+    ))
+
+    # Línea vertical spot
+    fig7.add_vline(x=a.spotPrice, line_dash="dash", line_color="black", line_width=2)
+
+    fig7.update_layout(
+        title=f'{a.ticker} Gamma Exposure Acumulado (Cumulative GEX)',
+        xaxis_title="Strike",
+        yaxis_title="GEX Acumulado",
+        showlegend=True,
+        height=500,
+        xaxis_range=xRange
+    )
+    return fig7
+
+
+# === HISTORIAL: niveles clave en el tiempo (HistoryStore.levels) ===
+def fig_history_levels(levels, ticker):
+    go = _go()
+    figH = go.Figure()
+    figH.add_trace(go.Scatter(x=levels['timestamp'], y=levels['spot'], mode='lines+markers', name='Spot',
+                              line=dict(color='red')))
+    figH.add_trace(go.Scatter(x=levels['timestamp'], y=levels['zero_gamma'], mode='lines+markers',
+                              name='Gamma Flip', line=dict(color='green')))
+    figH.add_trace(go.Scatter(x=levels['timestamp'], y=levels['max_gex_strike'], mode='lines', name='Máx GEX',
+                              line=dict(color='blue', dash='dash', shape='hv')))
+    figH.add_trace(go.Scatter(x=levels['timestamp'], y=levels['min_gex_strike'], mode='lines', name='Mín GEX',
+                              line=dict(color='orange', dash='dash', shape='hv')))
+    figH.add_trace(go.Bar(x=levels['timestamp'], y=levels['total_gamma'], name='GEX total ($ Bn)',
+                          marker_color='lightblue', opacity=0.5, yaxis='y2'))
+
+    figH.update_layout(
+        title=f"Niveles clave en el tiempo, {ticker}",
+        xaxis_title="Snapshot",
+        yaxis=dict(title="Nivel"),
+        yaxis2=dict(title="GEX total ($ billions/1% move)", overlaying='y', side='right', showgrid=False),
+        showlegend=True,
+        height=500
+    )
+    return figH
+
+
+# === HISTORIAL: cambio de GEX neto por strike entre dos snapshots (HistoryStore.strike_changes) ===
+def fig_strike_changes(changes, ticker, spot=None):
+    go = _go()
+    change = changes['change'].to_numpy()
+    figD = go.Figure(go.Bar(
+        x=changes.index.values,
+        y=change,
+        name="Cambio de GEX neto",
+        marker_color=['green' if v >= 0 else 'red' for v in change],
+        marker_line_color='black',
+        marker_line_width=0.5
+    ))
+    if spot is not None:
+        figD.add_vline(x=spot, line_dash="dash", line_color="red", annotation_text=f"{ticker} Spot: {spot:,.0f}")
+
+    start, end = changes.attrs.get('start'), changes.attrs.get('end')
+    period = f" ({start:%d %b %H:%M} → {end:%d %b %H:%M})" if start is not None else ""
+    figD.update_layout(
+        title=f"Cambio de GEX neto por strike, {ticker}{period}",
+        xaxis_title="Strike",
+        yaxis_title="Δ GEX neto",
+        showlegend=False,
+        height=500
+    )
+    return figD
+
+
+# === ESCENARIOS: superficie de GEX spot x desplazamiento de vol (ScenarioGrid) ===
+def fig_scenarios(grid, ticker, spot=None):
+    go = _go()
+    total = grid.total
+    figS = go.Figure(go.Heatmap(
+        x=grid.levels,
+        y=grid.volShifts,
+        z=total,
+        colorscale='RdBu',
+        zmid=0,
+        colorbar=dict(title="$ Bn/1%"),
+        hovertemplate="Spot %{x:,.0f}<br>Vol %{y:+g} pts<br>GEX %{z:.2f} Bn<extra></extra>",
+        name="GEX"
+    ))
+    # Contorno de gamma cero: el gamma flip de cada escenario de vol
+    figS.add_trace(go.Contour(
+        x=grid.levels,
+        y=grid.volShifts,
+        z=total,
+        contours=dict(start=0, end=0, size=1, coloring='lines', showlabels=False),
+        line=dict(color='black', width=2),
+        showscale=False,
+        hoverinfo='skip',
+        name="Gamma Flip",
+        showlegend=True
+    ))
+    if spot is not None:
+        figS.add_vline(x=spot, line_dash="dash", line_color="red", annotation_text=f"{ticker} Spot: {spot:,.0f}")
+    figS.add_hline(y=0, line_dash="dot", line_color="grey")
+
+    figS.update_layout(
+        title=f"Escenarios de GEX: spot x desplazamiento de vol, {ticker}",
+        xaxis_title="Index Price",
+        yaxis_title="Desplazamiento de IV (puntos de vol)",
+        height=500
+    )
+    return figS
+
+
+# === ESCENARIOS: GEX por vencimiento en un desplazamiento de vol (ScenarioGrid.by_expiry) ===
+def fig_scenario_expiries(grid, ticker, volShift=0, spot=None):
+    go = _go()
+    byExpiry = grid.by_expiry(volShift)
+    figE = go.Figure(go.Heatmap(
+        x=byExpiry.columns.values,
+        y=byExpiry.index.strftime('%Y-%m-%d'),
+        z=byExpiry.to_numpy(),
+        colorscale='RdBu',
+        zmid=0,
+        colorbar=dict(title="$ Bn/1%"),
+        hovertemplate="Spot %{x:,.0f}<br>%{y}<br>GEX %{z:.3f} Bn<extra></extra>",
+        name="GEX"
+    ))
+    if spot is not None:
+        figE.add_vline(x=spot, line_dash="dash", line_color="red", annotation_text=f"{ticker} Spot: {spot:,.0f}")
+
+    figE.update_layout(
+        title=f"GEX por vencimiento, {ticker}, IV {volShift:+g} puntos de vol",
+        xaxis_title="Index Price",
+        yaxis_title="Vencimiento",
+        yaxis_type='category',
+        height=max(400, 22 * len(byExpiry))
+    )
+    return figE
+
+
+# Figuras del modo en vivo: se crean una vez y luego sólo se actualizan sus datos.
+# En todas la primera línea (shapes[0]) es la del spot
+def live_figures():
+    go = _go()
+    fig1 = go.Figure(go.Bar(name="Gamma Exposure", marker_color='lightblue',
+                            marker_line_color='black', marker_line_width=0.5))
+    fig2 = go.Figure([
+        go.Bar(name="Call OI", marker_color='green', marker_line_color='black', marker_line_width=0.5),
+        go.Bar(name="Put OI", marker_color='red', marker_line_color='black', marker_line_width=0.5),
+    ])
+    fig3 = go.Figure([
+        go.Scatter(mode='lines', name='All Expiries', line=dict(color='blue')),
+        go.Scatter(mode='lines', name='Ex-Next Expiry', line=dict(color='orange')),
+        go.Scatter(mode='lines', name='Ex-Next Monthly Expiry', line=dict(color='green')),
+    ])
+    for fig in (fig1, fig2, fig3):
+        fig.add_vline(x=0, line_dash="dash", line_color="red", annotation_text="Spot")
+        fig.update_layout(xaxis_title="Strike", showlegend=True, height=500)
+    fig3.add_vline(x=0, line_dash="dash", line_color="green", annotation_text="Gamma Flip", visible=False)
+    fig3.add_hline(y=0, line_dash="solid", line_color="grey")
+    fig1.update_layout(yaxis_title="Spot Gamma Exposure ($ billions/1% move)")
+    fig2.update_layout(yaxis_title="Open Interest (number of contracts)")
+    fig3.update_layout(xaxis_title="Index Price", yaxis_title="Gamma Exposure ($ billions/1% move)")
+
+    fig4 = go.Figure([
+        go.Bar(name='GEX Positivo', marker_color='limegreen', marker_line_color='black', marker_line_width=0.8),
+        go.Bar(name='GEX Negativo', marker_color='red', marker_line_color='black', marker_line_width=0.8),
+    ])
+    fig5 = go.Figure(go.Bar(name='Open Interest Total', marker_color='orange',
+                            marker_line_color='black', marker_line_width=0.8))
+    fig6 = go.Figure(go.Scatter(mode='lines', name='Picos de OI', line=dict(color='orange', dash='dash'),
+                                opacity=0.6, hoverinfo='x'))
+    fig7 = go.Figure([
+        go.Bar(name='GEX Neto', marker_color='lightblue', opacity=0.5),
+        go.Scatter(mode='lines', name='GEX Acumulado', line=dict(color='blue', width=2)),
+    ])
+    for fig in (fig4, fig5, fig6, fig7):
+        fig.add_vline(x=0, line_dash="dash", line_color="black", line_width=2)
+        fig.update_layout(xaxis_title="Strike", showlegend=True, height=500)
+    fig4.add_hline(y=0, line_dash="dash", line_color="black")
+    for fig in (fig6, fig7):
+        fig.add_vrect(x0=0, x1=0, fillcolor="lightgreen", opacity=0.3, layer="below", line_width=0)
+    fig4.update_layout(yaxis_title="Net GEX")
+    fig5.update_layout(yaxis_title="Open Interest Total")
+    fig6.update_layout(title='Zonas clave Gamma y Open Interest', yaxis_title="Nivel", yaxis_range=[0, 1])
+    fig7.update_layout(yaxis_title="GEX Acumulado")
+    return fig1, fig2, fig3, fig4, fig5, fig6, fig7
+
+
+# Actualiza las figuras en vivo con el último estado del stream; como las figuras iniciales,
+# las barras por strike sólo llevan el rango visible
+def update_live_figures(figs, stream):
+    fig1, fig2, fig3, fig4, fig5, fig6, fig7 = figs
+    spotPrice = stream.spotPrice
+    xRange = [0.8 * spotPrice, 1.2 * spotPrice]
+    dfAgg = stream.dfAgg.iloc[_visible(stream.dfAgg.index.values, *xRange)]
+    strikes = dfAgg.index.values
+    totalGamma, totalGammaExNext, totalGammaExFri = stream.profile
+
+    fig1.data[0].update(x=strikes, y=dfAgg['TotalGamma'].to_numpy())
+    fig1.update_layout(title=f"Total Gamma: ${stream.dfAgg['TotalGamma'].sum():.2f} Bn per 1% {stream.ticker} Move")
+    fig2.data[0].update(x=strikes, y=dfAgg['CallOpenInt'].to_numpy())
+    fig2.data[1].update(x=strikes, y=-1 * dfAgg['PutOpenInt'].to_numpy())
+    fig2.update_layout(title=f"Total Open Interest for {stream.ticker}")
+    for i, y in enumerate((totalGamma, totalGammaExNext, totalGammaExFri)):
+        x, y = _decimate(stream.levels, y)
+        fig3.data[i].update(x=x, y=y)
+    fig3.update_layout(title=f"Gamma Exposure Profile, {stream.ticker}, {stream.timestamp}")
+
+    for fig in (fig1, fig2, fig3):
+        fig.layout.shapes[0].update(x0=spotPrice, x1=spotPrice)
+        fig.layout.annotations[0].update(x=spotPrice, text=f"{stream.ticker} Spot: {spotPrice:,.0f}")
+        fig.update_layout(xaxis_range=xRange)
+    hasFlip = stream.zeroGamma is not None
+    fig3.layout.shapes[1].update(visible=hasFlip)
+    fig3.layout.annotations[1].update(visible=hasFlip)
+    if hasFlip:
+        fig3.layout.shapes[1].update(x0=stream.zeroGamma, x1=stream.zeroGamma)
+        fig3.layout.annotations[1].update(x=stream.zeroGamma, text=f"Gamma Flip: {stream.zeroGamma:,.0f}")
+    update_live_levels(figs, stream)
+
+
+# Actualiza sólo las figuras de zonas clave (4 a 7), p. ej. al cambiar el width sin snapshot nuevo
+def update_live_levels(figs, stream):
+    fig4, fig5, fig6, fig7 = figs[3:]
+    kl = stream.keyLevels
+    max_gex, min_gex = kl.max_gex['StrikePrice'], kl.min_gex['StrikePrice']
+    zoneRange = [min_gex - 200, max_gex + 200]
+    df_sorted = kl.df_sorted
+    df_sorted = df_sorted.iloc[_visible(df_sorted['StrikePrice'].to_numpy(), *zoneRange)]
+
+    fig4.data[0].update(x=kl.pos['StrikePrice'].to_numpy(), y=kl.pos['net_gex'].to_numpy())
+    fig4.data[1].update(x=kl.neg['StrikePrice'].to_numpy(), y=kl.neg['net_gex'].to_numpy())
+    fig4.update_layout(title=f'{stream.ticker} GEX x STK (±{kl.width} pts del Spot {int(kl.spot)})')
+    fig5.data[0].update(x=kl.df_filtered['StrikePrice'].to_numpy(), y=kl.df_filtered['total_oi'].to_numpy())
+    fig5.update_layout(title=f'OIT x Strike (±{kl.width} pts del Spot {int(kl.spot)})')
+    x, y = _vline_xy(kl.high_oi_filtered['StrikePrice'])
+    fig6.data[0].update(x=x, y=y)
+    fig7.data[0].update(x=df_sorted['StrikePrice'].to_numpy(), y=df_sorted['net_gex'].to_numpy())
+    fig7.data[1].update(x=df_sorted['StrikePrice'].to_numpy(), y=df_sorted['cumulative_gex'].to_numpy())
+    fig7.update_layout(title=f'{stream.ticker} Gamma Exposure Acumulado (Cumulative GEX)')
+
+    for fig in (fig4, fig5, fig6, fig7):
+        fig.layout.shapes[0].update(x0=kl.spot, x1=kl.spot)
+    for fig in (fig6, fig7):
+        fig.layout.shapes[1].update(x0=min_gex, x1=max_gex)
+        fig.update_layout(xaxis_range=zoneRange)
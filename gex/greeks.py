@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+# Motor de Greeks Black-Scholes en forma cerrada sobre matrices (niveles x contratos).
+# d1/d2 y los intermedios comunes (σ√T, e^{-qT}, φ(d1)) se calculan una vez por bloque
+# y de ellos salen juntas las exposiciones de gamma, vanna, charm y delta.
+import numpy as np
+
+from .expiry import BUSINESS_DAYS
+
+# Greeks disponibles, en el orden en que se devuelven
+GREEKS = ("gamma", "vanna", "charm", "delta")
+
+_INV_SQRT_2PI = 1 / np.sqrt(2 * np.pi)
+
+
+# Densidad normal estándar: una exponencial y un producto, sin el despacho genérico de scipy
+def norm_pdf(x, out=None):
+    out = np.multiply(x, x, out=out)
+    out *= -0.5
+    np.exp(out, out=out)
+    out *= _INV_SQRT_2PI
+    return out
+
+
+def _norm_cdf(x):
+    from scipy.special import ndtr
+    return ndtr(x)
+
+
+# Exposiciones por (nivel, contrato) de un lado del chain (calls o puts), por contrato de 100:
+#   gamma: $ de delta por 1% de movimiento del subyacente (GEX)
+#   vanna: $ de delta por 1 punto de volatilidad (VEX)
+#   charm: $ de delta que se pierde en un día hábil (CEX)
+#   delta: $ de delta (DEX)
+# T o vol nulos aportan 0 y los NaN se ignoran, igual que calcGammaEx
+def exposure_matrices(levels, K, vol, T, OI, r=0, q=0, optType="call", greeks=GREEKS) -> dict[str, np.ndarray]:
+    unknown = set(greeks) - set(GREEKS)
+    if unknown:
+        raise ValueError(f"Greeks desconocidos: {sorted(unknown)} (disponibles: {', '.join(GREEKS)})")
+
+    S = np.asarray(levels, dtype=float)[:, None]
+    K = np.asarray(K, dtype=float)[None, :]
+    vol = np.asarray(vol, dtype=float)[None, :]
+    T = np.asarray(T, dtype=float)[None, :]
+    OI = np.asarray(OI, dtype=float)[None, :]
+    call = optType == "call"
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Intermedios por contrato (1 x contratos)
+        sqrtT = np.sqrt(T)
+        volSqrtT = vol * sqrtT
+        expQT = np.exp(-q*T)
+        drift = (r - q + 0.5*vol**2) * T
+        notional = OI * 100 * S * expQT           # niveles x contratos
+
+        d1 = np.log(S/K)
+        d1 += drift
+        d1 /= volSqrtT
+        pdf = norm_pdf(d1)
+        needsCdf = "delta" in greeks or ("charm" in greeks and q != 0)
+        cdf = _norm_cdf(d1 if call else -d1) if needsCdf else None
+
+        if "gamma" in greeks:
+            # OI * 100 * S² * 0.01 * Γ, con Γ = e^{-qT} φ(d1) / (S σ√T)
+            out["gamma"] = notional * pdf / volSqrtT * 0.01
+        if "vanna" in greeks or "charm" in greeks:
+            d2 = d1 - volSqrtT
+        if "vanna" in greeks:
+            # ∂Δ/∂σ = -e^{-qT} φ(d1) d2 / σ, por punto de volatilidad
+            out["vanna"] = -notional * pdf * d2 / vol * 0.01
+        if "charm" in greeks:
+            # -∂Δ/∂T (deriva de delta con el paso del tiempo), por día hábil
+            decay = pdf * (2*(r - q)*T - d2*volSqrtT) / (2*T*volSqrtT)
+            if q != 0:
+                decay -= q * cdf if call else -q * cdf
+            out["charm"] = -notional * decay / BUSINESS_DAYS
+        if "delta" in greeks:
+            out["delta"] = notional * cdf if call else -notional * cdf
+
+    invalid = (T == 0) | (vol == 0)
+    for name, values in out.items():
+        values[np.broadcast_to(invalid, values.shape) | np.isnan(values)] = 0.0
+    return {name: out[name] for name in greeks}
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+# Historial local de análisis en SQLite, sólo de inserción: por cada snapshot guarda los niveles
+# clave (spot, gamma flip, zonas de máx/mín GEX, strikes de alto OI) y los agregados por
+# strike. Las consultas por ticker y rango de tiempo van por índice, sin releer snapshots.
+#
+#   store = HistoryStore()                  # ~/.cache/gex/history.sqlite (GEX_HISTORY lo cambia)
+#   store.record(analysis)
+#   store.levels("SPX", start="2025-01-02")                          # flip, zonas... en el tiempo
+#   store.strike_history("SPX", [5900, 5950], start="2025-01-02")    # net GEX por strike
+#   store.strike_changes("SPX", start="2025-01-02 09:30")            # cambio primero -> último
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from .api import GexAnalysis, strike_table
+from .cache import default_cache_dir
+from .expiry import market_now
+
+# Columnas por strike que se guardan (nombre en la tabla -> columna de strike_table)
+STRIKE_COLUMNS = {
+    'total_gamma': 'TotalGamma',
+    'net_gex': 'net_gex',
+    'call_oi': 'CallOpenInt',
+    'put_oi': 'PutOpenInt',
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    spot REAL NOT NULL,
+    zero_gamma REAL,
+    total_gamma REAL NOT NULL,
+    max_gex_strike REAL,
+    min_gex_strike REAL,
+    high_oi_strikes TEXT NOT NULL,
+    UNIQUE (ticker, timestamp)
+);
+CREATE TABLE IF NOT EXISTS strikes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    strike REAL NOT NULL,
+    total_gamma REAL NOT NULL,
+    net_gex REAL NOT NULL,
+    call_oi REAL NOT NULL,
+    put_oi REAL NOT NULL,
+    PRIMARY KEY (snapshot_id, strike)
+) WITHOUT ROWID;
+"""
+
+_LEVEL_COLUMNS = ["timestamp", "spot", "zero_gamma", "total_gamma", "max_gex_strike", "min_gex_strike",
+                  "high_oi_strikes"]
+
+
+# Ruta por defecto: GEX_HISTORY o history.sqlite en el directorio de caché
+def default_history_path():
+    return Path(os.environ.get("GEX_HISTORY", default_cache_dir() / "history.sqlite"))
+
+
+# Momento en texto ordenable ('YYYY-MM-DD HH:MM:SS', hora de Nueva York); una fecha sin hora
+# es el inicio del día
+def _timestamp(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.replace(tzinfo=None, microsecond=0).isoformat(sep=" ")
+
+
+class HistoryStore:
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_history_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    # Una conexión por operación: el store se puede compartir entre hilos (Streamlit)
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # Guarda un análisis; un snapshot ya registrado (mismo ticker y timestamp) no se duplica.
+    # Devuelve True si se insertó
+    def record(self, analysis: GexAnalysis) -> bool:
+        kl = analysis.keyLevels
+        try:
+            when = _timestamp(analysis.timestamp or market_now())
+        except ValueError:  # timestamp de CBOE ilegible: momento del registro
+            when = _timestamp(market_now())
+        highOI = sorted({float(k) for k in kl.high_oi_filtered['StrikePrice']})
+        table = strike_table(analysis)
+        rows = zip(table['StrikePrice'].astype(float),
+                   *(table[col].astype(float) for col in STRIKE_COLUMNS.values()))
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO snapshots (ticker, timestamp, recorded_at, spot, zero_gamma, total_gamma,"
+                " max_gex_strike, min_gex_strike, high_oi_strikes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (analysis.ticker, when, _timestamp(datetime.now()), float(analysis.spotPrice),
+                 None if analysis.zeroGamma is None else float(analysis.zeroGamma),
+                 float(analysis.df['TotalGamma'].sum()), float(kl.max_gex['StrikePrice']),
+                 float(kl.min_gex['StrikePrice']), json.dumps(highOI)))
+            if cursor.rowcount == 0:
+                return False
+            snapshotId = cursor.lastrowid
+            conn.executemany(f"INSERT INTO strikes (snapshot_id, strike, {', '.join(STRIKE_COLUMNS)})"
+                             " VALUES (?, ?, ?, ?, ?, ?)", ((snapshotId, *row) for row in rows))
+        return True
+
+    # Filtro por ticker y rango [start, end] sobre el índice (ticker, timestamp);
+    # `alias` califica las columnas en consultas con join
+    @staticmethod
+    def _range(ticker, start, end, alias=""):
+        sql, params = f"{alias}ticker = ?", [ticker]
+        if start is not None:
+            sql += f" AND {alias}timestamp >= ?"
+            params.append(_timestamp(start))
+        if end is not None:
+            sql += f" AND {alias}timestamp <= ?"
+            params.append(_timestamp(end))
+        return sql, params
+
+    def tickers(self) -> list[str]:
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT ticker FROM snapshots ORDER BY ticker")]
+
+    # Niveles clave por snapshot en orden temporal, con el cambio respecto al anterior
+    # (spot, flip y GEX total) en columnas *_change
+    def levels(self, ticker: str, start: str | date | None = None, end: str | date | None = None) -> pd.DataFrame:
+        where, params = self._range(ticker, start, end)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(f"SELECT {', '.join(_LEVEL_COLUMNS)} FROM snapshots WHERE {where}"
+                                   " ORDER BY timestamp", conn, params=params)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['high_oi_strikes'] = df['high_oi_strikes'].map(json.loads)
+        for col in ('spot', 'zero_gamma', 'total_gamma'):
+            df[f'{col}_change'] = df[col].diff()
+        return df
+
+    # Serie temporal de una columna por strike (filas: timestamp, columnas: strike).
+    # Sin `strikes` devuelve todos los strikes del rango
+    def strike_history(self, ticker: str, strikes=None, start: str | date | None = None,
+                       end: str | date | None = None, column: str = 'net_gex') -> pd.DataFrame:
+        if column not in STRIKE_COLUMNS:
+            raise ValueError(f"Columna desconocida: {column} (disponibles: {', '.join(STRIKE_COLUMNS)})")
+        where, params = self._range(ticker, start, end, alias="s.")
+        sql = (f"SELECT s.timestamp, k.strike, k.{column} FROM snapshots s JOIN strikes k ON k.snapshot_id = s.id"
+               f" WHERE {where}")
+        if strikes is not None:
+            strikes = [float(k) for k in strikes]
+            sql += f" AND k.strike IN ({', '.join('?' * len(strikes))})"
+            params += strikes
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df.pivot(index='timestamp', columns='strike', values=column).sort_index()
+
+    # Cambio por strike entre el primer y el último snapshot del rango (un strike ausente
+    # en uno de los dos cuenta como 0). Columnas: first, last, change; vacío si hay < 2 snapshots
+    def strike_changes(self, ticker: str, start: str | date | None = None, end: str | date | None = None,
+                       column: str = 'net_gex') -> pd.DataFrame:
+        if column not in STRIKE_COLUMNS:
+            raise ValueError(f"Columna desconocida: {column} (disponibles: {', '.join(STRIKE_COLUMNS)})")
+        where, params = self._range(ticker, start, end)
+        with closing(self._connect()) as conn:
+            ends = conn.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM snapshots WHERE {where}",
+                                params).fetchone()
+            if ends[0] is None or ends[0] == ends[1]:
+                return pd.DataFrame(columns=['first', 'last', 'change'], index=pd.Index([], name='strike'))
+            frames = []
+            for name, when in zip(('first', 'last'), ends):
+                frames.append(pd.read_sql_query(
+                    f"SELECT k.strike, k.{column} AS {name} FROM snapshots s JOIN strikes k ON k.snapshot_id = s.id"
+                    " WHERE s.ticker = ? AND s.timestamp = ?", conn, params=[ticker, when]).set_index('strike'))
+        df = frames[0].join(frames[1], how='outer').fillna(0.0).sort_index()
+        df['change'] = df['last'] - df['first']
+        df.attrs['start'], df.attrs['end'] = pd.Timestamp(ends[0]), pd.Timestamp(ends[1])
+        return df
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+# Ingesta en streaming del JSON de CBOE. El array data.options se recorre objeto a objeto
+# a medida que llegan los bloques (de la red o de disco) y de cada contrato sólo se copian
+# los campos del análisis a arrays preasignados: nunca existe el árbol completo de ~20k
+# dicts, así que la memoria pico es la de las columnas de salida más un bloque.
+#
+#   decoder = ChainDecoder("SPX")
+#   for chunk in response.iter_content(65536):
+#       decoder.feed(chunk)
+#   snapshot = decoder.result()
+import codecs
+import json
+import re
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+# Campos de cada contrato que usa el análisis (símbolo OCC, IV, Greeks, OI y volumen)
+ANALYSIS_FIELDS = ("option", "iv", "gamma", "open_interest", "delta", "volume")
+
+# Cotizaciones, sólo si se piden (quotes=True)
+QUOTE_FIELDS = ("bid", "ask", "last_trade_price", "change")
+
+CHUNK_SIZE = 64 * 1024
+
+_OPTIONS = re.compile(r'"options"\s*:\s*\[')
+_SEPARATORS = frozenset(" \t\r\n,")
+
+
+# Decodificador incremental de un payload de CBOE: feed() con bytes, result() -> Snapshot.
+# El resto del JSON (timestamp, close...) se parsea al final con el array vacío
+class ChainDecoder:
+    def __init__(self, ticker, quotes=False, capacity=1024):
+        self.ticker = ticker
+        self.fields = ANALYSIS_FIELDS + (QUOTE_FIELDS if quotes else ())
+        self._pick = itemgetter(*self.fields)
+        self._columns = {f: np.empty(capacity, dtype=object if f == "option" else float) for f in self.fields}
+        self._rows = 0
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._scan = json.JSONDecoder().scan_once
+        self._buffer = ""
+        self._state = "head"        # head -> options -> tail
+        self._head = ""
+        self._tail = []
+
+    def feed(self, chunk):
+        self._buffer += self._utf8.decode(chunk)
+        self._advance()
+
+    def _advance(self):
+        if self._state == "head":
+            match = _OPTIONS.search(self._buffer)
+            if match is None:
+                return
+            self._head = self._buffer[:match.end() - 1]
+            self._buffer = self._buffer[match.end():]
+            self._state = "options"
+
+        if self._state == "options":
+            buffer, pos, end = self._buffer, 0, len(self._buffer)
+            rows = []
+            while True:
+                while pos < end and buffer[pos] in _SEPARATORS:
+                    pos += 1
+                if pos == end:
+                    break
+                if buffer[pos] == "]":
+                    self._state = "tail"
+                    pos += 1
+                    break
+                try:
+                    contract, pos = self._scan(buffer, pos)
+                except (StopIteration, json.JSONDecodeError):
+                    # Objeto cortado entre bloques: se reintenta con el siguiente
+                    break
+                try:
+                    rows.append(self._pick(contract))
+                except KeyError:
+                    rows.append(tuple(contract.get(name) for name in self.fields))
+            self._buffer = buffer[pos:]
+            if rows:
+                self._extend(rows)
+
+        if self._state == "tail":
+            self._tail.append(self._buffer)
+            self._buffer = ""
+
+    # Copia las filas de un bloque a las columnas, duplicando la capacidad si hace falta.
+    # Los nulos quedan como NaN y los valores no numéricos también
+    def _extend(self, rows):
+        start, stop = self._rows, self._rows + len(rows)
+        capacity = len(self._columns["option"])
+        if stop > capacity:
+            while capacity < stop:
+                capacity *= 2
+            for name, values in self._columns.items():
+                grown = np.empty(capacity, dtype=values.dtype)
+                grown[:start] = values[:start]
+                self._columns[name] = grown
+        for (name, values), column in zip(self._columns.items(), zip(*rows)):
+            try:
+                values[start:stop] = column
+            except (TypeError, ValueError):
+                values[start:stop] = pd.to_numeric(pd.Series(column, dtype=object), errors="coerce")
+        self._rows = stop
+
+    def result(self):
+        from .cache import Snapshot
+
+        self._buffer += self._utf8.decode(b"", final=True)
+        self._advance()
+        if self._state != "tail":
+            raise ValueError(f"JSON de {self.ticker} incompleto o sin data.options")
+
+        payload = json.loads(self._head + "[]" + "".join(self._tail))
+        data = payload["data"]
+        options_df = pd.DataFrame({name: values[:self._rows] for name, values in self._columns.items()})
+        return Snapshot(self.ticker, data["close"], payload.get("timestamp"), options_df)
+
+
+# Snapshot a partir de un iterable de bloques de bytes
+def parse_stream(ticker, chunks, quotes=False):
+    decoder = ChainDecoder(ticker, quotes)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.result()
+
+
+# Snapshot de un JSON de CBOE en disco, leído por bloques
+def read_chain(ticker, path, quotes=False, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as f:
+        return parse_stream(ticker, iter(lambda: f.read(chunk_size), b""), quotes)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+# Zonas clave de GEX dentro de ±width puntos del spot
+@dataclass
+class KeyLevels:
+    spot: float
+    width: float
+    df_filtered: pd.DataFrame
+    max_gex: pd.Series
+    min_gex: pd.Series
+    pos: pd.DataFrame
+    neg: pd.DataFrame
+    high_oi: pd.DataFrame
+    high_oi_filtered: pd.DataFrame
+    cumulative: np.ndarray
+
+    @property
+    def zona_gamma(self) -> float:
+        return abs(self.max_gex['StrikePrice'] - self.min_gex['StrikePrice'])
+
+    # El spot está dentro de la zona gamma (entre mín y máx GEX)
+    @property
+    def in_zone(self) -> bool:
+        return bool(self.min_gex['StrikePrice'] <= self.spot <= self.max_gex['StrikePrice'])
+
+    # GEX neto acumulado por strike dentro de la ventana (df_filtered ya está ordenado por strike)
+    @property
+    def df_sorted(self) -> pd.DataFrame:
+        df_sorted = self.df_filtered.copy()
+        df_sorted['cumulative_gex'] = self.cumulative
+        return df_sorted
+
+
+# GEX neto por contrato (gamma * OI * 100 * 100); añade call_gex, put_gex y net_gex a df
+def net_gex(df: pd.DataFrame) -> pd.DataFrame:
+    required_cols = ['CallGamma', 'CallOpenInt', 'PutGamma', 'PutOpenInt', 'StrikePrice']
+    for col in required_cols:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    mult = 100 * 100
+    df['call_gex'] = df['CallGamma'] * df['CallOpenInt'] * mult
+    df['put_gex'] = df['PutGamma'] * df['PutOpenInt'] * mult
+    df['net_gex'] = df['call_gex'] - df['put_gex']
+    return df
+
+
+# Tabla de posiciones del máximo (o mínimo) en cada ventana de 2^k elementos;
+# en empates se queda con el primero, como idxmax/idxmin
+def _sparse_table(values, better):
+    table = [np.arange(len(values))]
+    span = 1
+    while 2 * span <= len(values):
+        prev = table[-1]
+        left, right = prev[:-span], prev[span:]
+        table.append(np.where(better(values[right], values[left]), right, left))
+        span *= 2
+    return table
+
+
+def _range_arg(table, values, better, lo, hi):
+    k = (hi - lo).bit_length() - 1
+    left, right = table[k][lo], table[k][hi - (1 << k)]
+    return right if better(values[right], values[left]) else left
+
+
+# Índice por strike de un snapshot: contratos válidos ordenados por strike (orden estable),
+# sumas prefijas de net_gex y tablas de máximo/mínimo por rango. Se construye una vez por
+# snapshot; cada ventana ±width se resuelve con búsqueda binaria sin recorrer el chain.
+# También acepta filas ya agregadas por strike con net_gex y total_oi (GexStream)
+class StrikeIndex:
+    def __init__(self, df: pd.DataFrame):
+        if 'net_gex' not in df.columns:
+            net_gex(df)
+
+        frame = df[df['net_gex'].notna() & df['StrikePrice'].notna()]
+        frame = frame.iloc[np.argsort(frame['StrikePrice'].to_numpy(), kind='stable')].reset_index(drop=True)
+        if 'total_oi' not in frame.columns:
+            frame['total_oi'] = frame['CallOpenInt'] + frame['PutOpenInt']
+        self.frame = frame
+
+        self.strikes = frame['StrikePrice'].to_numpy(dtype=float)
+        self.netGex = frame['net_gex'].to_numpy(dtype=float)
+        self.totalOI = frame['total_oi'].to_numpy(dtype=float)
+        self.prefix = np.concatenate(([0.0], np.cumsum(self.netGex)))
+        self._maxTable = _sparse_table(self.netGex, np.greater)
+        self._minTable = _sparse_table(self.netGex, np.less)
+
+    # Posiciones [lo, hi) de los contratos con strike en [lower, upper]
+    def window(self, lower: float, upper: float) -> tuple[int, int]:
+        return (int(np.searchsorted(self.strikes, lower, 'left')),
+                int(np.searchsorted(self.strikes, upper, 'right')))
+
+    def key_levels(self, spot: float, width: float) -> KeyLevels:
+        lo, hi = self.window(spot - width, spot + width)
+        if hi <= lo:
+            raise ValueError(f"No hay strikes con GEX en ±{width} puntos del spot {spot}")
+
+        df_filtered = self.frame.iloc[lo:hi].reset_index(drop=True)
+        netGex, totalOI = self.netGex[lo:hi], self.totalOI[lo:hi]
+
+        # Máximo y mínimo GEX por consulta de rango
+        max_gex = df_filtered.iloc[_range_arg(self._maxTable, self.netGex, np.greater, lo, hi) - lo]
+        min_gex = df_filtered.iloc[_range_arg(self._minTable, self.netGex, np.less, lo, hi) - lo]
+        pos = df_filtered[netGex > 0]
+        neg = df_filtered[netGex < 0]
+
+        # Zonas de alto interés abierto (percentil 75) y picos (percentil 90 dentro de ellas)
+        highMask = totalOI >= np.percentile(totalOI, 75)
+        high_oi = df_filtered[highMask]
+        highOI = totalOI[highMask]
+        high_oi_filtered = high_oi[highOI >= np.quantile(highOI, 0.90)]
+
+        cumulative = self.prefix[lo + 1:hi + 1] - self.prefix[lo]
+        return KeyLevels(spot, width, df_filtered, max_gex, min_gex, pos, neg, high_oi, high_oi_filtered, cumulative)
+
+
+# Máximo/mínimo GEX y picos de open interest en ±width puntos del spot
+def key_levels(df: pd.DataFrame, spot: float, width: float) -> KeyLevels:
+    return StrikeIndex(df).key_levels(spot, width)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+# Memoización de etapas completas del análisis (chain preparado, GEX por strike, T,
+# perfiles, gamma flip y el análisis entero) con clave por contenido: un hash del chain o
+# del snapshot más los parámetros de cada etapa. La caché es LRU y está acotada en bytes y
+# en entradas, así que volver a pintar, mover un widget o repetir un snapshot ya visto no
+# recalcula nada, y un cambio de parámetros sólo rehace las etapas que dependen de él.
+#
+#   memo = MemoCache(max_bytes=512 * 1024**2)
+#   df = memo.memoize(("prepare_chain", snapshot_hash(snapshot)), lambda: prepare_chain(snapshot.options_df))
+#   analysis = analyze(snapshot, df, todayDate=snapshot.quote_time(), memo=memo)   # la segunda vez: sólo el hash
+#   memo.stats                                       # aciertos, fallos, desalojos, bytes
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+
+import numpy as np
+import pandas as pd
+
+# Presupuesto de memoria y máximo de entradas por defecto
+DEFAULT_MEMO_BYTES = 512 * 1024**2
+DEFAULT_MEMO_ENTRIES = 256
+
+# Columnas de entrada del análisis: las derivadas (GEX, T, net_gex...) no forman parte de la clave
+CHAIN_COLUMNS = ('ExpirationDate', 'StrikePrice', 'CallIV', 'PutIV', 'CallGamma', 'PutGamma', 'CallDelta',
+                 'PutDelta', 'CallOpenInt', 'PutOpenInt', 'CallVol', 'PutVol')
+
+
+def _update(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr((list(value.columns), len(value))).encode())
+        for col in value.columns:
+            _update(h, value[col])
+    elif isinstance(value, (pd.Series, pd.Index, np.ndarray)):
+        values = np.asarray(value)
+        if values.dtype.kind in 'biufcmM':
+            h.update(values.dtype.str.encode())
+            h.update(np.ascontiguousarray(values).tobytes())
+        else:
+            # Objetos y strings: hash vectorizado de pandas por elemento
+            h.update(pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy().tobytes())
+    elif isinstance(value, (tuple, list)):
+        h.update(b'(')
+        for item in value:
+            _update(h, item)
+        h.update(b')')
+    else:
+        h.update(repr(value).encode())
+    h.update(b'\x1f')
+
+
+# Hash del contenido de arrays, DataFrames y escalares (blake2b, hex)
+def content_hash(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+# Hash de un chain preparado: sólo sus columnas de entrada, en orden fijo
+def chain_hash(df: pd.DataFrame) -> str:
+    return content_hash(df[[col for col in CHAIN_COLUMNS if col in df.columns]])
+
+
+# Hash de un snapshot: ticker, spot, timestamp y las opciones tal como llegaron de CBOE
+def snapshot_hash(snapshot) -> str:
+    return content_hash(snapshot.ticker, float(snapshot.spotPrice), snapshot.timestamp, snapshot.options_df)
+
+
+# Elementos de muestra para estimar el tamaño de las columnas de objetos (strings)
+_SAMPLE = 64
+
+
+# Bytes de una columna: nbytes del array (exacto en numpy y Arrow) más, si guarda objetos
+# Python, el tamaño medio de una muestra de elementos (memory_usage(deep=True) los recorre todos)
+def _column_bytes(values):
+    size = values.array.nbytes
+    if (values.dtype == object or getattr(values.dtype, 'storage', None) == 'python') and len(values):
+        sample = values.array[::max(1, len(values) // _SAMPLE)]
+        size += int(np.mean([sys.getsizeof(v) for v in sample]) * len(values))
+    return size
+
+
+# Bytes aproximados de un valor: arrays, DataFrames, dataclasses y contenedores, sin contar
+# dos veces un objeto compartido
+def sizeof(value, _seen=None) -> int:
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        # Columnas numéricas por dtype, sin materializar cada Series
+        size = _column_bytes(value.index)
+        for col, dtype in value.dtypes.items():
+            if isinstance(dtype, np.dtype) and dtype != object:
+                size += dtype.itemsize * len(value)
+            else:
+                size += _column_bytes(value[col])
+        return size
+    if isinstance(value, pd.Series):
+        return _column_bytes(value) + _column_bytes(value.index)
+    if isinstance(value, pd.Index):
+        return _column_bytes(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, seen) + sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item, seen) for item in value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(sizeof(getattr(value, f.name), seen) for f in fields(value))
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + sizeof(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+# Caché LRU en memoria acotada en bytes (estimados con sizeof) y en número de entradas.
+# Segura entre hilos; el cálculo de un fallo se hace fuera del lock
+class MemoCache:
+    def __init__(self, max_bytes: int = DEFAULT_MEMO_BYTES, max_entries: int = DEFAULT_MEMO_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # clave -> (valor, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    @property
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self._bytes}
+
+    # Valor de `key` (y lo marca como el más reciente), o `default` si no está
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Guarda un valor y desaloja los menos recientes hasta volver al presupuesto.
+    # Un valor mayor que todo el presupuesto no se guarda
+    def put(self, key, value, size: int | None = None):
+        size = sizeof(value) if size is None else size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return value
+
+    # Valor en caché de `key` o compute() guardado bajo esa clave
+    def memoize(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
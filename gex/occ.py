@@ -0,0 +1,97 @@
+import numpy as np
+
+# Longitud de la cola fija del símbolo OCC: YYMMDD + C/P + strike*1000 (8 dígitos)
+_TAIL = 15
+
+# Longitud máxima de la raíz (SPX, SPXW, NDXP...): cabe en un int64 byte a byte
+_MAX_ROOT = 7
+
+# Flags de tipo de opción
+CALL = 1
+PUT = -1
+
+_POW10 = 10 ** np.arange(7, -1, -1, dtype=np.int64)
+_POW256 = 256 ** np.arange(_MAX_ROOT - 1, -1, -1, dtype=np.int64)
+
+
+# Bytes de los símbolos desde el buffer de Arrow (pandas con strings respaldados por
+# pyarrow): datos contiguos, inicio y longitud de cada símbolo, sin objetos por fila.
+# Cualquier otro almacenamiento (objetos, strings 'python') o sin pyarrow instalado devuelve None
+def _arrow_bytes(symbols):
+    array = getattr(symbols, 'array', None)
+    if array is None or getattr(array.dtype, 'storage', None) != 'pyarrow':
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    arr = pa.array(array)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if arr.null_count or not (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+        return None
+
+    _, offsetsBuf, dataBuf = arr.buffers()
+    offsetType = np.int64 if pa.types.is_large_string(arr.type) else np.int32
+    offsets = np.frombuffer(offsetsBuf, dtype=offsetType)[arr.offset:arr.offset + len(arr) + 1].astype(np.int64)
+    data = np.frombuffer(dataBuf, dtype=np.uint8) if dataBuf is not None else np.empty(0, np.uint8)
+    return data, offsets[:-1], np.diff(offsets)
+
+
+# Bytes de los símbolos desde un array NumPy de ancho fijo ('S'): vista plana de n filas
+# de ancho fijo; la raíz es de longitud variable, así que cada fila lleva su longitud real
+def _fixed_width_bytes(symbols):
+    raw = np.ascontiguousarray(np.asarray(symbols).astype('S'))
+    n = raw.shape[0]
+    if n == 0:
+        return np.empty(0, np.uint8), np.empty(0, np.int64), np.empty(0, np.int64)
+    width = raw.dtype.itemsize
+    return raw.view(np.uint8), np.arange(n) * width, np.char.str_len(raw).astype(np.int64)
+
+
+# Últimos 15 bytes de cada símbolo (n x 15)
+def _tail(data, starts, lengths):
+    if len(lengths) and lengths.min() < _TAIL:
+        raise ValueError("Símbolo OCC demasiado corto")
+    return data[(starts + lengths - _TAIL)[:, None] + np.arange(_TAIL)]
+
+
+# Raíz de cada símbolo (lo que precede a la cola) empaquetada en un int64, byte a byte y
+# rellena con ceros: distinta por raíz y con el mismo orden que las cadenas
+def _roots(data, starts, lengths):
+    rootLen = lengths - _TAIL
+    if len(rootLen) and rootLen.max() > _MAX_ROOT:
+        raise ValueError("Raíz OCC demasiado larga")
+    pos = np.arange(_MAX_ROOT)
+    idx = np.minimum(starts[:, None] + pos, max(len(data) - 1, 0))
+    inRoot = pos < rootLen[:, None]
+    rootBytes = np.where(inRoot, data[idx] if len(data) else 0, 0).astype(np.int64)
+    return rootBytes @ _POW256
+
+
+# Decodifica símbolos OCC (p.ej. SPXW250103C05000500) en una sola pasada vectorizada.
+# Devuelve (flag call/put int8, vencimiento datetime64[ns], strike float64 con decimales);
+# con roots=True añade la raíz (SPX, SPXW...) empaquetada en un int64
+def parse_occ(symbols, roots=False):
+    parts = _arrow_bytes(symbols)
+    if parts is None:
+        parts = _fixed_width_bytes(symbols)
+    tail = _tail(*parts)
+
+    digits = tail.astype(np.int64) - ord('0')
+    yy = digits[:, 0] * 10 + digits[:, 1]
+    mm = digits[:, 2] * 10 + digits[:, 3]
+    dd = digits[:, 4] * 10 + digits[:, 5]
+    months = (2000 + yy - 1970) * 12 + (mm - 1)
+    expiry = (months.astype('datetime64[M]').astype('datetime64[D]')
+              + (dd - 1).astype('timedelta64[D]')).astype('datetime64[ns]')
+
+    callPut = np.where(tail[:, 6] == ord('C'), CALL, PUT).astype(np.int8)
+
+    # Strike en milésimas: entero exacto antes de dividir, conserva los decimales
+    strike = (digits[:, 7:] @ _POW10) / 1000.0
+
+    if roots:
+        return callPut, expiry, strike, _roots(*parts)
+    return callPut, expiry, strike
@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Backends disponibles para repartir el trabajo
+BACKENDS = ("serial", "thread", "process")
+
+
+# Número de workers por defecto: todos los núcleos disponibles
+def default_workers():
+    return os.cpu_count() or 1
+
+
+# Copia los arrays del chain a un único bloque de memoria compartida
+@contextmanager
+def share_arrays(arrays):
+    spec = []
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        spec.append((name, arr.shape, arr.dtype.str, offset))
+        offset += arr.nbytes + (-arr.nbytes % 64)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for (name, shape, dtype, start), arr in zip(spec, arrays.values()):
+            view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+            view[...] = arr
+            del view
+        yield shm.name, spec
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+# Vistas de solo lectura sobre el bloque compartido, sin copiar los datos
+def attach_arrays(name, spec):
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {}
+    for key, shape, dtype, start in spec:
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+        view.flags.writeable = False
+        arrays[key] = view
+    return shm, arrays
+
+
+# Ejecuta un grupo de tareas dentro de un proceso worker
+def _process_tasks(fn, name, spec, tasks):
+    shm, arrays = attach_arrays(name, spec)
+    try:
+        return [fn(arrays, *task) for task in tasks]
+    finally:
+        arrays.clear()
+        shm.close()
+
+
+# Ejecuta fn(arrays, *task) para cada tarea y devuelve los resultados en el orden original
+def run_tasks(fn, tasks, arrays, backend="serial", workers=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+
+    tasks = list(tasks)
+    workers = min(workers or default_workers(), len(tasks))
+    if backend == "serial" or workers <= 1:
+        return [fn(arrays, *task) for task in tasks]
+
+    if backend == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda task: fn(arrays, *task), tasks))
+
+    # Grupos contiguos de tareas: un attach al bloque compartido por grupo
+    groups = [list(g) for g in np.array_split(np.arange(len(tasks)), workers) if len(g)]
+    with share_arrays(arrays) as (name, spec):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process_tasks, fn, name, spec, [tasks[i] for i in g]) for g in groups]
+            return [result for future in futures for result in future.result()]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .greeks import GREEKS, exposure_matrices
+from .parallel import run_tasks
+
+
+# Función para calcular Gamma Exposure basado en Black-Scholes (versión escalar de referencia)
+def calcGammaEx(S, K, vol, T, r, q, optType, OI):
+    from scipy.stats import norm
+
+    if T == 0 or vol == 0:
+        return 0
+
+    dp = (np.log(S/K) + (r - q + 0.5*vol**2)*T) / (vol*np.sqrt(T))
+    dm = dp - vol*np.sqrt(T)
+
+    if optType == 'call':
+        gamma = np.exp(-q*T) * norm.pdf(dp) / (S * vol * np.sqrt(T))
+        return OI * 100 * S * S * 0.01 * gamma
+    else:  # Gamma is same for calls and puts
+        gamma = K * np.exp(-r*T) * norm.pdf(dm) / (S * S * vol * np.sqrt(T))
+        return OI * 100 * S * S * 0.01 * gamma
+
+
+# Máscaras por vencimiento: todos, sin el próximo vencimiento y sin el próximo mensual
+def _expiry_masks(expirations, nextExpiry, nextMonthlyExp):
+    exp = np.asarray(expirations, dtype='datetime64[ns]')
+    masks = np.ones((exp.shape[0], 3))
+    masks[:, 1] = exp != pd.Timestamp(nextExpiry).to_datetime64()
+    masks[:, 2] = exp != pd.Timestamp(nextMonthlyExp).to_datetime64()
+    return masks
+
+
+# Bytes estimados por celda (nivel, contrato): d1, φ(d1), nocional y temporales en float64,
+# más resultado y temporales por cada Greek, para calls y puts
+def _bytes_per_cell(nGreeks=1):
+    return 8 * (8 + 4 * nGreeks)
+
+
+# Presupuesto de memoria por defecto para el cálculo por bloques (por worker)
+DEFAULT_MAX_BYTES = 256 * 1024**2
+
+# Máximo de contratos por bloque: la descomposición no depende del backend,
+# así serial, threads y procesos suman exactamente en el mismo orden
+_MAX_CONTRACT_CHUNK = 4096
+
+
+# Malla de niveles de precio: 30 niveles por defecto o un paso fijo en puntos
+def price_levels(fromStrike: float, toStrike: float, step: float | None = None, num: int = 30) -> np.ndarray:
+    if not step:
+        return np.linspace(fromStrike, toStrike, num)
+    return np.arange(fromStrike, toStrike + step / 2, step)
+
+
+# Arrays del chain que necesita el perfil, extraídos una sola vez
+def _chain_arrays(df, nextExpiry, nextMonthlyExp):
+    return dict(
+        K=df['StrikePrice'].to_numpy(dtype=float),
+        T=df['daysTillExp'].to_numpy(dtype=float),
+        callIV=df['CallIV'].to_numpy(dtype=float),
+        putIV=df['PutIV'].to_numpy(dtype=float),
+        callOI=df['CallOpenInt'].to_numpy(dtype=float),
+        putOI=df['PutOpenInt'].to_numpy(dtype=float),
+        masks=_expiry_masks(df['ExpirationDate'], nextExpiry, nextMonthlyExp),
+    )
+
+
+# Sumas por cubo de vencimiento (niveles x 3 por Greek) para un bloque de niveles y contratos
+def _profile_block(arrays, levels, sl, r, q, greeks=("gamma",)):
+    K, T, masks = arrays['K'][sl], arrays['T'][sl], arrays['masks'][sl]
+    call = exposure_matrices(levels, K, arrays['callIV'][sl], T, arrays['callOI'][sl], r, q, "call", greeks)
+    put = exposure_matrices(levels, K, arrays['putIV'][sl], T, arrays['putOI'][sl], r, q, "put", greeks)
+    # (niveles x contratos) @ (contratos x 3) -> totales por cubo de vencimiento
+    return np.hstack([(call[g] - put[g]) @ masks for g in greeks])
+
+
+# Tamaños de bloque (niveles, contratos) que respetan el presupuesto de memoria
+def _chunk_sizes(nLevels, nContracts, max_bytes, nGreeks=1):
+    cells = max(1, int(max_bytes) // _bytes_per_cell(nGreeks))
+    contractChunk = max(1, min(nContracts, _MAX_CONTRACT_CHUNK, cells // max(1, nLevels)))
+    levelChunk = max(1, min(nLevels, cells // contractChunk))
+    return levelChunk, contractChunk
+
+
+# Ejecuta `block(arrays, levels[ls], cs, *args)` sobre la malla (niveles x contratos) por
+# bloques de memoria acotada. Devuelve [(slice de niveles, resultado)] en orden fijo, para
+# acumular siempre igual con cualquier backend
+def _run_blocks(block, arrays, levels, nContracts, args=(), max_bytes=DEFAULT_MAX_BYTES, nGreeks=1, workers=None,
+                backend="serial"):
+    levelChunk, contractChunk = _chunk_sizes(len(levels), nContracts, max_bytes, nGreeks)
+    blocks = [(slice(i, i + levelChunk), slice(j, j + contractChunk))
+              for i in range(0, len(levels), levelChunk)
+              for j in range(0, nContracts, contractChunk)]
+    results = run_tasks(block, [(levels[ls], cs, *args) for ls, cs in blocks], arrays, backend, workers)
+    return [(ls, result) for (ls, _), result in zip(blocks, results)]
+
+
+# Perfil a partir de arrays ya extraídos, acumulando bloque a bloque en orden fijo.
+# Devuelve (niveles x 3) por cada Greek, en columnas consecutivas
+def _profile_from_arrays(levels, arrays, r=0, q=0, max_bytes=DEFAULT_MAX_BYTES, workers=None, backend="serial",
+                         greeks=("gamma",)):
+    levels = np.asarray(levels, dtype=float)
+    greeks = tuple(greeks)
+    totals = np.zeros((len(levels), 3 * len(greeks)))
+    for ls, block in _run_blocks(_profile_block, arrays, levels, arrays['K'].shape[0], (r, q, greeks), max_bytes,
+                                 len(greeks), workers, backend):
+        totals[ls] += block
+    return totals / 10**9
+
+
+# Perfiles de exposición (GEX, VEX, CEX, DEX) en una sola pasada sobre el chain.
+# Cada Greek devuelve (todos, sin próximo vencimiento, sin próximo mensual) en $ miles de millones
+def exposure_profiles(df: pd.DataFrame, levels: np.ndarray, nextExpiry, nextMonthlyExp, r: float = 0,
+                      q: float = 0, greeks=GREEKS, max_bytes: int = DEFAULT_MAX_BYTES, workers: int | None = None,
+                      backend: str = "serial") -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    greeks = tuple(greeks)
+    arrays = _chain_arrays(df, nextExpiry, nextMonthlyExp)
+    totals = _profile_from_arrays(levels, arrays, r, q, max_bytes, workers, backend, greeks)
+    return {g: (totals[:, 3*i], totals[:, 3*i + 1], totals[:, 3*i + 2]) for i, g in enumerate(greeks)}
+
+
+# Perfil de Gamma Exposure para todos los niveles y contratos, por bloques de memoria acotada
+def gamma_profile(df: pd.DataFrame, levels: np.ndarray, nextExpiry, nextMonthlyExp, r: float = 0, q: float = 0,
+                  max_bytes: int = DEFAULT_MAX_BYTES, workers: int | None = None,
+                  backend: str = "serial") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return exposure_profiles(df, levels, nextExpiry, nextMonthlyExp, r, q, ("gamma",), max_bytes, workers,
+                             backend)["gamma"]
+
+
+# Punto de flip gamma: interpolación lineal en el primer cambio de signo,
+# opcionalmente refinada con brentq sobre el perfil exacto del chain
+def gamma_flip(levels: np.ndarray, totalGamma: np.ndarray, df: pd.DataFrame | None = None, nextExpiry=None,
+               nextMonthlyExp=None, r: float = 0, q: float = 0, refine: bool = False) -> float | None:
+    levels = np.asarray(levels, dtype=float)
+    totalGamma = np.asarray(totalGamma, dtype=float)
+
+    zeroCrossIdx = np.where(np.diff(np.sign(totalGamma)))[0]
+    if len(zeroCrossIdx) == 0:
+        return None
+
+    negGamma = totalGamma[zeroCrossIdx]
+    posGamma = totalGamma[zeroCrossIdx+1]
+    negStrike = levels[zeroCrossIdx]
+    posStrike = levels[zeroCrossIdx+1]
+    zeroGamma = posStrike - ((posStrike - negStrike) * posGamma/(posGamma - negGamma))
+    zeroGamma = zeroGamma[0]
+
+    if refine and df is not None:
+        from scipy.optimize import brentq
+
+        arrays = _chain_arrays(df, nextExpiry, nextMonthlyExp)
+
+        def totalAt(level):
+            return _profile_from_arrays([level], arrays, r, q)[0, 0]
+
+        lo, hi = negStrike[0], posStrike[0]
+        if totalAt(lo) * totalAt(hi) < 0:
+            zeroGamma = brentq(totalAt, lo, hi, xtol=1e-6)
+
+    return zeroGamma
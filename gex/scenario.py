@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+# Escenarios de GEX sobre una malla (niveles de spot x desplazamientos paralelos de
+# volatilidad), desglosados por vencimiento. Cada contrato se evalúa como dos "patas"
+# (call y put con su propia IV y el signo del GEX neto); las que no aportan nada (OI nulo,
+# T o IV nulas) se descartan antes de empezar. Los intermedios por contrato (log K, √T,
+# e^{-qT}·OI) se calculan una vez, y log(S/K) una vez por bloque para todos los
+# desplazamientos de vol. La malla se recorre con los mismos bloques de memoria acotada
+# y backends que el perfil.
+#
+#   grid = scenario_grid(analysis.df, analysis.levels, volShifts=np.arange(-10, 11))
+#   grid.total            # (desplazamientos x niveles), $ Bn por 1%
+#   grid.flips()          # gamma flip de cada desplazamiento
+#   grid.by_expiry(5)     # GEX por vencimiento y nivel con +5 puntos de vol
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .greeks import norm_pdf
+from .profile import DEFAULT_MAX_BYTES, _run_blocks, gamma_flip
+
+# Desplazamientos de volatilidad por defecto, en puntos de vol: -10 a +10
+DEFAULT_VOL_SHIFTS = np.arange(-10, 11, 1.0)
+
+# IV mínima tras el desplazamiento (1 punto de vol): un contrato no queda con vol <= 0
+MIN_VOL = 0.01
+
+
+# Resultado de scenario_grid: GEX en $ miles de millones por 1% de movimiento
+@dataclass
+class ScenarioGrid:
+    levels: np.ndarray        # niveles de spot
+    volShifts: np.ndarray     # desplazamientos paralelos de IV, en puntos de vol
+    expiries: np.ndarray      # vencimientos (datetime64[ns]), ordenados
+    gex: np.ndarray           # (desplazamientos x niveles x vencimientos)
+
+    # GEX de todos los vencimientos (desplazamientos x niveles)
+    @property
+    def total(self) -> np.ndarray:
+        return self.gex.sum(axis=2)
+
+    @property
+    def nbytes(self) -> int:
+        return self.levels.nbytes + self.volShifts.nbytes + self.expiries.nbytes + self.gex.nbytes
+
+    # Gamma flip de cada desplazamiento de vol (None si el perfil no cambia de signo)
+    def flips(self) -> list[float | None]:
+        return [gamma_flip(self.levels, row) for row in self.total]
+
+    # GEX por vencimiento (filas) y nivel (columnas) en el desplazamiento más cercano a `volShift`
+    def by_expiry(self, volShift: float = 0) -> pd.DataFrame:
+        i = int(np.argmin(np.abs(self.volShifts - volShift)))
+        return pd.DataFrame(self.gex[i].T, index=pd.DatetimeIndex(self.expiries, name='expiry'),
+                            columns=pd.Index(self.levels, name='level'))
+
+
+# Patas del chain (calls y puts) con intermedios por contrato que no dependen del escenario.
+# El peso lleva el signo del GEX neto (calls suman, puts restan) y OI * 100 * e^{-qT} * 0.01
+def _scenario_arrays(df, r=0, q=0):
+    expiries, expiryCode = np.unique(df['ExpirationDate'].to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+    K = df['StrikePrice'].to_numpy(dtype=float)
+    T = df['daysTillExp'].to_numpy(dtype=float)
+
+    sides = [(df['CallIV'].to_numpy(dtype=float), df['CallOpenInt'].to_numpy(dtype=float), 1.0),
+             (df['PutIV'].to_numpy(dtype=float), df['PutOpenInt'].to_numpy(dtype=float), -1.0)]
+    iv = np.concatenate([s[0] for s in sides])
+    weight = np.concatenate([sign * OI for _, OI, sign in sides])
+    K, T, code = np.tile(K, 2), np.tile(T, 2), np.tile(expiryCode.ravel(), 2)
+
+    keep = np.isfinite(iv) & np.isfinite(weight) & np.isfinite(T) & (iv > 0) & (T > 0) & (weight != 0)
+    K, T, iv, weight, code = K[keep], T[keep], iv[keep], weight[keep], code[keep]
+
+    onehot = np.zeros((len(code), len(expiries)))
+    onehot[np.arange(len(code)), code] = 1.0
+    arrays = dict(
+        lnK=np.log(K),
+        T=T,
+        sqrtT=np.sqrt(T),
+        carry=(r - q) * T,
+        iv=iv,
+        weight=weight * 100 * np.exp(-q*T) * 0.01,
+        onehot=onehot,
+    )
+    return expiries, arrays
+
+
+# GEX por (desplazamiento, nivel, vencimiento) de un bloque de niveles y patas.
+# log(S/K) se calcula una vez y se reutiliza en todos los desplazamientos
+def _scenario_block(arrays, levels, sl, volShifts):
+    logMoneyness = np.log(levels)[:, None] - arrays['lnK'][None, sl]
+    T, sqrtT, carry, iv = arrays['T'][sl], arrays['sqrtT'][sl], arrays['carry'][sl], arrays['iv'][sl]
+    weight, onehot = arrays['weight'][sl], arrays['onehot'][sl]
+
+    out = np.empty((len(volShifts), len(levels), onehot.shape[1]))
+    d1 = np.empty_like(logMoneyness)
+    for i, shift in enumerate(volShifts):
+        vol = np.maximum(iv + shift / 100, MIN_VOL)
+        volSqrtT = vol * sqrtT
+        # d1 = (log(S/K) + (r - q + σ²/2) T) / σ√T
+        np.add(logMoneyness, carry + 0.5 * vol**2 * T, out=d1)
+        d1 /= volSqrtT
+        norm_pdf(d1, out=d1)
+        # Γ·S²·0.01·OI·100 = S · φ(d1) · e^{-qT}·OI·100·0.01 / σ√T; S se aplica al final
+        d1 *= weight / volSqrtT
+        out[i] = d1 @ onehot
+    return out * levels[None, :, None]
+
+
+# Malla completa (spot x desplazamiento de vol x contrato) sobre un chain con daysTillExp
+# (add_time_to_expiry), acumulada bloque a bloque en orden fijo. Cada celda (nivel, pata)
+# ocupa menos que una del perfil de un Greek, así que su presupuesto por bloque sirve
+def scenario_grid(df: pd.DataFrame, levels: np.ndarray, volShifts=DEFAULT_VOL_SHIFTS, r: float = 0, q: float = 0,
+                  max_bytes: int = DEFAULT_MAX_BYTES, workers: int | None = None,
+                  backend: str = "serial") -> ScenarioGrid:
+    levels = np.asarray(levels, dtype=float)
+    volShifts = np.asarray(volShifts, dtype=float)
+    expiries, arrays = _scenario_arrays(df, r, q)
+    nLegs = len(arrays['iv'])
+    gex = np.zeros((len(volShifts), len(levels), len(expiries)))
+    if nLegs:
+        for ls, block in _run_blocks(_scenario_block, arrays, levels, nLegs, (volShifts,), max_bytes,
+                                     workers=workers, backend=backend):
+            gex[:, ls] += block
+    return ScenarioGrid(levels, volShifts, expiries, gex / 10**9)
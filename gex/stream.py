@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+from .compact import CompactChain
+from .diagnostics import span
+from .expiry import market_now
+from .levels import StrikeIndex
+from .profile import DEFAULT_MAX_BYTES, _expiry_masks, _profile_from_arrays, gamma_flip, price_levels
+
+# Columnas cuyo cambio obliga a recalcular un contrato
+_TRACKED = ['CallOpenInt', 'PutOpenInt', 'CallIV', 'PutIV', 'CallGamma', 'PutGamma']
+
+# Variación relativa de T que obliga a recalcular un contrato (los 0DTE cruzan este umbral
+# en cada consulta durante la sesión; los vencimientos lejanos casi nunca)
+_T_REL_TOL = 0.01
+
+
+# Sumas por strike de OI y gamma*OI (el GEX se escala por spot^2 al leerlo), más el
+# net_gex y el OI total por contrato del chain compacto, que alimentan las zonas clave
+def _strike_sums(chain, rows):
+    c = chain.columns
+    part = pd.DataFrame({
+        'StrikePrice': chain.strike()[rows],
+        'CallOpenInt': c['CallOpenInt'][rows].astype(float),
+        'PutOpenInt': c['PutOpenInt'][rows].astype(float),
+        'CallGammaOI': (c['CallGamma'] * c['CallOpenInt'])[rows],
+        'PutGammaOI': (c['PutGamma'] * c['PutOpenInt'])[rows],
+        'net_gex': chain.net_gex()[rows],
+        'total_oi': chain.total_oi()[rows].astype(float),
+    })
+    return part.groupby('StrikePrice').sum()
+
+
+# Entradas del perfil (como profile._chain_arrays) para las filas `rows` del chain compacto,
+# con el T que el stream tiene sumado para cada contrato
+def _chain_arrays(chain, T, rows, nextExpiry, nextMonthlyExp):
+    c = chain.columns
+    return dict(
+        K=chain.strike()[rows],
+        T=T[rows],
+        callIV=c['CallIV'][rows],
+        putIV=c['PutIV'][rows],
+        callOI=c['CallOpenInt'][rows].astype(float),
+        putOI=c['PutOpenInt'][rows].astype(float),
+        masks=_expiry_masks(chain.expiry_times, nextExpiry, nextMonthlyExp)[chain.expiryCode[rows]],
+    )
+
+
+# Estado incremental de GEX para un ticker que se actualiza snapshot a snapshot, sobre el
+# chain compacto. Sólo se recalculan los contratos cuyo OI, IV o gamma cambió; el perfil se
+# actualiza por diferencias y, con nearSpot, únicamente en los niveles cercanos al spot.
+# Las zonas clave (±width) salen de un StrikeIndex sobre los agregados por strike
+class GexStream:
+    def __init__(self, ticker, cache, profileStep=None, width=150, nearSpot=None, fullEvery=20, regrid=0.05,
+                 r=0, q=0, max_bytes=DEFAULT_MAX_BYTES):
+        self.ticker = ticker
+        self.cache = cache
+        self.profileStep = profileStep
+        self.width = width
+        self.nearSpot = nearSpot
+        self.fullEvery = fullEvery
+        self.regrid = regrid
+        self.r = r
+        self.q = q
+        self.max_bytes = max_bytes
+
+        self.timestamp = None
+        self.spotPrice = None
+        self.chain = None
+        self.T = None
+        self.keys = None
+        self.levels = None
+        self.totals = None
+        self.strikeSums = None
+        self.strikeIndex = None
+        self.keyLevels = None
+        self.zeroGamma = None
+        self.updates = 0
+        self.lastChanged = 0
+        self.lastFull = False
+        self._anchor = None
+        self._todayDate = None
+        self._buckets = None
+        self._bucketKey = None
+
+    # Descarga (o revalida) el snapshot y actualiza el estado si cambió
+    def poll(self):
+        snapshot = self.cache.load(self.ticker)
+        if snapshot.timestamp is not None and snapshot.timestamp == self.timestamp:
+            return False
+        self.update(snapshot)
+        return True
+
+    # Aplica un snapshot nuevo: recálculo completo o incremental según lo que cambió
+    # (now: momento de valoración, por defecto ahora en Nueva York)
+    def update(self, snapshot, now=None):
+        spotPrice = snapshot.spotPrice
+        with span("prepare_chain") as s:
+            chain = CompactChain.from_options(snapshot.options_df)
+            s.rows = len(chain)
+        now = now or market_now()
+        todayDate = now.date()
+        with span("time_to_expiry", rows=len(chain)):
+            # T por vencimiento único; copia propia porque el stream conserva el T de los contratos sin cambios
+            T = chain.days_till_exp(now, spotPrice).copy()
+            buckets = chain.expiry_buckets()
+        bucketKey = tuple(pd.Timestamp(b).value for b in buckets)
+
+        full = (
+            self.chain is None
+            or todayDate != self._todayDate
+            or bucketKey != self._bucketKey
+            or abs(spotPrice - self._anchor) > self.regrid * self._anchor
+            or (self.fullEvery and self.updates % self.fullEvery == 0)
+        )
+        if full:
+            with span("stream_full", rows=len(chain)):
+                self._full_update(chain, T, spotPrice, buckets)
+        else:
+            with span("stream_incremental") as s:
+                self._incremental_update(chain, T, spotPrice)
+                s.rows = self.lastChanged
+
+        self.timestamp = snapshot.timestamp
+        self.spotPrice = spotPrice
+        self._todayDate = todayDate
+        self._buckets = buckets
+        self._bucketKey = bucketKey
+        self.updates += 1
+        self.lastFull = full
+        self.zeroGamma = gamma_flip(self.levels, self.totals[:, 0])
+        with span("key_levels") as s:
+            self.strikeIndex = StrikeIndex(self.strikeSums.reset_index())
+            self.keyLevels = self.strikeIndex.key_levels(spotPrice, self.width)
+            s.rows = len(self.keyLevels.df_filtered)
+
+    # Otra ventana ±width: sólo se recortan las zonas clave del índice ya construido
+    def set_width(self, width):
+        self.width = width
+        if self.strikeIndex is not None:
+            self.keyLevels = self.strikeIndex.key_levels(self.spotPrice, width)
+
+    def _full_update(self, chain, T, spotPrice, buckets):
+        allRows = slice(None)
+        self._anchor = spotPrice
+        self.levels = price_levels(0.8 * spotPrice, 1.2 * spotPrice, self.profileStep)
+        self.totals = _profile_from_arrays(self.levels, _chain_arrays(chain, T, allRows, *buckets),
+                                           self.r, self.q, self.max_bytes)
+        self.strikeSums = _strike_sums(chain, allRows)
+        self.chain = chain
+        self.T = T
+        self.keys = chain.chain_keys()
+        self.lastChanged = len(chain)
+
+    def _incremental_update(self, chain, T, spotPrice):
+        keys = chain.chain_keys()
+        _, oldIdx, newIdx = np.intersect1d(self.keys, keys, assume_unique=True, return_indices=True)
+
+        # Contratos comunes con algún campo relevante distinto (NaN == NaN se considera igual)
+        changed = np.zeros(len(oldIdx), dtype=bool)
+        for col in _TRACKED:
+            oldVals = self.chain.columns[col][oldIdx]
+            newVals = chain.columns[col][newIdx]
+            changed |= ~((oldVals == newVals) | (np.isnan(oldVals) & np.isnan(newVals)))
+
+        # T de cada contrato: se recalcula cuando se ha desplazado lo bastante; si no, se conserva
+        # el T con el que está sumado en el perfil para que la resta posterior sea exacta
+        oldT = self.T[oldIdx]
+        newT = T[newIdx]
+        changed |= np.abs(newT - oldT) > _T_REL_TOL * oldT
+        T[newIdx[~changed]] = oldT[~changed]
+
+        removed = np.setdiff1d(np.arange(len(self.keys)), oldIdx, assume_unique=True)
+        added = np.setdiff1d(np.arange(len(keys)), newIdx, assume_unique=True)
+        oldRows = np.r_[oldIdx[changed], removed]
+        newRows = np.r_[newIdx[changed], added]
+
+        if len(oldRows) or len(newRows):
+            # Perfil: resta la contribución anterior y suma la nueva, sólo en los niveles cercanos al spot
+            idx = np.arange(len(self.levels))
+            if self.nearSpot:
+                idx = np.flatnonzero(np.abs(self.levels - spotPrice) <= self.nearSpot * spotPrice)
+            levels = self.levels[idx]
+            self.totals[idx] -= _profile_from_arrays(levels, _chain_arrays(self.chain, self.T, oldRows, *self._buckets),
+                                                     self.r, self.q, self.max_bytes)
+            self.totals[idx] += _profile_from_arrays(levels, _chain_arrays(chain, T, newRows, *self._buckets),
+                                                     self.r, self.q, self.max_bytes)
+
+            # Agregados por strike: se recalculan sólo los strikes afectados
+            strikes = np.union1d(self.chain.strike()[oldRows], chain.strike()[newRows])
+            affected = np.flatnonzero(np.isin(chain.strike(), strikes))
+            sums = self.strikeSums.drop(index=strikes, errors='ignore')
+            self.strikeSums = pd.concat([sums, _strike_sums(chain, affected)]).sort_index()
+
+        self.chain = chain
+        self.T = T
+        self.keys = keys
+        self.lastChanged = len(oldRows) + len(newRows)
+
+    # Agregación por strike equivalente a dfAgg del análisis puntual
+    @property
+    def dfAgg(self):
+        scale = 100 * self.spotPrice * self.spotPrice * 0.01
+        agg = self.strikeSums[['CallOpenInt', 'PutOpenInt']].copy()
+        agg['CallGEX'] = self.strikeSums['CallGammaOI'] * scale
+        agg['PutGEX'] = self.strikeSums['PutGammaOI'] * scale * -1
+        agg['TotalGamma'] = (agg['CallGEX'] + agg['PutGEX']) / 10**9
+        return agg
+
+    # Perfil (totalGamma, totalGammaExNext, totalGammaExFri)
+    @property
+    def profile(self):
+        return self.totals[:, 0], self.totals[:, 1], self.totals[:, 2]
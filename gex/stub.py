@@ -0,0 +1,162 @@
+# Servidor HTTP local que imita el endpoint de CBOE sirviendo snapshots grabados.
+# Cada petición de un ticker devuelve el siguiente archivo _{ticker}.json del
+# directorio (ordenados por ruta) y se queda en el último. Habla HTTP/1.1 keep-alive,
+# comprime con gzip si el cliente lo pide y puede inyectar latencia y fallos para
+# probar timeouts y reintentos.
+#
+#   python -m gex.stub snapshots/ --port 8765
+#   python -m gex.stub snapshots/ --latency 0.2 --failure-rate 0.3    # 503, resets y cuerpos truncados
+#   url = "http://127.0.0.1:8765/api/global/delayed_quotes/options/_{ticker}.json"
+import argparse
+import gzip
+import hashlib
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_PATH = re.compile(r"/api/global/delayed_quotes/options/_(?P<ticker>[^/]+)\.json$")
+
+# Fallos inyectables: 503 con Retry-After, conexión cortada sin respuesta y cuerpo truncado
+FAILURES = ("503", "reset", "truncate")
+
+
+def _snapshot_files(directory, ticker):
+    return sorted(Path(directory).rglob(f"_{ticker}.json")) or sorted(Path(directory).glob(f"_{ticker}*.json"))
+
+
+# Servidor con estado: posición de reproducción y peticiones recibidas por ticker.
+# latency (+ uniforme en [0, jitter]) retrasa cada respuesta; failure_rate es la
+# probabilidad de un fallo de `failures`, y fail_first fuerza fallos en las primeras
+# peticiones de cada ticker (reproducible sin depender de la semilla)
+class SnapshotServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, directory, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 failures=FAILURES, fail_first=0, seed=None):
+        self.directory = Path(directory)
+        self.positions = {}
+        self.requests = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failures = tuple(failures)
+        self.fail_first = fail_first
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/global/delayed_quotes/options/_{{ticker}}.json"
+
+    def next_file(self, ticker):
+        files = _snapshot_files(self.directory, ticker)
+        if not files:
+            return None
+        with self.lock:
+            pos = self.positions.get(ticker, 0)
+            self.positions[ticker] = min(pos + 1, len(files) - 1)
+        return files[pos]
+
+    # Cuenta la petición y decide retraso y fallo inyectado (None = respuesta normal)
+    def plan(self, ticker):
+        with self.lock:
+            count = self.requests[ticker] = self.requests.get(ticker, 0) + 1
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            failing = count <= self.fail_first or self.rng.random() < self.failure_rate
+            failure = self.rng.choice(self.failures) if failing and self.failures else None
+        return delay, failure
+
+    # Clientes que cortan por timeout: no es un error del servidor
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    # Arranca el servidor en un hilo en segundo plano
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = _PATH.match(self.path)
+        if match is None:
+            self.send_error(404)
+            return
+
+        delay, failure = self.server.plan(match["ticker"])
+        time.sleep(delay)
+        if failure == "503":
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if failure == "reset":
+            self.close_connection = True
+            return
+
+        path = self.server.next_file(match["ticker"])
+        if path is None:
+            self.send_error(404)
+            return
+
+        body = path.read_bytes()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        encoded = body
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            encoded = gzip.compress(body, compresslevel=1)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if encoded is not body:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if failure == "truncate":
+            # Anuncia el cuerpo completo pero corta la conexión a mitad
+            self.wfile.write(encoded[:len(encoded) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local del endpoint de opciones de CBOE")
+    parser.add_argument("directory", help="Directorio con snapshots _{ticker}.json grabados")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Retraso de cada respuesta (segundos)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Retraso adicional aleatorio máximo (segundos)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probabilidad de fallo inyectado por petición")
+    parser.add_argument("--failures", nargs="+", choices=FAILURES, default=list(FAILURES))
+    parser.add_argument("--fail-first", type=int, default=0, help="Fallar las N primeras peticiones de cada ticker")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = SnapshotServer(args.directory, args.host, args.port, args.latency, args.jitter, args.failure_rate,
+                            args.failures, args.fail_first, args.seed)
+    print(f"Sirviendo {args.directory} en {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
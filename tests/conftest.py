@@ -0,0 +1,23 @@
+# Chains sintéticos deterministas del benchmark (mismo formato que CBOE) para los tests
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from fixtures import QUOTE_DATE, synthetic_payload  # noqa: E402
+
+
+# Escribe el payload sintético de `ticker` en `directory` como _{ticker}.json
+def write_snapshot(directory, ticker, payload=None):
+    path = Path(directory) / f"_{ticker}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload if payload is not None else synthetic_payload(ticker)))
+    return path
+
+
+@pytest.fixture
+def quote_date():
+    return QUOTE_DATE
@@ -0,0 +1,43 @@
+# CLI sobre un snapshot guardado: se valora en el momento de su cotización
+import json
+
+from conftest import write_snapshot
+
+from gex.cli import main
+
+
+def _run(tmp_path, *argv):
+    out = tmp_path / "out.json"
+    status = main(["VIX", "--file", str(write_snapshot(tmp_path / "snapshots", "VIX")),
+                   "--cache-dir", str(tmp_path / "cache"), "--output", str(out), *argv])
+    return status, json.loads(out.read_text())
+
+
+def test_file_is_valued_at_quote_time(tmp_path, quote_date):
+    status, result = _run(tmp_path)
+
+    assert status == 0
+    assert result["date"] == quote_date.isoformat()
+    assert result["zero_gamma"] is not None
+    assert any(result["profile"]["totalGamma"])
+
+
+def test_as_of_overrides_quote_time(tmp_path):
+    _, atQuote = _run(tmp_path)
+    status, later = _run(tmp_path, "--as-of", "2025-01-03 12:00")
+
+    assert status == 0
+    assert later["date"] == "2025-01-03"
+    # Un día después los vencimientos más cortos ya no cuentan: cambia el perfil
+    assert later["profile"]["totalGamma"] != atQuote["profile"]["totalGamma"]
+
+
+def test_csv_output(tmp_path):
+    out = tmp_path / "out.csv"
+    status = main(["VIX", "--file", str(write_snapshot(tmp_path / "snapshots", "VIX")),
+                   "--cache-dir", str(tmp_path / "cache"), "--format", "csv", "--output", str(out)])
+    lines = out.read_text().splitlines()
+
+    assert status == 0
+    assert lines[0] == "StrikePrice,TotalGamma,CallOpenInt,PutOpenInt,net_gex"
+    assert len(lines) > 1
@@ -0,0 +1,59 @@
+# Chain compacto: mismas filas y resultados que el chain ancho, y caché de columnas derivadas
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from fixtures import synthetic_payload
+
+from gex.api import analyze, prepared_chain
+from gex.cache import Snapshot
+from gex.chain import chain_keys, prepare_chain
+from gex.compact import CompactChain
+from gex.memo import MemoCache
+
+
+def _snapshot(ticker="SPX"):
+    payload = synthetic_payload(ticker)
+    return Snapshot(ticker, payload["data"]["close"], payload["timestamp"], pd.DataFrame(payload["data"]["options"]))
+
+
+def test_to_frame_matches_prepare_chain():
+    options = _snapshot().options_df
+    wide, chain = prepare_chain(options), CompactChain.from_options(options)
+    frame = chain.to_frame()
+    for col in ('ExpirationDate', 'StrikePrice', 'CallIV', 'PutIV', 'CallGamma', 'PutGamma', 'CallOpenInt',
+                'PutOpenInt'):
+        np.testing.assert_array_equal(frame[col].to_numpy(), wide[col].to_numpy(dtype=frame[col].dtype), col)
+    np.testing.assert_array_equal(chain.chain_keys(), chain_keys(wide))
+    np.testing.assert_array_equal(CompactChain.from_frame(wide).chain_keys(), chain_keys(wide))
+
+
+def test_analyze_compact_matches_wide(quote_date):
+    snapshot = _snapshot()
+    asOf = datetime.combine(quote_date, datetime.min.time()).replace(hour=10)
+    wide = analyze(snapshot, prepare_chain(snapshot.options_df), todayDate=asOf)
+    compact = analyze(snapshot, CompactChain.from_options(snapshot.options_df), todayDate=asOf)
+    memo = MemoCache()
+    chain = prepared_chain(snapshot, memo)
+    assert isinstance(chain, CompactChain) and prepared_chain(snapshot, memo) is chain
+    memoized = analyze(snapshot, chain, todayDate=asOf, memo=memo)
+    assert json.dumps(wide.to_dict()) == json.dumps(compact.to_dict()) == json.dumps(memoized.to_dict())
+
+
+def test_valued_columns_are_invalidated(quote_date):
+    chain = CompactChain.from_options(_snapshot().options_df)
+    asOf = datetime.combine(quote_date, datetime.min.time()).replace(hour=10)
+    T = chain.days_till_exp(asOf, 5900.0)
+    assert chain.days_till_exp(asOf, 5900.0) is T
+    assert len(chain.expiry_days_till_exp(asOf, 5900.0)) == len(chain.expiries)
+
+    later = chain.days_till_exp(asOf.replace(hour=15), 5900.0)
+    assert later is not T and (later <= T).all()
+    assert chain.days_till_exp(asOf.replace(hour=15), 5910.0) is not later
+
+    netGex = chain.net_gex()
+    chain.days_till_exp(asOf, 5900.0)
+    assert chain.net_gex() is netGex
+    chain.clear_derived()
+    assert chain.net_gex() is not netGex
@@ -0,0 +1,189 @@
+# Descargas contra el stub local (gex.stub): concurrencia, reintentos, revalidación y timeouts
+import json
+import time
+
+import pytest
+
+from gex import cache as cachemod
+from gex import fetch as fetchmod
+from gex.cache import ChainFetchError, Snapshot, SnapshotCache
+from gex.fetch import fetch_all
+from gex.stub import SnapshotServer
+
+TICKERS = ("SPX", "NDX", "RUT", "VIX")
+
+
+# Payload mínimo de CBOE: dos strikes, call y put
+def _payload(ticker, spot=100.0):
+    options = [{"option": f"{ticker}250117{cp}{k * 1000:08d}", "iv": 0.2, "gamma": 0.01, "open_interest": 100.0,
+                "delta": 0.5 if cp == "C" else -0.5, "volume": 10.0}
+               for k in (95, 105) for cp in "CP"]
+    return {"timestamp": "2025-01-02 10:00:00", "data": {"close": spot, "options": options}}
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    directory = tmp_path / "snapshots"
+    directory.mkdir()
+    for ticker in TICKERS:
+        (directory / f"_{ticker}.json").write_text(json.dumps(_payload(ticker)))
+    return directory
+
+
+# Arranca un stub con las opciones dadas y lo apaga al terminar el test
+@pytest.fixture
+def stub(snapshots):
+    servers = []
+
+    def start(**kw):
+        server = SnapshotServer(snapshots, **kw).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _cache(tmp_path, server, **kw):
+    kw.setdefault("backoff", 0.01)
+    return SnapshotCache(tmp_path / "cache", url=server.url, **kw)
+
+
+def test_load_many_is_concurrent(tmp_path, stub):
+    server = stub(latency=0.5)
+    start = time.perf_counter()
+    results = _cache(tmp_path, server).load_many(TICKERS)
+    elapsed = time.perf_counter() - start
+
+    assert list(results) == list(TICKERS)
+    assert all(isinstance(s, Snapshot) and len(s.options_df) == 4 for s in results.values())
+    # Un viaje de ida y vuelta, no cuatro
+    assert elapsed < 2 * 0.5
+
+
+def test_fetch_all_is_concurrent(stub):
+    server = stub(latency=0.5)
+    start = time.perf_counter()
+    results = fetch_all({t: (server.url.format(ticker=t), {}) for t in TICKERS})
+    elapsed = time.perf_counter() - start
+
+    assert [r.status for r in results.values()] == [200] * len(TICKERS)
+    assert results["SPX"].payload["data"]["close"] == 100.0
+    assert elapsed < 2 * 0.5
+
+
+@pytest.mark.parametrize("failure", ["503", "reset", "truncate"])
+def test_load_recovers_after_failures(tmp_path, stub, failure):
+    server = stub(fail_first=2, failures=[failure])
+    snapshot = _cache(tmp_path, server, retries=3).load("SPX")
+
+    assert snapshot.spotPrice == 100.0 and len(snapshot.options_df) == 4
+    assert server.requests["SPX"] == 3
+
+
+@pytest.mark.parametrize("failure", ["503", "reset", "truncate"])
+def test_fetch_all_recovers_after_failures(stub, failure):
+    server = stub(fail_first=2, failures=[failure])
+    results = fetch_all({t: (server.url.format(ticker=t), {}) for t in TICKERS}, retries=3, backoff=0.01)
+
+    assert all(r.status == 200 for r in results.values())
+    # aiohttp ya repite una vez por su cuenta un reset en una conexión keep-alive reutilizada,
+    # así que se cuentan las peticiones que llegaron al servidor
+    assert all(server.requests[t] == 3 for t in TICKERS)
+
+
+def test_load_raises_when_retries_run_out(tmp_path, stub):
+    server = stub(fail_first=100, failures=["503"])
+    with pytest.raises(ChainFetchError) as info:
+        _cache(tmp_path, server, retries=2).load("SPX")
+
+    assert info.value.status_code == 503
+    assert server.requests["SPX"] == 3
+
+
+def test_load_many_returns_errors_per_ticker(tmp_path, stub):
+    server = stub(fail_first=100, failures=["503"])
+    results = _cache(tmp_path, server, retries=1).load_many(["SPX", "NDX"])
+
+    assert all(isinstance(e, ChainFetchError) and e.status_code == 503 for e in results.values())
+    assert [e.ticker for e in results.values()] == ["SPX", "NDX"]
+
+
+def test_load_many_keeps_good_tickers_when_one_fails(tmp_path, stub):
+    server = stub()
+    results = _cache(tmp_path, server, retries=1).load_many(["SPX", "XYZ"])
+
+    assert isinstance(results["SPX"], Snapshot)
+    # 404 no se reintenta
+    assert isinstance(results["XYZ"], ChainFetchError) and results["XYZ"].status_code == 404
+    assert server.requests["XYZ"] == 1
+
+
+# Espía los códigos con los que la caché resuelve cada respuesta
+def _record_statuses(cache, monkeypatch):
+    statuses = []
+    resolve = cache._resolve
+
+    def spy(index, ticker, status, *args, **kw):
+        statuses.append(status)
+        return resolve(index, ticker, status, *args, **kw)
+
+    monkeypatch.setattr(cache, "_resolve", spy)
+    return statuses
+
+
+def test_load_revalidates_with_304(tmp_path, stub, monkeypatch):
+    server = stub()
+    cache = _cache(tmp_path, server, ttl=0)
+    statuses = _record_statuses(cache, monkeypatch)
+    first = cache.load("SPX")
+    second = cache.load("SPX")
+
+    assert statuses == [200, 304]
+    assert second.timestamp == first.timestamp
+    assert second.options_df.equals(first.options_df)
+
+
+def test_load_many_revalidates_with_304(tmp_path, stub, monkeypatch):
+    server = stub()
+    cache = _cache(tmp_path, server, ttl=0)
+    statuses = _record_statuses(cache, monkeypatch)
+    first = cache.load_many(["SPX", "NDX"])
+    second = cache.load_many(["SPX", "NDX"])
+
+    assert statuses == [200, 200, 304, 304]
+    assert all(second[t].options_df.equals(first[t].options_df) for t in first)
+
+
+def test_fresh_snapshot_skips_the_network(tmp_path, stub):
+    server = stub()
+    cache = _cache(tmp_path, server, ttl=60)
+    cache.load("SPX")
+    cache.load("SPX")
+
+    assert server.requests["SPX"] == 1
+
+
+def test_load_read_timeout(tmp_path, stub, monkeypatch):
+    monkeypatch.setattr(cachemod, "READ_TIMEOUT", 0.2)
+    server = stub(latency=1.0)
+    start = time.perf_counter()
+    with pytest.raises(ChainFetchError) as info:
+        _cache(tmp_path, server, retries=0).load("SPX")
+
+    assert info.value.status_code is None and "Timeout" in info.value.reason
+    assert time.perf_counter() - start < 1.0
+
+
+def test_fetch_all_read_timeout(stub, monkeypatch):
+    monkeypatch.setattr(fetchmod, "READ_TIMEOUT", 0.2)
+    server = stub(latency=1.0)
+    start = time.perf_counter()
+    results = fetch_all({"SPX": (server.url.format(ticker="SPX"), {})}, retries=1, backoff=0.01)
+
+    error = results["SPX"]
+    assert isinstance(error, ChainFetchError) and error.status_code is None
+    assert "Timeout" in error.reason
+    assert time.perf_counter() - start < 2 * 1.0
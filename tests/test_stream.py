@@ -0,0 +1,83 @@
+# Modo en vivo contra el stub local: la actualización incremental de GexStream debe dar lo
+# mismo que recalcular el snapshot desde cero
+import copy
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import write_snapshot
+from fixtures import synthetic_payload
+
+from gex.cache import SnapshotCache
+from gex.figures import live_figures, update_live_figures
+from gex.profile import _profile_from_arrays
+from gex.stream import GexStream, _chain_arrays
+from gex.stub import SnapshotServer
+
+TICKER = "NDX"
+
+
+# Segundo snapshot: cambia OI y gamma de algunos contratos, quita otros y mueve el spot
+def _next_payload(payload):
+    payload = copy.deepcopy(payload)
+    payload["timestamp"] = payload["timestamp"].replace("10:00:00", "10:05:00")
+    payload["data"]["close"] *= 1.003
+    options = payload["data"]["options"]
+    for option in options[::7]:
+        option["open_interest"] += 250
+    for option in options[::11]:
+        option["gamma"] = round(option["gamma"] * 1.2, 6)
+    del options[5::97]
+    return payload
+
+
+@pytest.fixture
+def server(tmp_path):
+    first = synthetic_payload(TICKER)
+    write_snapshot(tmp_path / "snapshots" / "1", TICKER, first)
+    write_snapshot(tmp_path / "snapshots" / "2", TICKER, _next_payload(first))
+    server = SnapshotServer(tmp_path / "snapshots").start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _stream(tmp_path, server, name):
+    cache = SnapshotCache(tmp_path / name, url=server.url, ttl=0)
+    return GexStream(TICKER, cache, profileStep=25, fullEvery=0)
+
+
+def test_incremental_update_matches_full_recompute(tmp_path, server, quote_date):
+    now = datetime.combine(quote_date, datetime.min.time()).replace(hour=10, minute=5)
+    stream = _stream(tmp_path, server, "live")
+    stream.update(stream.cache.load(TICKER), now)
+    snapshot = stream.cache.load(TICKER)
+    stream.update(snapshot, now)
+    assert not stream.lastFull and 0 < stream.lastChanged < len(stream.chain)
+
+    fresh = _stream(tmp_path, server, "fresh")
+    fresh.update(snapshot, now)
+    assert fresh.lastFull and fresh.timestamp == stream.timestamp
+
+    pd.testing.assert_frame_equal(stream.dfAgg, fresh.dfAgg, rtol=1e-9)
+    expected = _profile_from_arrays(stream.levels, _chain_arrays(fresh.chain, fresh.T, slice(None), *fresh._buckets),
+                                    0, 0, fresh.max_bytes)
+    np.testing.assert_allclose(stream.totals, expected, rtol=1e-9, atol=1e-9 * np.abs(expected).max())
+
+    kl, klFresh = stream.keyLevels, fresh.keyLevels
+    pd.testing.assert_frame_equal(kl.df_filtered, klFresh.df_filtered, rtol=1e-9)
+    np.testing.assert_allclose(kl.cumulative, klFresh.cumulative, rtol=1e-9)
+    assert kl.max_gex['StrikePrice'] == klFresh.max_gex['StrikePrice']
+    assert kl.min_gex['StrikePrice'] == klFresh.min_gex['StrikePrice']
+    assert list(kl.high_oi_filtered['StrikePrice']) == list(klFresh.high_oi_filtered['StrikePrice'])
+
+    # Las siete figuras en vivo se actualizan en su sitio con el estado del stream
+    figs = live_figures()
+    update_live_figures(figs, stream)
+    fig4, fig5 = figs[3:5]
+    assert len(fig4.data[0].x) == len(kl.pos) and len(fig4.data[1].x) == len(kl.neg)
+    np.testing.assert_array_equal(fig5.data[0].y, kl.df_filtered['total_oi'].to_numpy())
+
+    stream.set_width(50)
+    assert stream.keyLevels.df_filtered['StrikePrice'].between(stream.spotPrice - 50, stream.spotPrice + 50).all()